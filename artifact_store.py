@@ -0,0 +1,231 @@
+# artifact_store.py
+# Content-addressed store of audit stage outputs. Each artifact is keyed by a
+# hash of its stage name and everything the stage's output depends on (the URL
+# for a scrape, the full LLM request for a generation, the document and folder
+# for an upload), so a rerun of an audit that failed late gets every earlier
+# stage back from disk and pays only for the stage that failed. Changing an
+# input (a new prompt template, a different model, a re-scraped site) changes
+# the key, so stale outputs are never served.
+#
+# Stages that read the outside world (scrape, Pagespeed, Serper) expire after
+# ARTIFACT_TTL_SECONDS so a site that changed gets re-researched; LLM and
+# upload artifacts are pure functions of their inputs and never expire.
+#
+# Usage:
+#     python artifact_store.py list [--client NAME] [--stage STAGE]
+#     python artifact_store.py show KEY_PREFIX
+#     python artifact_store.py invalidate --client NAME [--stage STAGE]
+#     python artifact_store.py invalidate --key KEY_PREFIX
+#     python artifact_store.py purge-expired
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+
+ARTIFACT_DB_PATH = os.path.join("data", "artifacts.db")
+ARTIFACTS_ENABLED = os.getenv("AUDIT_ARTIFACTS", "1") != "0"
+
+_DAY = 24 * 3600
+ARTIFACT_TTL_SECONDS = {
+    "scrape": int(os.getenv("ARTIFACT_TTL_SCRAPE_SECONDS", str(3 * _DAY))),
+    "pagespeed": int(os.getenv("ARTIFACT_TTL_PAGESPEED_SECONDS", str(1 * _DAY))),
+    "seo_snapshot": int(os.getenv("ARTIFACT_TTL_SEO_SECONDS", str(3 * _DAY))),
+    "competitors": int(os.getenv("ARTIFACT_TTL_COMPETITORS_SECONDS", str(7 * _DAY))),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    key TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    client_name TEXT,
+    inputs_json TEXT NOT NULL,
+    value_json TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_client_stage ON artifacts(client_name, stage);
+"""
+
+
+def artifact_key(stage: str, inputs) -> str:
+    """sha256 over the stage name and the canonical JSON of its inputs."""
+    material = json.dumps([stage, inputs], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ArtifactStore:
+    def __init__(self, db_path=ARTIFACT_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, stage: str, inputs):
+        """The stored value for (stage, inputs), or None when missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value_json, expires_at FROM artifacts WHERE key = ?", (artifact_key(stage, inputs),)
+            ).fetchone()
+        if not row or (row["expires_at"] is not None and row["expires_at"] <= time.time()):
+            return None
+        return json.loads(row["value_json"])
+
+    def put(self, stage: str, inputs, value, client_name: str = None):
+        """Stores a JSON-serializable value; returns its key."""
+        key = artifact_key(stage, inputs)
+        value_json = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        ttl = ARTIFACT_TTL_SECONDS.get(stage)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts "
+                "(key, stage, client_name, inputs_json, value_json, size, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, stage, client_name, json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str),
+                 value_json, len(value_json.encode("utf-8")), now, now + ttl if ttl else None),
+            )
+        return key
+
+    def list(self, client_name: str = None, stage: str = None):
+        """Artifact metadata (no values), newest first."""
+        query = "SELECT key, stage, client_name, size, created_at, expires_at FROM artifacts WHERE 1=1"
+        params = []
+        if client_name:
+            query += " AND client_name = ?"
+            params.append(client_name)
+        if stage:
+            query += " AND stage = ?"
+            params.append(stage)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY created_at DESC", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def show(self, key_prefix: str):
+        """The full artifact (inputs and value decoded) whose key starts with key_prefix, or None."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM artifacts WHERE key LIKE ? LIMIT 2", (key_prefix + "%",)
+            ).fetchall()
+        if len(rows) != 1:
+            return None
+        artifact = dict(rows[0])
+        artifact["inputs"] = json.loads(artifact.pop("inputs_json"))
+        artifact["value"] = json.loads(artifact.pop("value_json"))
+        return artifact
+
+    def invalidate(self, client_name: str = None, stage: str = None, key_prefix: str = None) -> int:
+        """Deletes matching artifacts; returns how many. Needs a client or a key."""
+        if not client_name and not key_prefix:
+            raise ValueError("invalidate needs a client name or a key prefix.")
+        query = "DELETE FROM artifacts WHERE 1=1"
+        params = []
+        if key_prefix:
+            query += " AND key LIKE ?"
+            params.append(key_prefix + "%")
+        if client_name:
+            query += " AND client_name = ?"
+            params.append(client_name)
+        if stage:
+            query += " AND stage = ?"
+            params.append(stage)
+        with self._lock:
+            return self._conn.execute(query, params).rowcount
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM artifacts WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            ).rowcount
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
+
+
+def cached_stage(stage: str, inputs, compute, client_name: str = None, keep=lambda value: value is not None):
+    """
+    Returns the stored artifact for (stage, inputs), or runs compute() and
+    stores its result when keep(result) is true (failures aren't stored, so
+    the next run retries them).
+    """
+    if not ARTIFACTS_ENABLED:
+        return compute()
+    store = get_store()
+    value = store.get(stage, inputs)
+    if value is not None:
+        print(f"  ♻️ Reusing stored {stage} artifact.")
+        return value
+    value = compute()
+    if keep(value):
+        try:
+            store.put(stage, inputs, value, client_name)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"  ⚠️ Could not store {stage} artifact: {e}")
+    return value
+
+
+# ---------------------------------------------------
+# CLI
+# ---------------------------------------------------
+def _format_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp)) if timestamp else "never"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or invalidate stored audit stage artifacts.")
+    parser.add_argument("--db", default=ARTIFACT_DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_cmd = commands.add_parser("list", help="List artifacts")
+    list_cmd.add_argument("--client")
+    list_cmd.add_argument("--stage")
+    show_cmd = commands.add_parser("show", help="Print one artifact's inputs and value")
+    show_cmd.add_argument("key", help="Key or unique key prefix")
+    invalidate_cmd = commands.add_parser("invalidate", help="Delete artifacts so the stage re-runs")
+    invalidate_cmd.add_argument("--client")
+    invalidate_cmd.add_argument("--stage")
+    invalidate_cmd.add_argument("--key", help="Key or key prefix")
+    commands.add_parser("purge-expired", help="Delete expired external-data artifacts")
+    args = parser.parse_args(argv)
+
+    store = ArtifactStore(args.db)
+    now = time.time()
+    if args.command == "list":
+        rows = store.list(args.client, args.stage)
+        print(f"{'key':<14} {'stage':<18} {'client':<24} {'size':>9}  {'created':<16}  expires")
+        for row in rows:
+            expired = " (expired)" if row["expires_at"] and row["expires_at"] <= now else ""
+            print(f"{row['key'][:12]:<14} {row['stage']:<18} {(row['client_name'] or '-')[:24]:<24} "
+                  f"{row['size']:>9}  {_format_time(row['created_at']):<16}  {_format_time(row['expires_at'])}{expired}")
+        print(f"{len(rows)} artifact(s)")
+    elif args.command == "show":
+        artifact = store.show(args.key)
+        if artifact is None:
+            print(f"❌ No unique artifact matches '{args.key}'.")
+            sys.exit(1)
+        print(json.dumps(artifact, indent=2, ensure_ascii=False))
+    elif args.command == "invalidate":
+        if not args.client and not args.key:
+            parser.error("invalidate needs --client or --key")
+        print(f"🗑️ Invalidated {store.invalidate(args.client, args.stage, args.key)} artifact(s).")
+    elif args.command == "purge-expired":
+        print(f"🗑️ Purged {store.purge_expired()} expired artifact(s).")
+
+
+if __name__ == "__main__":
+    main()
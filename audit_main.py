@@ -1,145 +1,198 @@
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 import google_clients
 import config
 import audit_research # Import the new research module
+import model_router # Per-stage model routing and its latency/cost record
+import llm_accounting # Token/latency accounting per job and stage
+import deadline # Request time budgets (bounds the wait for the folder tree)
 import video_generation # Import the video generation module
 from dotenv import load_dotenv
 import openai # Needed for the client object
 
-# --- 0. Setup ---
-print("--- [START] Marketing Audit Agent ---")
-load_dotenv()
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-if not OPENAI_API_KEY:
-    print("❌ FATAL ERROR: OPENAI_API_KEY not found in .env file.")
-    sys.exit()
-
-# Initialize OpenAI Client
-try:
-    openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-    print("✅ OpenAI client initialized.")
-except Exception as e:
-    print(f"❌ FATAL ERROR: Could not initialize OpenAI client. {e}")
-    sys.exit()
-
-
-# --- 1. Connect to Google Services ---
-print("\nConnecting to Google services...")
-try:
-    g_clients = google_clients.GoogleClients()
-    if not g_clients.drive_service:
-        raise Exception("Drive service failed to initialize.")
-    print("✅ Google services connected.")
-except Exception as e:
-    print(f"❌ FATAL ERROR: Could not connect to Google. {e}")
-    sys.exit()
-
-# --- 2. Inputs ---
-# These match your current client target
-# *** UPDATED CLIENT TARGET: Bn Touch ***
-INPUT_CLIENT_NAME = "BnTouch" 
-# CORRECTED URL: Using the proper domain name.
-INPUT_CLIENT_WEBSITE = "https://bntouch.com/" 
-print(f"\nReceived Job for Client: '{INPUT_CLIENT_NAME}'")
-
-# --- 3. Locate Main Project Folder ---
-print(f"Connecting to main project folder...")
-main_folder_id = config.MAIN_DRIVE_FOLDER_ID
-if not main_folder_id:
-    print("❌ FATAL ERROR: MAIN_DRIVE_FOLDER_ID not set in config.")
-    sys.exit()
-
-# --- 4. Locate or Create Client Folder ---
-print(f"\nSearching for client folder in Drive...")
-sanitized_client_name = "".join(c for c in INPUT_CLIENT_NAME if c.isalnum() or c in (' ', '-', '&')).rstrip()
-client_folder_id = g_clients.find_or_create_folder(main_folder_id, sanitized_client_name)
-
-if client_folder_id:
-    print(f"✅ Found/Created Client Folder: '{sanitized_client_name}'")
-else:
-    print("❌ FATAL ERROR: Could not find or create client folder.")
-    sys.exit()
-
-# --- 5. Create Audit Specific Subfolders ---
-audit_subfolders = [
+# Folder IDs come from the local folder cache when known; anything missing is
+# looked up once and created in a single Drive batch. The tree is set up on a
+# background thread while the audit researches, and only the upload waits for it.
+AUDIT_SUBFOLDERS = [
     "01 Marketing Audit Report", 
     "02 Video Assets", 
     "03 Graphic Assets"
 ]
+REPORT_FOLDER_NAME = AUDIT_SUBFOLDERS[0]
+FOLDER_SETUP_TIMEOUT_SECONDS = 120
 
-print(f"\nInitializing Audit Folders...")
-audit_folder_ids = {}
-
-for folder_name in audit_subfolders:
-    f_id = g_clients.find_or_create_folder(client_folder_id, folder_name)
-    if f_id:
-        audit_folder_ids[folder_name] = f_id
-    else:
-        print(f"  ❌ Failed to create '{folder_name}'")
-
-# --- 6. Execute Phase 6: Master Audit Generation ---
-report_folder_id = audit_folder_ids.get("01 Marketing Audit Report")
+# These match your current client target
+# *** UPDATED CLIENT TARGET: Bn Touch ***
+INPUT_CLIENT_NAME = "BnTouch" 
+# CORRECTED URL: Using the proper domain name.
+INPUT_CLIENT_WEBSITE = "https://bntouch.com/" 
 
-# Initialize variables to hold outputs from the audit
-website_summary = None
-video_prompt_description = None
-audit_link = None
 
-if report_folder_id:
+def connect_openai():
+    """The OpenAI client; exits when the key is missing or the client can't be built."""
+    load_dotenv()
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+    if not OPENAI_API_KEY:
+        print("❌ FATAL ERROR: OPENAI_API_KEY not found in .env file.")
+        sys.exit()
+
+    try:
+        openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        print("✅ OpenAI client initialized.")
+        return openai_client
+    except Exception as e:
+        print(f"❌ FATAL ERROR: Could not initialize OpenAI client. {e}")
+        sys.exit()
+
+
+def connect_google():
+    """GoogleClients with a working Drive service; exits otherwise."""
+    print("\nConnecting to Google services...")
+    try:
+        g_clients = google_clients.GoogleClients()
+        if not g_clients.drive_service:
+            raise Exception("Drive service failed to initialize.")
+        print("✅ Google services connected.")
+        return g_clients
+    except Exception as e:
+        print(f"❌ FATAL ERROR: Could not connect to Google. {e}")
+        sys.exit()
+
+
+def client_folder_name(client_name: str) -> str:
+    return "".join(c for c in client_name if c.isalnum() or c in (' ', '-', '&')).rstrip()
+
+
+def prepare_audit_folders(g_clients, main_folder_id, client_folder_name):
+    """Returns {subfolder name: folder ID} for the client's audit folders ({} if the client folder fails)."""
+    client_folder_id = g_clients.find_or_create_folder(main_folder_id, client_folder_name)
+    if not client_folder_id:
+        print("❌ Could not find or create client folder.")
+        return {}
+    print(f"✅ Found/Created Client Folder: '{client_folder_name}'")
+
+    folder_ids = g_clients.ensure_subfolders(client_folder_id, AUDIT_SUBFOLDERS)
+    for folder_name in AUDIT_SUBFOLDERS:
+        if folder_name not in folder_ids:
+            print(f"  ❌ Failed to create '{folder_name}'")
+    return folder_ids
+
+
+def run_client_audit(openai_client, g_clients, client_name, website_url, main_folder_id, checkpoint=None,
+                     incremental=False):
+    """
+    Phases 4-6 for one client: sets up the client's Drive folders in the
+    background, runs the master audit and logs the result to the job sheet.
+    checkpoint and incremental are passed through to run_master_audit.
+    Returns (audit_link, website_summary, video_prompt_description, audit_folder_ids).
+    """
+    print(f"\nInitializing client and audit folders in the background...")
+    folder_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="drive-folders")
+    folder_tree = folder_executor.submit(prepare_audit_folders, g_clients, main_folder_id, client_folder_name(client_name))
+
+    def report_folder_id():
+        # Called by the audit right before its upload, inside the audit's deadline
+        folder_ids = folder_tree.result(timeout=deadline.timeout(FOLDER_SETUP_TIMEOUT_SECONDS, "folder setup"))
+        return folder_ids.get(REPORT_FOLDER_NAME)
+
+    try:
+        audit_link, website_summary, video_prompt_description = audit_research.run_master_audit(
+            openai_client, client_name, website_url, g_clients, report_folder_id,
+            checkpoint=checkpoint, incremental=incremental,
+        )
+        g_clients.log_to_google_sheet(None, "Marketing Audits", {
+            "Tab Name": client_name,
+            "Document Title": audit_research.audit_docx_filename(client_name),
+            "Drive Link": audit_link or "",
+            "Status": "Success" if audit_link else "Failed",
+        })
+        audit_folder_ids = folder_tree.result()
+    finally:
+        folder_executor.shutdown(wait=False)
+    return audit_link, website_summary, video_prompt_description, audit_folder_ids
+
+
+def main():
+    # --- 0. Setup ---
+    print("--- [START] Marketing Audit Agent ---")
+    openai_client = connect_openai()
+
+    # --- 1. Connect to Google Services ---
+    g_clients = connect_google()
+
+    # --- 2. Inputs ---
+    print(f"\nReceived Job for Client: '{INPUT_CLIENT_NAME}'")
+
+    # --- 3. Locate Main Project Folder ---
+    print(f"Connecting to main project folder...")
+    main_folder_id = config.MAIN_DRIVE_FOLDER_ID
+    if not main_folder_id:
+        print("❌ FATAL ERROR: MAIN_DRIVE_FOLDER_ID not set in config.")
+        sys.exit()
+
+    # --- 4/5/6. Client Folders + Phase 6: Master Audit Generation ---
     print("\n--- Phase 6: Generating Master Audit Document ---")
-    # This function call now correctly executes the audit and populates the necessary variables
-    audit_link, website_summary, video_prompt_description = audit_research.run_master_audit(
-        openai_client, INPUT_CLIENT_NAME, INPUT_CLIENT_WEBSITE, g_clients, report_folder_id
-    )
+    with llm_accounting.job_context(f"audit:{INPUT_CLIENT_NAME}"):
+        audit_link, website_summary, video_prompt_description, audit_folder_ids = run_client_audit(
+            openai_client, g_clients, INPUT_CLIENT_NAME, INPUT_CLIENT_WEBSITE, main_folder_id
+        )
+        llm_accounting.print_job_summary()
+        print(f"  Usage summary saved: {llm_accounting.export_job_summary()}")
     print(f"website_summary: {website_summary}")
     print( f"video_prompt_description: {video_prompt_description}")
     if audit_link:
         print(f"✅ Master Audit Document Generated and Uploaded: {audit_link}")
     else:
         print("❌ Master Audit Document Generation Failed.")
-        
-else:
-    print("❌ Skipping Master Audit: Report folder not initialized.")
-"""    
-# Guard to ensure we have the data needed for the video phase
-if not website_summary or not video_prompt_description:
-    print("❌ Cannot proceed to video generation: Missing website summary or video prompt description from audit.")
-    # We exit gracefully if the core audit data is missing
-    sys.exit()
+    """    
+    # Guard to ensure we have the data needed for the video phase
+    if not website_summary or not video_prompt_description:
+        print("❌ Cannot proceed to video generation: Missing website summary or video prompt description from audit.")
+        # We exit gracefully if the core audit data is missing
+        sys.exit()
 
 
-# --- 7. Execute Phase 7: Video Asset Generation ---
-video_asset_folder_id = audit_folder_ids.get("02 Video Assets")
+    # --- 7. Execute Phase 7: Video Asset Generation ---
+    video_asset_folder_id = audit_folder_ids.get("02 Video Assets")
 
-if video_asset_folder_id:
-    print("\n--- Phase 7: Generating Video Asset ---")
+    if video_asset_folder_id:
+        print("\n--- Phase 7: Generating Video Asset ---")
     
-    # 7.1 Generate Video Script (which acts as the main prompt for Sora)
-    script_text = video_generation.generate_video_script(openai_client, website_summary, INPUT_CLIENT_NAME)
+        # 7.1 Generate Video Script (which acts as the main prompt for Sora)
+        script_text = video_generation.generate_video_script(openai_client, website_summary, INPUT_CLIENT_NAME)
     
-    if script_text:
-        print("✅ Video Script/Prompt Generated.")
+        if script_text:
+            print("✅ Video Script/Prompt Generated.")
         
-        # 7.2 Generate Video Asset using the prompt/script
-        # We combine the descriptive prompt (from the audit) and the voiceover script for the AI
-        full_video_prompt = f"{video_prompt_description}. Voiceover script: '{script_text}'."
+            # 7.2 Generate Video Asset using the prompt/script
+            # We combine the descriptive prompt (from the audit) and the voiceover script for the AI
+            full_video_prompt = f"{video_prompt_description}. Voiceover script: '{script_text}'."
 
-        video_link = video_generation.generate_video_asset(
-            full_video_prompt, INPUT_CLIENT_NAME, g_clients, video_asset_folder_id
-        )
+            video_link = video_generation.generate_video_asset(
+                full_video_prompt, INPUT_CLIENT_NAME, g_clients, video_asset_folder_id
+            )
         
-        if video_link:
-            print(f"✅ Video Asset Generated and Uploaded: {video_link}")
-        else:
-            print("❌ Video asset generation failed.")
+            if video_link:
+                print(f"✅ Video Asset Generated and Uploaded: {video_link}")
+            else:
+                print("❌ Video asset generation failed.")
             
-    else:
-        print("❌ Video Script Generation Failed.")
+        else:
+            print("❌ Video Script Generation Failed.")
         
-else:
-    print("❌ Skipping Video Generation: Video Assets folder not initialized.")
-"""
-print("\n--- [END] Marketing Audit Agent ---")
\ No newline at end of file
+    else:
+        print("❌ Skipping Video Generation: Video Assets folder not initialized.")
+    """
+
+    print("\n--- Model Routing Summary (per stage/model) ---")
+    for route_key, route_stats in model_router.router.summary().items():
+        print(f"  {route_key}: {route_stats}")
+
+    g_clients.flush_logs()
+    print("\n--- [END] Marketing Audit Agent ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,19 @@
+import io
 import os
+import uuid
 import openai
 import web_scrapper
 import prompts
 import tools 
+import config
+import model_router
+import audit_sections
+import docx_renderer
+import deadline
+import circuit_breaker
+import artifact_store
+import incremental_audit
+import process_pool
 from docx import Document
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.shared import Pt, RGBColor
@@ -16,6 +27,34 @@ load_dotenv()
 api_key = os.environ.get("OPENAI_API_KEY")
 client = openai.OpenAI(api_key=api_key) if api_key else None
 
+AUDIT_DEADLINE_SECONDS = int(os.getenv("AUDIT_DEADLINE_SECONDS", "900"))  # end-to-end budget of one audit
+PAGESPEED_TYPICAL_SECONDS = 15
+UPLOAD_RESERVE_SECONDS = 20  # kept back for the DOCX upload at the end
+LOCAL_DOCX_DIR = "temp_outputs"  # where a DOCX that couldn't be uploaded is kept
+AUDIT_DOCX_DEBUG_DIR = os.getenv("AUDIT_DOCX_DEBUG_DIR")  # set to also write every rendered DOCX to disk
+
+
+def _llm_budget(stage: str) -> float:
+    return config.MODEL_ROUTES[stage]["latency_budget_seconds"]
+
+
+def _resolve_output_folder(output_folder_id):
+    """
+    output_folder_id is a Drive folder ID, or a zero-argument callable returning
+    one, so the caller can set up the folder tree while the research runs and
+    only block on it right before the upload.
+    """
+    if callable(output_folder_id):
+        try:
+            return output_folder_id()
+        except deadline.DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"  ❌ Drive folder setup failed: {e}")
+            return None
+    return output_folder_id
+
+
 def format_text_in_paragraph(paragraph, text):
     """Helper to apply bold formatting within a paragraph."""
     parts = text.split('**')
@@ -61,9 +100,6 @@ def parse_markdown_to_doc(doc, markdown_content, website_url, table_data=None):
     lines = markdown_content.split('\n')
     in_table = False
     table_lines = []
-    
-    # Track the location of the Website URL to insert it
-    url_inserted = False
 
     for line in lines:
         stripped_line = line.strip()
@@ -94,39 +130,73 @@ def parse_markdown_to_doc(doc, markdown_content, website_url, table_data=None):
             paragraph = doc.add_paragraph(style='List Bullet')
             format_text_in_paragraph(paragraph, stripped_line.lstrip('* ').strip())
         
-        # Handle Paragraphs (and URL insertion)
+        # Handle Paragraphs (the Website URL is inserted by render_sections_to_doc)
         elif stripped_line:
-            if stripped_line.startswith("## 1. Client Overview & Core Strategy") and not url_inserted:
-                # Insert the URL right below the main section header
-                doc.add_paragraph(f"Website: {website_url}", style='Intense Quote')
-                url_inserted = True
-
             paragraph = doc.add_paragraph()
             format_text_in_paragraph(paragraph, stripped_line)
 
+    # Flush a table that runs to the end of the content
+    if in_table:
+        create_word_table(doc, table_lines)
 
-# --- 3. Main Audit Orchestration Function ---
-def run_master_audit(openai_client, client_name: str, website_url: str, g_clients, output_folder_id: str):
+
+def render_sections_to_doc(doc, sections, website_url, table_data=None):
+    """Renders a parsed SectionIndex (see audit_sections) section by section."""
+    if sections.preamble:
+        parse_markdown_to_doc(doc, sections.preamble, website_url, table_data=table_data)
+    for section in sections.sections:
+        parse_markdown_to_doc(doc, section.heading, website_url, table_data=table_data)
+        if section.key == "overview":
+            # Insert the URL right below the main section header
+            doc.add_paragraph(f"Website: {website_url}", style='Intense Quote')
+        parse_markdown_to_doc(doc, section.body, website_url, table_data=table_data)
+
+
+# --- 3. Audit Stage Helpers ---
+# Each stage is a plain function so the interactive pipeline (run_master_audit)
+# and the offline batch mode (batch_audit.py) share the same prompts and parsing.
+
+# Primary models per stage; model_router may pick a fallback per call (see config.MODEL_ROUTES).
+COMPETITOR_JSON_MODEL = config.MODEL_ROUTES["competitor_json"]["models"][0]
+MASTER_AUDIT_MODEL = config.MODEL_ROUTES["master_audit"]["models"][0] # Use a capable model for this critical task
+
+# This is a placeholder; in a real app, this might come from a CRM or an earlier step.
+DEFAULT_BUSINESS_TYPE = "Digital Marketing & Full-Service Agency"
+
+FALLBACK_VIDEO_PROMPT_DESCRIPTION = "A strategic video recommendation emphasizing digital growth and marketing excellence."
+
+
+def gather_audit_inputs(client_name: str, website_url: str):
     """
-    Executes the full marketing audit pipeline: scraping, gathering data, 
-    AI generation, document creation, and upload.
+    Runs the non-LLM research stages (scrape, Pagespeed, SEO snapshot, competitors).
+    Returns a dict of raw inputs, or None on a critical failure.
+    Successful results are kept as artifacts until their TTL runs out.
     """
-    print(f"[DEBUG] Starting full audit for: {client_name} ({website_url})")
-
     # --- 1. Scrape Website Content ---
     print("\n[DEBUG] 🌐 Scrapping client website content...")
-    client_text = web_scrapper.scrape_webpage(website_url)
+    client_text = artifact_store.cached_stage(
+        "scrape", {"url": website_url}, lambda: web_scrapper.scrape_webpage(website_url), client_name,
+        keep=lambda text: bool(text) and not text.startswith("Scrape failed"),
+    )
 
     if client_text.startswith("Scrape failed"):
         print(f" ❌ Fatal: Failed to scrape client website. Scraper output: {client_text}")
-        return None, None, None
+        return None
     
     print(" ✅ Website content extracted successfully.")
     #### TESTING
     print(f"client_text: {client_text}")
     # --- 2. Technical & Pagespeed Analysis ---
     print("\n[DEBUG] ⚙️ Running Pagespeed/Technical Analysis...")
-    pagespeed_scores = tools.get_pagespeed_insights(website_url) 
+    def run_pagespeed():
+        if deadline.can_afford(PAGESPEED_TYPICAL_SECONDS + _llm_budget("master_audit")):
+            return tools.get_pagespeed_insights(website_url)
+        # Optional input: drop it rather than risk the master audit
+        return "Error: skipped, not enough time left in the audit budget."
+
+    pagespeed_scores = artifact_store.cached_stage(
+        "pagespeed", {"url": website_url}, run_pagespeed, client_name, keep=lambda scores: "Error" not in scores
+    )
     
     if "Error" in pagespeed_scores:
         print(f" ❌ Fatal: Failed to get Pagespeed data. Output: {pagespeed_scores}")
@@ -137,144 +207,390 @@ def run_master_audit(openai_client, client_name: str, website_url: str, g_client
     
     # --- 3. Gather SEO Snapshot (Serper) ---
     print("\n[DEBUG] 🔎 Gathering SEO snapshot...")
-    seo_snapshot = tools.get_seo_snapshot(website_url, client_name)
+    seo_snapshot = artifact_store.cached_stage(
+        "seo_snapshot", {"url": website_url, "client_name": client_name},
+        lambda: tools.get_seo_snapshot(website_url, client_name), client_name,
+        keep=lambda snapshot: not snapshot.startswith("Error"),
+    )
     
     if seo_snapshot.startswith("Error"):
         print(f" ❌ Fatal: Failed to get SEO snapshot. Output: {seo_snapshot}")
-        return None, None, None # Critical failure
+        return None # Critical failure
     
     print(" ✅ SEO snapshot generated successfully.")
     
-    # --- 4. Gather Competitor Data (Serper + AI Analysis) ---
+    # --- 4. Gather Competitor Data (Serper) ---
     print("\n[DEBUG] 🤝 Finding and analyzing competitors...")
-    
-    # 4.1 Get Raw Competitors
-    competitors_data = tools.get_competitors(client_name)
+    competitors_data = artifact_store.cached_stage(
+        "competitors", {"client_name": client_name}, lambda: tools.get_competitors(client_name), client_name,
+        keep=lambda data: not data.startswith("Error"),
+    )
     
     if competitors_data.startswith("Error"):
         print(f" ❌ Fatal: Failed to find competitors. Output: {competitors_data}")
-        return None, None, None # Critical failure
+        return None # Critical failure
     
     print(f"  Found raw competitors for AI analysis: {competitors_data[:100]}...")
 
-    # 4.2 Generate JSON Table for Competitor Comparison (Strict output)
-    try:
-        table_completion = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": prompts.SYSTEM_PROMPT_AUDIT},
-                {"role": "user", "content": prompts.USER_PROMPT_COMPETITOR_JSON.format(competitor_data=competitors_data)}
-            ]
-        )
-        table_json_str = table_completion.choices[0].message.content
-        table_json = json.loads(table_json_str)
-        print("  ✅ Competitor Comparison Table (JSON) Generated.")
-    except Exception as e:
-        print(f"  ❌ AI Table Generation Error: {e}")
-        table_json = None # Fallback to no table if generation fails
-        print("  ⚠️ Continuing without the comparison table.")
+    return {
+        "client_text": client_text,
+        "pagespeed_scores": pagespeed_scores,
+        "seo_snapshot": seo_snapshot,
+        "competitors_data": competitors_data,
+    }
 
-    # 4.3 Generate long-form summary (for main doc)
-    # The competitor_data is used in the main prompt as the long-form analysis.
 
-    # --- 5. Determine Business Type ---
-    # This is a placeholder; in a real app, this might come from a CRM or an earlier step.
-    business_type = "Digital Marketing & Full-Service Agency"
-    print(f"\n[DEBUG] Business Type assumed: {business_type}")
+def build_competitor_json_request(competitors_data: str) -> dict:
+    """Chat-completion arguments for the strict competitor comparison table."""
+    return {
+        "model": COMPETITOR_JSON_MODEL,
+        "response_format": {"type": "json_object"},
+        "messages": [
+            {"role": "system", "content": prompts.SYSTEM_PROMPT_AUDIT},
+            {"role": "user", "content": prompts.USER_PROMPT_COMPETITOR_JSON.format(competitor_data=competitors_data)}
+        ],
+    }
 
-    # --- 6. AI Master Document Generation (GPT-4) ---
-    print("\n[DEBUG] 🧠 Generating Master Audit Document via AI...")
-    
-    master_prompt_data = {
+
+def build_master_prompt_data(client_name: str, inputs: dict, table_json) -> dict:
+    """Fills the USER_PROMPT_MASTER_AUDIT placeholders from the gathered inputs."""
+    business_type = DEFAULT_BUSINESS_TYPE
+    print(f"\n[DEBUG] Business Type assumed: {business_type}")
+    return {
         "client_name": client_name,
-        "client_text": client_text,
-        "seo_snapshot": seo_snapshot,
-        "competitor_data": json.dumps(table_json, indent=2) if table_json else competitors_data, # Use table JSON or raw data
-        "pagespeed_scores": pagespeed_scores,
+        "client_text": inputs["client_text"],
+        "seo_snapshot": inputs["seo_snapshot"],
+        "competitor_data": json.dumps(table_json, indent=2) if table_json else inputs["competitors_data"], # Use table JSON or raw data
+        "pagespeed_scores": inputs["pagespeed_scores"],
         "business_type": business_type
     }
 
-    try:
-        completion = openai_client.chat.completions.create(
-            model="gpt-4o-mini", # Use a capable model for this critical task
-            messages=[
-                {"role": "system", "content": prompts.SYSTEM_PROMPT_AUDIT},
-                {"role": "user", "content": prompts.USER_PROMPT_MASTER_AUDIT.format(**master_prompt_data)}
-            ]
-        )
-        master_document_content = completion.choices[0].message.content
-        print("  ✅ Master Audit Document Generated.")
-    except Exception as e:
-        print(f"  ❌ AI Generation Error: {e}")
-        return None, None, None
 
-    # --- 7. Extract Summary and Video Prompt (from the generated document) ---
-    
-    # 7.1 Extract Website Summary (The main body of text)
-    # Simple extraction: everything after the first header and before the last section
-    try:
-        # Find the content related to the core value prop/summary, which is usually at the start.
-        summary_match = master_document_content.split("## 1. Client Overview & Core Strategy", 1)[1]
-        website_summary = summary_match.split("##", 1)[0].strip()
+def build_master_audit_request(master_prompt_data: dict) -> dict:
+    """Chat-completion arguments for the long-form master audit document."""
+    return {
+        "model": MASTER_AUDIT_MODEL,
+        "messages": [
+            {"role": "system", "content": prompts.SYSTEM_PROMPT_AUDIT},
+            {"role": "user", "content": prompts.USER_PROMPT_MASTER_AUDIT.format(**master_prompt_data)}
+        ],
+    }
+
+
+def extract_audit_outputs(sections):
+    """
+    Reads the website summary and the video prompt description from the parsed
+    master document (an audit_sections.SectionIndex).
+    Returns (website_summary, video_prompt_description).
+    """
+    # 7.1 Extract Website Summary (Client Overview & Core Strategy)
+    website_summary = sections.body("overview")
+    if website_summary:
         #### TESTING
         print(f"website summary: \n{website_summary}")
         print("  ✅ Extracted Website Summary.")
-    except:
+    else:
         # Fallback to the first 500 chars if structured extraction fails
-        website_summary = master_document_content[:500] 
+        website_summary = sections.to_markdown()[:500]
         print("  ⚠️ Falling back to simple summary extraction.")
 
-    # 7.2 Extract Video Prompt Description (The final recommendation/call to action)
-    # Check if the expected section header is present
-    expected_video_section = "## 4. Video Strategy Recommendation"
+    # 7.2 Extract Video Prompt Description (Video Strategy Recommendation)
+    video_prompt_description = sections.body("video_strategy")
+    if video_prompt_description:
+        print("  ✅ Extracted Video Prompt Description.")
+    else:
+        video_prompt_description = FALLBACK_VIDEO_PROMPT_DESCRIPTION
+        print("  ⚠️ Falling back to generic video prompt description (Structured section not found).")
+
+    return website_summary, video_prompt_description
+
+
+def build_audit_docx(client_name: str, website_url: str, sections, table_json):
+    """Builds the python-docx Document for the parsed master document (audit_sections.SectionIndex)."""
+    return docx_renderer.render_audit_document(client_name, website_url, sections)
+
+
+def build_audit_docx_legacy(client_name: str, website_url: str, sections, table_json):
+    """
+    The original line-by-line renderer. docx_renderer must produce the same
+    package byte for byte; tests/test_docx_renderer.py checks that.
+    """
+    doc = Document()
+    doc.add_heading(f'MASTER MARKETING AUDIT: {client_name}', 0).alignment = WD_ALIGN_PARAGRAPH.CENTER
+    # Parse content, handling the table
+    render_sections_to_doc(doc, sections, website_url, table_data=table_json)
+    return doc
+
+
+def render_audit_docx(client_name: str, website_url: str, sections, table_json):
+    """
+    Renders the DOCX into memory and returns its bytes (None on failure); nothing touches the disk.
+    With a process pool configured (process_pool.CPU_WORKERS) the rendering runs in a worker.
+    """
     try:
-        if expected_video_section in master_document_content:
-            video_prompt_description = master_document_content.split(expected_video_section, 1)[1].strip()
-            # Ensure we only take text up to the next potential section or end of document
-            if "## " in video_prompt_description:
-                 video_prompt_description = video_prompt_description.split("## ", 1)[0].strip()
-            
-            print("  ✅ Extracted Video Prompt Description.")
+        if process_pool.workers():
+            docx_bytes = process_pool.run_cpu(
+                render_audit_docx_from_blob, client_name, website_url,
+                process_pool.Blob(sections.to_markdown()), table_json, stage="docx render",
+            )
         else:
-            # Fallback for structured extraction failure
-            video_prompt_description = "A strategic video recommendation emphasizing digital growth and marketing excellence."
-            print("  ⚠️ Falling back to generic video prompt description (Structured section not found).")
-
+            buffer = io.BytesIO()
+            build_audit_docx(client_name, website_url, sections, table_json).save(buffer)
+            docx_bytes = buffer.getvalue()
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
-        # Catch unexpected errors during split/extraction
-        video_prompt_description = "A strategic video recommendation emphasizing digital growth and marketing excellence."
-        print(f"  ⚠️ Falling back to generic video prompt description (Error during extraction: {e}).")
+        print(f"  ❌ Doc Render Error: {e}")
+        return None
+    print(f"  ✅ Rendered doc in memory ({len(docx_bytes)} bytes)")
+    return docx_bytes
 
-        #### TESTING
-        print(f"video_prompt_description: \n{video_prompt_description}")
-        
 
-    # --- 8. Save & Upload ---
-    filename = f"{client_name} - MASTER MARKETING AUDIT.docx"
-    if not os.path.exists("temp_outputs"): os.makedirs("temp_outputs")
-    local_path = os.path.join("temp_outputs", filename)
+def render_audit_docx_from_blob(client_name: str, website_url: str, document_blob, table_json) -> bytes:
+    # Process-pool entry point: the master document arrives as markdown in a process_pool.Blob
+    sections = audit_sections.parse_master_document(document_blob.text())
+    buffer = io.BytesIO()
+    build_audit_docx(client_name, website_url, sections, table_json).save(buffer)
+    return buffer.getvalue()
 
+
+def save_audit_docx(client_name: str, website_url: str, sections, table_json, local_path: str) -> bool:
+    """Renders the parsed master document into a DOCX file at local_path (file-based path, e.g. for debugging)."""
     try:
-        doc = Document()
-        doc.add_heading(f'MASTER MARKETING AUDIT: {client_name}', 0).alignment = WD_ALIGN_PARAGRAPH.CENTER
-        # Parse content, handling the table
-        parse_markdown_to_doc(doc, master_document_content, website_url, table_data=table_json) 
-        
-        doc.save(local_path)
+        build_audit_docx(client_name, website_url, sections, table_json).save(local_path)
         print(f"  ✅ Saved local doc: {local_path}")
+        return True
     except Exception as e:
         print(f"  ❌ Doc Save Error: {e}")
-        return None, None, None
+        return False
+
+
+def audit_docx_filename(client_name: str) -> str:
+    return f"{client_name} - MASTER MARKETING AUDIT.docx"
 
+
+def upload_audit_docx(g_clients, local_path: str, filename: str, output_folder_id: str):
+    """Uploads the saved DOCX as a Google Doc and removes the local copy. Returns the Drive link."""
     # Upload: FIX APPLIED HERE -> Changed 'upload_docx' to 'upload_file_to_drive'
-    audit_link = g_clients.upload_file_to_drive(local_path, filename, output_folder_id)
+    try:
+        with circuit_breaker.breaker("drive").guard() as call:
+            audit_link = g_clients.upload_file_to_drive(local_path, filename, output_folder_id)
+            if not audit_link:
+                call.fail("upload returned no link")
+    except circuit_breaker.CircuitOpenError as e:
+        print(f"  ⛔ Skipping Drive upload, keeping {local_path}: {e}")
+        return None
 
     # Clean up local file
     try:
         os.remove(local_path)
     except Exception as e:
         print(f"  ⚠️ Warning: Could not remove local file {local_path}: {e}")
+
+    return audit_link
+
+
+def keep_local_docx(docx_bytes: bytes, filename: str, directory: str = LOCAL_DOCX_DIR) -> str:
+    """
+    Writes an in-memory DOCX to disk under a unique name (two audits of the
+    same client must not overwrite each other) and returns the path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    stem, ext = os.path.splitext(filename)
+    local_path = os.path.join(directory, f"{stem} - {uuid.uuid4().hex[:8]}{ext}")
+    with open(local_path, "wb") as f:
+        f.write(docx_bytes)
+    return local_path
+
+
+def upload_audit_docx_bytes(g_clients, docx_bytes: bytes, filename: str, output_folder_id: str):
+    """
+    Uploads the in-memory DOCX as a Google Doc. Returns the Drive link, or None
+    (the document is then kept under LOCAL_DOCX_DIR so it isn't lost).
+    """
+    try:
+        with circuit_breaker.breaker("drive").guard() as call:
+            audit_link = g_clients.upload_bytes_to_drive(docx_bytes, filename, output_folder_id)
+            if not audit_link:
+                call.fail("upload returned no link")
+    except circuit_breaker.CircuitOpenError as e:
+        print(f"  ⛔ Skipping Drive upload, kept {keep_local_docx(docx_bytes, filename)}: {e}")
+        return None
+    if not audit_link:
+        print(f"  ⚠️ Upload failed, kept {keep_local_docx(docx_bytes, filename)}")
+    return audit_link
+
+
+# --- 4. Main Audit Orchestration Function ---
+def run_master_audit(openai_client, client_name: str, website_url: str, g_clients, output_folder_id: str,
+                     checkpoint=None, incremental=False):
+    """
+    Executes the full marketing audit pipeline: scraping, gathering data, 
+    AI generation, document creation, and upload.
+    output_folder_id may be a callable that resolves the folder at upload time.
+    The whole run shares AUDIT_DEADLINE_SECONDS; optional stages are skipped
+    when the remaining budget can't cover them.
+    checkpoint, when given, is an object with load(stage) -> value or None and
+    save(stage, value); finished stages are saved to it and a rerun picks them
+    up instead of redoing them (see batch_runner).
+    With incremental=True and an earlier audit on record, only the sections
+    whose inputs changed are regenerated (see incremental_audit).
+    """
+    with deadline.deadline_context(AUDIT_DEADLINE_SECONDS, f"audit {client_name}"):
+        try:
+            return _run_master_audit_stages(
+                openai_client, client_name, website_url, g_clients, output_folder_id, checkpoint, incremental
+            )
+        except deadline.DeadlineExceeded as e:
+            print(f"  ⏱️ Audit stopped: {e}")
+            return None, None, None
+
+
+# Stages a checkpoint records, in pipeline order
+STAGE_INPUTS = "inputs"
+STAGE_COMPETITOR_TABLE = "competitor_table"
+STAGE_MASTER_DOCUMENT = "master_document"
+STAGE_AUDIT_LINK = "audit_link"
+
+
+def _checkpointed(checkpoint, stage: str, compute):
+    """Returns the stage's saved value, or computes it and saves it (None results aren't saved)."""
+    if checkpoint is not None:
+        value = checkpoint.load(stage)
+        if value is not None:
+            print(f"  ↻ Reusing checkpointed stage: {stage}")
+            return value
+    value = compute()
+    if checkpoint is not None and value is not None:
+        checkpoint.save(stage, value)
+    return value
+
+
+def _run_master_audit_stages(openai_client, client_name: str, website_url: str, g_clients, output_folder_id: str,
+                             checkpoint=None, incremental=False):
+    print(f"[DEBUG] Starting full audit for: {client_name} ({website_url})")
+
+    inputs = _checkpointed(checkpoint, STAGE_INPUTS, lambda: gather_audit_inputs(client_name, website_url))
+    if not inputs:
+        return None, None, None
+
+    table_json = _checkpointed(
+        checkpoint, STAGE_COMPETITOR_TABLE, lambda: generate_competitor_table(openai_client, inputs, client_name)
+    )
+
+    # --- 6. AI Master Document Generation (GPT-4) ---
+    master_prompt_data = build_master_prompt_data(client_name, inputs, table_json)
+    reaudit_plan = incremental_audit.plan_reaudit(client_name, website_url, inputs) if incremental else None
+
+    def master_document():
+        if reaudit_plan:
+            return incremental_audit.regenerate_document(openai_client, reaudit_plan, master_prompt_data, client_name)
+        return generate_master_document(openai_client, master_prompt_data, client_name)
+
+    master_document_content = _checkpointed(checkpoint, STAGE_MASTER_DOCUMENT, master_document)
+    if master_document_content is None:
+        return None, None, None
+
+    # --- 7. Parse Sections, Repair Gaps, Extract Summary and Video Prompt ---
+    sections = audit_sections.parse_master_document(master_document_content)
+    missing = sections.missing()
+    if missing and deadline.can_afford(_llm_budget("section_repair") + UPLOAD_RESERVE_SECONDS):
+        repair_request = audit_sections.build_section_repair_request(sections, master_prompt_data, missing)
+        repaired_document = artifact_store.cached_stage(
+            "section_repair", repair_request, lambda: _repair_to_markdown(openai_client, sections, master_prompt_data),
+            client_name,
+        )
+        if repaired_document:
+            sections = audit_sections.parse_master_document(repaired_document)
+        if checkpoint is not None:
+            checkpoint.save(STAGE_MASTER_DOCUMENT, sections.to_markdown())
+    elif missing:
+        print(f"  ⏱️ Skipping section repair (not enough time left); missing: {', '.join(missing)}")
+    website_summary, video_prompt_description = extract_audit_outputs(sections)
+    document_markdown = sections.to_markdown()  # what the next re-audit builds on (no changes section)
+    if reaudit_plan:
+        sections.sections.insert(0, incremental_audit.changes_section(reaudit_plan))
+
+    audit_link = checkpoint.load(STAGE_AUDIT_LINK) if checkpoint is not None else None
+    if audit_link:
+        print(f"  ↻ Reusing checkpointed stage: {STAGE_AUDIT_LINK}")
+        return audit_link, website_summary, video_prompt_description
+
+    # --- 8. Render & Upload (in memory; no temp file to collide on or clean up) ---
+    filename = audit_docx_filename(client_name)
+    docx_bytes = render_audit_docx(client_name, website_url, sections, table_json)
+    if docx_bytes is None:
+        return None, None, None
+    if AUDIT_DOCX_DEBUG_DIR:
+        print(f"  [Debug] Wrote {keep_local_docx(docx_bytes, filename, AUDIT_DOCX_DEBUG_DIR)}")
+
+    deadline.check("audit upload")
+    output_folder_id = _resolve_output_folder(output_folder_id)
+    if not output_folder_id:
+        print(f"  ⛔ Skipping Drive upload (no report folder), kept {keep_local_docx(docx_bytes, filename)}")
+        return None, website_summary, video_prompt_description
+    # Keyed by everything the rendered document depends on, so a rerun doesn't upload the same report twice
+    upload_inputs = {
+        "client_name": client_name, "website_url": website_url, "document": sections.to_markdown(),
+        "table": table_json, "filename": filename, "folder_id": output_folder_id,
+    }
+    audit_link = artifact_store.cached_stage(
+        "upload", upload_inputs, lambda: upload_audit_docx_bytes(g_clients, docx_bytes, filename, output_folder_id),
+        client_name,
+    )
+    if audit_link:
+        incremental_audit.record_audit(client_name, website_url, inputs, document_markdown, audit_link)
+    if audit_link and checkpoint is not None:
+        checkpoint.save(STAGE_AUDIT_LINK, audit_link)
         
     # Return outputs needed for the next phase (video generation)
-    return audit_link, website_summary, video_prompt_description
\ No newline at end of file
+    return audit_link, website_summary, video_prompt_description
+
+
+def _repair_to_markdown(openai_client, sections, master_prompt_data: dict):
+    # Repairs sections in place; the repaired document only when nothing is left missing
+    still_missing = audit_sections.repair_missing_sections(openai_client, sections, master_prompt_data)
+    return None if still_missing else sections.to_markdown()
+
+
+def generate_competitor_table(openai_client, inputs: dict, client_name: str = None):
+    """4.2 The competitor comparison table (strict JSON), or None; the table is optional."""
+    request = build_competitor_json_request(inputs["competitors_data"])
+    return artifact_store.cached_stage(
+        "competitor_table", request, lambda: _generate_competitor_table(openai_client, request), client_name
+    )
+
+
+def _generate_competitor_table(openai_client, request: dict):
+    try:
+        # The table is optional; only build it if the master audit still fits afterwards
+        deadline.require("competitor table", _llm_budget("competitor_json") + _llm_budget("master_audit"))
+        table_completion, _ = model_router.routed_completion(openai_client, "competitor_json", **request)
+        table_json_str = table_completion.choices[0].message.content
+        table_json = json.loads(table_json_str)
+        print("  ✅ Competitor Comparison Table (JSON) Generated.")
+    except Exception as e:
+        print(f"  ❌ AI Table Generation Error: {e}")
+        table_json = None # Fallback to no table if generation fails
+        print("  ⚠️ Continuing without the comparison table.")
+    return table_json
+
+
+def generate_master_document(openai_client, master_prompt_data: dict, client_name: str = None):
+    """6. The master audit markdown, or None when generation fails."""
+    request = build_master_audit_request(master_prompt_data)
+    return artifact_store.cached_stage(
+        "master_document", request, lambda: _generate_master_document(openai_client, request), client_name
+    )
+
+
+def _generate_master_document(openai_client, request: dict):
+    print("\n[DEBUG] 🧠 Generating Master Audit Document via AI...")
+    try:
+        completion, _ = model_router.routed_completion(openai_client, "master_audit", **request)
+        master_document_content = completion.choices[0].message.content
+        print("  ✅ Master Audit Document Generated.")
+        return master_document_content
+    except Exception as e:
+        print(f"  ❌ AI Generation Error: {e}")
+        return None
@@ -0,0 +1,221 @@
+# audit_sections.py
+# Parses the master audit markdown once into a section index that both the DOCX
+# renderer and the video stage read from. Sections are found by their
+# <!-- section: key --> markers first, then by a tolerant heading matcher, so
+# small drifts in heading text no longer lose a section. Missing sections can be
+# regenerated with one targeted repair call instead of a whole new document.
+import re
+import difflib
+from dataclasses import dataclass, field
+
+import prompts
+import model_router
+
+SECTION_MARKER_RE = re.compile(r"^<!--\s*section\s*:\s*([a-z_]+)\s*-->$", re.IGNORECASE)
+HEADING_RE = re.compile(r"^(#{1,6})\s*(.*?)\s*#*$")
+# Fuzzy (difflib) floor for headings no alias phrase appears in: high enough for
+# typos ("Competitve Landscape"), not for headings that only share a word or two
+HEADING_MATCH_THRESHOLD = 0.75
+
+SECTION_TITLES = dict(prompts.MASTER_AUDIT_SECTIONS)
+SECTION_ORDER = [key for key, _ in prompts.MASTER_AUDIT_SECTIONS]
+
+# Extra phrases the model tends to use instead of the canonical headings
+SECTION_ALIASES = {
+    "overview": ["client overview", "core strategy", "business overview", "company overview"],
+    "website": ["website audit", "website performance", "technical audit", "ux speed mobile"],
+    "seo": ["seo and content", "content strategy", "seo strategy"],
+    "competitive": ["competitive landscape", "competitor analysis", "competition"],
+    "summary": ["summary and next steps", "next steps", "strategic priorities", "executive summary", "summary"],
+    "video_strategy": ["video strategy", "video recommendation", "video concept", "video content strategy"],
+}
+
+
+def _normalize_heading(text: str) -> str:
+    text = text.lower().replace("&", " and ")
+    text = re.sub(r"^\s*(section\s+)?\d+[\.\):]?\s*", "", text)  # drop "1." / "Section 1:" numbering
+    text = re.sub(r"[^a-z0-9 ]+", " ", text)
+    return " ".join(text.split())
+
+
+_CANONICAL = {key: _normalize_heading(title.lstrip("# ")) for key, title in prompts.MASTER_AUDIT_SECTIONS}
+
+
+def match_section_key(heading_text: str):
+    """
+    Maps a (possibly drifted) heading to a section key, or None if nothing is close enough.
+    The longest canonical or alias phrase found in the heading wins, so a specific
+    phrase ("video content strategy") beats a generic one inside it ("content
+    strategy"); headings containing none fall back to the closest fuzzy match.
+    """
+    normalized = _normalize_heading(heading_text)
+    if not normalized:
+        return None
+    padded = f" {normalized} "
+    best_key, best_length = None, 0
+    best_fuzzy_key, best_score = None, 0.0
+    for key in SECTION_ORDER:
+        phrases = [_CANONICAL[key]] + SECTION_ALIASES.get(key, [])
+        for phrase in phrases:
+            if f" {phrase} " in padded:
+                if len(phrase) > best_length:
+                    best_key, best_length = key, len(phrase)
+                continue
+            score = difflib.SequenceMatcher(None, normalized, phrase).ratio()
+            if score > best_score:
+                best_fuzzy_key, best_score = key, score
+    if best_key:
+        return best_key
+    return best_fuzzy_key if best_score >= HEADING_MATCH_THRESHOLD else None
+
+
+@dataclass
+class Section:
+    key: str  # None for level-2 sections outside the contract
+    heading: str  # heading line as written, e.g. "## 1. Client Overview & Core Strategy"
+    body: str  # markdown below the heading, up to the next section
+
+    def to_markdown(self) -> str:
+        lines = []
+        if self.key:
+            lines.append(f"<!-- section: {self.key} -->")
+        lines.append(self.heading)
+        if self.body:
+            lines.append(self.body)
+        return "\n".join(lines)
+
+
+@dataclass
+class SectionIndex:
+    preamble: str = ""  # text before the first section (document title)
+    sections: list = field(default_factory=list)
+
+    def get(self, key):
+        for section in self.sections:
+            if section.key == key:
+                return section
+        return None
+
+    def body(self, key) -> str:
+        section = self.get(key)
+        return section.body.strip() if section else ""
+
+    def missing(self, keys=None):
+        keys = keys or SECTION_ORDER
+        return [key for key in keys if not self.body(key)]
+
+    def set_section(self, section: Section):
+        """Replaces a section by key, or inserts it at its canonical position."""
+        for i, existing in enumerate(self.sections):
+            if existing.key == section.key:
+                self.sections[i] = section
+                return
+        position = SECTION_ORDER.index(section.key)
+        for i, existing in enumerate(self.sections):
+            if existing.key in SECTION_ORDER and SECTION_ORDER.index(existing.key) > position:
+                self.sections.insert(i, section)
+                return
+        self.sections.append(section)
+
+    def to_markdown(self) -> str:
+        parts = [self.preamble.strip()] if self.preamble.strip() else []
+        parts.extend(section.to_markdown() for section in self.sections)
+        return "\n\n".join(parts) + "\n"
+
+
+def parse_master_document(markdown: str) -> SectionIndex:
+    """Splits the master document into sections at level-2 headings (or section markers)."""
+    index = SectionIndex()
+    preamble_lines = []
+    current = None
+    current_lines = []
+    pending_marker = None
+    seen = set()
+
+    def close_current():
+        if current is not None:
+            current.body = "\n".join(current_lines).strip()
+            index.sections.append(current)
+
+    for line in markdown.split("\n"):
+        stripped = line.strip()
+
+        marker = SECTION_MARKER_RE.match(stripped)
+        if marker:
+            pending_marker = marker.group(1).lower()
+            continue
+
+        heading = HEADING_RE.match(stripped)
+        if heading and len(heading.group(1)) == 2:
+            key = pending_marker if pending_marker in SECTION_TITLES else match_section_key(heading.group(2))
+            if key in seen:
+                key = None  # duplicate heading: keep the text, index the first one only
+            close_current()
+            current = Section(key=key, heading=stripped, body="")
+            current_lines = []
+            pending_marker = None
+            if key:
+                seen.add(key)
+            continue
+
+        pending_marker = None
+        if current is None:
+            preamble_lines.append(line)
+        else:
+            current_lines.append(line)
+
+    close_current()
+    index.preamble = "\n".join(preamble_lines).strip()
+    return index
+
+
+# --- Targeted repair ---
+def build_section_repair_request(index: SectionIndex, master_prompt_data: dict, missing_keys) -> dict:
+    """Chat-completion arguments that regenerate only the missing sections."""
+    missing_sections = "\n".join(f"<!-- section: {key} -->\n{SECTION_TITLES[key]}" for key in missing_keys)
+    return {
+        "model": model_router.router.routes["section_repair"]["models"][0],
+        "messages": [
+            {"role": "system", "content": prompts.SYSTEM_PROMPT_AUDIT},
+            {"role": "user", "content": prompts.USER_PROMPT_SECTION_REPAIR.format(
+                client_name=master_prompt_data["client_name"],
+                missing_sections=missing_sections,
+                original_prompt=prompts.USER_PROMPT_MASTER_AUDIT.format(**master_prompt_data),
+                current_document=index.to_markdown(),
+            )},
+        ],
+    }
+
+
+def apply_section_repair(index: SectionIndex, repair_markdown: str, missing_keys):
+    """Splices repaired sections into the index. Returns the keys that are still missing."""
+    repaired = parse_master_document(repair_markdown)
+    for key in missing_keys:
+        section = repaired.get(key)
+        if section is None and len(missing_keys) == 1 and repaired.preamble and not repaired.sections:
+            # Model returned just the body; wrap it under the canonical heading
+            section = Section(key=key, heading=SECTION_TITLES[key], body=repaired.preamble)
+        if section is not None and section.body.strip():
+            index.set_section(Section(key=key, heading=SECTION_TITLES[key], body=section.body))
+    return index.missing(missing_keys)
+
+
+def repair_missing_sections(openai_client, index: SectionIndex, master_prompt_data: dict, required_keys=None):
+    """Regenerates missing sections with one targeted call. Returns the keys still missing."""
+    missing = index.missing(required_keys)
+    if not missing:
+        return []
+    print(f"  🔧 Repairing missing section(s): {', '.join(missing)}")
+    try:
+        completion, _ = model_router.routed_completion(
+            openai_client, "section_repair", **build_section_repair_request(index, master_prompt_data, missing)
+        )
+        still_missing = apply_section_repair(index, completion.choices[0].message.content, missing)
+    except Exception as e:
+        print(f"  ❌ Section repair failed: {e}")
+        return missing
+    if still_missing:
+        print(f"  ⚠️ Sections still missing after repair: {', '.join(still_missing)}")
+    else:
+        print("  ✅ Missing sections repaired.")
+    return still_missing
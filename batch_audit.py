@@ -0,0 +1,533 @@
+"""
+Offline batch-inference mode for bulk audits.
+
+Instead of one interactive chat-completion call per stage, every client's
+pending LLM request (competitor JSON, master audit, video prompt) is collected
+into a single batch-job JSONL file, submitted in bulk, polled, and each client
+pipeline resumes when its result arrives.
+
+The run directory holds a checkpoint that is rewritten after every state
+change, including right after a batch is submitted, so a crashed or stopped
+run picks up the already-submitted batch instead of paying for it twice.
+
+Usage:
+    python batch_audit.py clients.csv                      # OpenAI Batch API
+    python batch_audit.py clients.csv --local              # local stand-in endpoint, no API cost
+    python batch_audit.py clients.csv --run-dir batch_runs/nightly --no-wait
+"""
+import os
+import sys
+import csv
+import json
+import time
+import uuid
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import audit_research
+import video_generation
+import model_router
+import audit_sections
+import llm_accounting
+import scheduler
+
+BATCH_RUNS_DIR = "batch_runs"
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_POLL_INTERVAL_SECONDS = 60
+GATHER_WORKERS = 4  # concurrent scrape/Pagespeed/Serper stages while preparing a batch
+VIDEO_PROMPT_BATCH_RETRIES = 2  # re-queue a rejected video prompt this many times
+
+# Pipeline stages, in order. "gather" runs locally; the LLM stages go through the batch.
+STAGE_GATHER = "gather"
+STAGE_COMPETITOR_JSON = "competitor_json"
+STAGE_MASTER_AUDIT = "master_audit"
+STAGE_SECTION_REPAIR = "section_repair"
+STAGE_VIDEO_PROMPT = "video_prompt"
+STAGE_DONE = "done"
+STAGE_FAILED = "failed"
+
+FINAL_BATCH_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+# ---------------------------------------------------
+# BATCH ENDPOINTS
+# ---------------------------------------------------
+class OpenAIBatchEndpoint:
+    """Submits batch-job files to the OpenAI Batch API."""
+
+    def __init__(self, openai_client):
+        self.client = openai_client
+
+    def submit(self, jsonl_path: str) -> str:
+        with open(jsonl_path, "rb") as f:
+            batch_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint=CHAT_COMPLETIONS_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW,
+        )
+        return batch.id
+
+    def poll(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def fetch_results(self, batch_id: str) -> dict:
+        """Returns {custom_id: result line} for every finished request in the batch."""
+        batch = self.client.batches.retrieve(batch_id)
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    item = json.loads(line)
+                    results[item["custom_id"]] = item
+        return results
+
+
+class LocalBatchEndpoint:
+    """
+    Local stand-in for the Batch API, for testing the batch pipeline end to end.
+    Requests are answered at submit time by `responder(body) -> content` and the
+    output file is written in the same line format the Batch API returns.
+    """
+
+    def __init__(self, state_dir: str, responder=None):
+        self.state_dir = state_dir
+        self.responder = responder or offline_responder
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    def _output_path(self, batch_id: str) -> str:
+        return os.path.join(self.state_dir, f"{batch_id}.output.jsonl")
+
+    def submit(self, jsonl_path: str) -> str:
+        batch_id = f"local-batch-{uuid.uuid4().hex[:12]}"
+        lines = []
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                try:
+                    content = self.responder(request["body"])
+                    lines.append({
+                        "id": f"local-{uuid.uuid4().hex[:8]}",
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "body": {
+                                "model": request["body"].get("model"),
+                                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                            },
+                        },
+                        "error": None,
+                    })
+                except Exception as e:
+                    lines.append({
+                        "id": f"local-{uuid.uuid4().hex[:8]}",
+                        "custom_id": request["custom_id"],
+                        "response": None,
+                        "error": {"message": str(e)},
+                    })
+        with open(self._output_path(batch_id), "w", encoding="utf-8") as f:
+            for item in lines:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        return batch_id
+
+    def poll(self, batch_id: str) -> str:
+        return "completed" if os.path.exists(self._output_path(batch_id)) else "failed"
+
+    def fetch_results(self, batch_id: str) -> dict:
+        results = {}
+        with open(self._output_path(batch_id), "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    results[item["custom_id"]] = item
+        return results
+
+
+def offline_responder(body: dict) -> str:
+    """Deterministic canned answers per stage so the local endpoint needs no API key."""
+    if body.get("response_format", {}).get("type") == "json_object":
+        return json.dumps({
+            "columns": ["Feature", "Competitor A", "Competitor B", "Competitor C"],
+            "rows": [
+                ["Core Offering", "Offering A", "Offering B", "Offering C"],
+                ["Target Audience", "SMB", "Enterprise", "Consumers"],
+                ["Unique Selling Point", "USP A", "USP B", "USP C"],
+                ["Weakness", "Weakness A", "Weakness B", "Weakness C"],
+            ],
+        })
+    if "video-prompt engineer" in body["messages"][0]["content"]:
+        script = ("We help growing brands turn scattered marketing into clear measurable growth "
+                  "with strategy content and campaigns that actually reach the right customers today.")
+        return json.dumps({
+            "version": "1.4",
+            "video": {"duration_seconds": 12, "style": "UGC selfie vlog", "subject": {"action": "Walks forward."}},
+            "voice_over": {"enabled": True, "script": script, "tone": "professional", "language": "en-US"},
+            "audio_sync": True,
+            "constraints": {"no_on_screen_text": True},
+            "context": {"brand": "Offline Test"},
+        })
+    return (
+        "# Master Marketing Audit: Offline Test\n\n"
+        "## 1. Client Overview & Core Strategy\n* **Business Type:** Offline test run.\n\n"
+        "## 2. Website Audit Summary (UX, Speed, Mobile)\n* Placeholder.\n\n"
+        "## 3. SEO & Content Strategy\n* Placeholder.\n\n"
+        "## 4. Competitive Landscape\n* Placeholder.\n\n"
+        "## 5. Summary & Next Steps\n* Placeholder.\n\n"
+        "## 6. Video Strategy Recommendation\n* Placeholder.\n"
+    )
+
+
+# ---------------------------------------------------
+# CHECKPOINT
+# ---------------------------------------------------
+def load_checkpoint(run_dir: str):
+    path = os.path.join(run_dir, "checkpoint.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(run_dir: str, state: dict):
+    """Atomically rewrites the run checkpoint (write to temp file, then rename)."""
+    path = os.path.join(run_dir, "checkpoint.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_clients_csv(csv_path: str):
+    """Reads client_name,website_url rows from a CSV file."""
+    clients = []
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            name = (row.get("client_name") or "").strip()
+            url = (row.get("website_url") or "").strip()
+            if name and url:
+                clients.append((name, url))
+    return clients
+
+
+def new_run_state(clients):
+    state = {"clients": {}, "batches": []}
+    for i, (client_name, website_url) in enumerate(clients):
+        key = f"c{i:04d}"
+        state["clients"][key] = {
+            "client_name": client_name,
+            "website_url": website_url,
+            "stage": STAGE_GATHER,
+            "attempt": 0,
+        }
+    return state
+
+
+# ---------------------------------------------------
+# PIPELINE STATE MACHINE
+# ---------------------------------------------------
+class BatchAuditRun:
+    """Drives every client through gather -> competitor JSON -> master audit -> video prompt."""
+
+    def __init__(self, run_dir: str, endpoint, g_clients=None, main_folder_id=None):
+        self.run_dir = run_dir
+        self.endpoint = endpoint
+        self.g_clients = g_clients
+        self.main_folder_id = main_folder_id
+        os.makedirs(self.run_dir, exist_ok=True)
+        self.state = load_checkpoint(run_dir)
+
+    def start(self, clients):
+        if self.state:
+            print(f"♻️ Resuming batch run from checkpoint: {self.run_dir}")
+        else:
+            self.state = new_run_state(clients)
+            self._save()
+            print(f"🆕 Started batch run for {len(clients)} client(s): {self.run_dir}")
+
+    def _save(self):
+        save_checkpoint(self.run_dir, self.state)
+
+    # --- Local (non-LLM) stage ---
+    def _gather_one(self, key):
+        entry = self.state["clients"][key]
+        # Pool threads don't inherit the run's context; mark the scrapes as bulk explicitly
+        with scheduler.priority_context(scheduler.BULK):
+            inputs = audit_research.gather_audit_inputs(entry["client_name"], entry["website_url"])
+        return key, inputs
+
+    def run_gather_stage(self):
+        pending = [k for k, c in self.state["clients"].items() if c["stage"] == STAGE_GATHER]
+        if not pending:
+            return
+        print(f"\n[BATCH] 🌐 Gathering inputs for {len(pending)} client(s)...")
+        with ThreadPoolExecutor(max_workers=GATHER_WORKERS) as pool:
+            for key, inputs in pool.map(self._gather_one, pending):
+                entry = self.state["clients"][key]
+                if inputs:
+                    entry["inputs"] = inputs
+                    entry["stage"] = STAGE_COMPETITOR_JSON
+                else:
+                    entry["stage"] = STAGE_FAILED
+                    entry["error"] = "Input gathering failed."
+                self._save()
+
+    # --- Batch request building ---
+    def _request_for(self, entry):
+        stage = entry["stage"]
+        if stage == STAGE_COMPETITOR_JSON:
+            body = audit_research.build_competitor_json_request(entry["inputs"]["competitors_data"])
+        elif stage == STAGE_MASTER_AUDIT:
+            master_prompt_data = audit_research.build_master_prompt_data(
+                entry["client_name"], entry["inputs"], entry.get("table_json")
+            )
+            body = audit_research.build_master_audit_request(master_prompt_data)
+        elif stage == STAGE_SECTION_REPAIR:
+            master_prompt_data = audit_research.build_master_prompt_data(
+                entry["client_name"], entry["inputs"], entry.get("table_json")
+            )
+            body = audit_sections.build_section_repair_request(
+                audit_sections.parse_master_document(entry["master_document"]), master_prompt_data, entry["missing_sections"]
+            )
+        elif stage == STAGE_VIDEO_PROMPT:
+            body = {
+                "model": video_generation.PROMPT_MODEL,
+                "messages": video_generation.build_video_prompt_messages(
+                    entry["client_name"], entry["inputs"]["client_text"][:6000]
+                ),
+            }
+        else:
+            return None
+        # Batch jobs have no latency budget to meet, but input size still decides the model
+        body["model"] = model_router.choose_route(stage, body["messages"], body["model"]).models[0]
+        return body
+
+    def _in_flight_custom_ids(self):
+        ids = set()
+        for batch in self.state["batches"]:
+            if not batch.get("processed"):
+                ids.update(batch["custom_ids"])
+        return ids
+
+    def submit_pending_requests(self):
+        """Writes one batch-job file with every client's next LLM request and submits it."""
+        in_flight = self._in_flight_custom_ids()
+        requests_out = []
+        for key, entry in self.state["clients"].items():
+            body = self._request_for(entry)
+            if body is None:
+                continue
+            custom_id = f"{key}:{entry['stage']}:{entry['attempt']}"
+            if custom_id in in_flight:
+                continue
+            requests_out.append({"custom_id": custom_id, "method": "POST", "url": CHAT_COMPLETIONS_ENDPOINT, "body": body})
+
+        if not requests_out:
+            return None
+
+        batch_no = len(self.state["batches"]) + 1
+        jsonl_path = os.path.join(self.run_dir, f"batch_{batch_no:03d}.jsonl")
+        with open(jsonl_path, "w", encoding="utf-8") as f:
+            for item in requests_out:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+        print(f"\n[BATCH] 📤 Submitting {len(requests_out)} request(s) ({jsonl_path})...")
+        batch_id = self.endpoint.submit(jsonl_path)
+        self.state["batches"].append({
+            "batch_id": batch_id,
+            "file": jsonl_path,
+            "custom_ids": [r["custom_id"] for r in requests_out],
+            "submitted_at": time.time(),
+            "processed": False,
+        })
+        # Checkpoint immediately: a crash from here on must not resubmit this batch
+        self._save()
+        print(f"  ✅ Batch submitted: {batch_id}")
+        return batch_id
+
+    # --- Result handling ---
+    def _handle_result(self, key, entry, result):
+        error = result.get("error")
+        response = result.get("response") or {}
+        if error or response.get("status_code") != 200:
+            raise RuntimeError(f"Batch request failed: {error or response}")
+        content = response["body"]["choices"][0]["message"]["content"]
+
+        stage = entry["stage"]
+        llm_accounting.record_call(
+            stage, response["body"].get("model"), completion=response["body"], job_id=f"batch:{entry['client_name']}"
+        )
+        if stage == STAGE_COMPETITOR_JSON:
+            try:
+                entry["table_json"] = json.loads(content)
+                print(f"  ✅ [{entry['client_name']}] Competitor Comparison Table (JSON) Generated.")
+            except Exception as e:
+                print(f"  ⚠️ [{entry['client_name']}] Continuing without the comparison table: {e}")
+                entry["table_json"] = None
+            entry["stage"] = STAGE_MASTER_AUDIT
+
+        elif stage == STAGE_MASTER_AUDIT:
+            entry["master_document"] = content
+            missing = audit_sections.parse_master_document(content).missing()
+            if missing:
+                # Regenerate only the missing sections in the next batch
+                print(f"  🔧 [{entry['client_name']}] Missing section(s) queued for repair: {', '.join(missing)}")
+                entry["missing_sections"] = missing
+                entry["stage"] = STAGE_SECTION_REPAIR
+            else:
+                self._finish_master_document(entry)
+
+        elif stage == STAGE_SECTION_REPAIR:
+            sections = audit_sections.parse_master_document(entry["master_document"])
+            still_missing = audit_sections.apply_section_repair(sections, content, entry["missing_sections"])
+            if still_missing:
+                print(f"  ⚠️ [{entry['client_name']}] Sections still missing after repair: {', '.join(still_missing)}")
+            entry["master_document"] = sections.to_markdown()
+            self._finish_master_document(entry)
+
+        elif stage == STAGE_VIDEO_PROMPT:
+            try:
+                entry["video_prompt"] = video_generation.enforce_voiceover_rules(content.strip())
+                entry["stage"] = STAGE_DONE
+                print(f"  ✅ [{entry['client_name']}] Video prompt accepted.")
+            except Exception as e:
+                if entry["attempt"] < VIDEO_PROMPT_BATCH_RETRIES:
+                    entry["attempt"] += 1
+                    print(f"  ⚠️ [{entry['client_name']}] Video prompt rejected ({e}); re-queued.")
+                    return
+                raise
+
+        entry["attempt"] = 0
+
+    def _finish_master_document(self, entry):
+        sections = audit_sections.parse_master_document(entry["master_document"])
+        website_summary, video_prompt_description = audit_research.extract_audit_outputs(sections)
+        entry["website_summary"] = website_summary
+        entry["video_prompt_description"] = video_prompt_description
+        entry["audit_link"] = self._save_or_upload_doc(entry, sections)
+        entry["stage"] = STAGE_VIDEO_PROMPT
+
+    def _save_or_upload_doc(self, entry, sections):
+        filename = audit_research.audit_docx_filename(entry["client_name"])
+        local_path = os.path.join(self.run_dir, filename)
+        if not audit_research.save_audit_docx(
+            entry["client_name"], entry["website_url"], sections, entry.get("table_json"), local_path
+        ):
+            return None
+        if not self.g_clients or not self.main_folder_id:
+            return local_path
+
+        sanitized = "".join(c for c in entry["client_name"] if c.isalnum() or c in (' ', '-', '&')).rstrip()
+        client_folder_id = self.g_clients.find_or_create_folder(self.main_folder_id, sanitized)
+        report_folder_id = client_folder_id and self.g_clients.find_or_create_folder(client_folder_id, "01 Marketing Audit Report")
+        if not report_folder_id:
+            print(f"  ⚠️ [{entry['client_name']}] Report folder unavailable; keeping local doc {local_path}")
+            return local_path
+        audit_link = audit_research.upload_audit_docx(self.g_clients, local_path, filename, report_folder_id)
+        self.g_clients.log_to_google_sheet(None, "Batch Audits", {
+            "Tab Name": entry["client_name"],
+            "Document Title": filename,
+            "Drive Link": audit_link or local_path,
+            "Status": "Success" if audit_link else "Upload failed",
+        })
+        return audit_link
+
+    def process_batch(self, batch):
+        results = self.endpoint.fetch_results(batch["batch_id"])
+        for custom_id in batch["custom_ids"]:
+            key, stage, attempt = custom_id.split(":")
+            entry = self.state["clients"][key]
+            if entry["stage"] != stage or str(entry["attempt"]) != attempt:
+                continue  # already advanced (e.g. processed before a crash)
+            result = results.get(custom_id)
+            try:
+                if result is None:
+                    raise RuntimeError("No result returned for request.")
+                self._handle_result(key, entry, result)
+            except Exception as e:
+                print(f"  ❌ [{entry['client_name']}] {stage} failed: {e}")
+                entry["stage"] = STAGE_FAILED
+                entry["error"] = f"{stage}: {e}"
+            self._save()
+        batch["processed"] = True
+        self._save()
+
+    def poll_batches(self, wait: bool, poll_interval: int):
+        """
+        Polls every unprocessed batch. With wait=False each batch is polled once
+        and the run exits if it isn't finished yet (re-run later to resume).
+        """
+        for batch in self.state["batches"]:
+            if batch.get("processed"):
+                continue
+            while True:
+                status = self.endpoint.poll(batch["batch_id"])
+                print(f"[BATCH] ⏳ {batch['batch_id']}: {status}")
+                if status in FINAL_BATCH_STATUSES:
+                    break
+                if not wait:
+                    return False
+                time.sleep(poll_interval)
+            self.process_batch(batch)
+        return True
+
+    def is_finished(self):
+        return all(c["stage"] in (STAGE_DONE, STAGE_FAILED) for c in self.state["clients"].values())
+
+    def run(self, wait=True, poll_interval=BATCH_POLL_INTERVAL_SECONDS):
+        while True:
+            # Pick up batches submitted before a crash first
+            if not self.poll_batches(wait, poll_interval):
+                print("[BATCH] Batch still running. Re-run the same command to resume.")
+                return self.state
+            self.run_gather_stage()
+            if self.is_finished():
+                break
+            if not self.submit_pending_requests():
+                break
+
+        done = sum(1 for c in self.state["clients"].values() if c["stage"] == STAGE_DONE)
+        print(f"\n[BATCH] ✅ Finished: {done}/{len(self.state['clients'])} client(s) completed.")
+        return self.state
+
+
+# ---------------------------------------------------
+# MAIN
+# ---------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run bulk audits through the batch-inference path.")
+    parser.add_argument("csv_path", help="CSV with client_name,website_url columns")
+    parser.add_argument("--run-dir", default=None, help="Run directory (reuse it to resume)")
+    parser.add_argument("--local", action="store_true", help="Use the local stand-in batch endpoint")
+    parser.add_argument("--no-wait", action="store_true", help="Poll once and exit if the batch isn't finished")
+    parser.add_argument("--upload", action="store_true", help="Upload DOCX reports to Google Drive")
+    parser.add_argument("--poll-interval", type=int, default=BATCH_POLL_INTERVAL_SECONDS)
+    args = parser.parse_args()
+
+    run_dir = args.run_dir or os.path.join(BATCH_RUNS_DIR, time.strftime("%Y%m%d-%H%M%S"))
+
+    if args.local:
+        endpoint = LocalBatchEndpoint(os.path.join(run_dir, "local_endpoint"))
+    else:
+        if not config.OPENAI_API_KEY:
+            print("❌ FATAL ERROR: OPENAI_API_KEY not found in .env file.")
+            sys.exit()
+        import openai
+        endpoint = OpenAIBatchEndpoint(openai.OpenAI(api_key=config.OPENAI_API_KEY))
+
+    g_clients = None
+    if args.upload:
+        import google_clients
+        g_clients = google_clients.GoogleClients()
+
+    run = BatchAuditRun(run_dir, endpoint, g_clients=g_clients, main_folder_id=config.MAIN_DRIVE_FOLDER_ID)
+    run.start(read_clients_csv(args.csv_path))
+    with scheduler.priority_context(scheduler.BULK):
+        run.run(wait=not args.no_wait, poll_interval=args.poll_interval)
+    if g_clients:
+        g_clients.flush_logs()
@@ -0,0 +1,319 @@
+"""
+Concurrent audit runner over a client list.
+
+Runs the interactive audit pipeline (audit_main.run_client_audit ->
+audit_research.run_master_audit) for many clients at once, with at most
+--workers audits in flight. Clients come from a CSV (client_name,website_url)
+or from the client Google Sheet (config.SHEET_ID).
+
+Every client has a checkpoint file under <run-dir>/clients/ that records each
+finished pipeline stage (gathered inputs, competitor table, master document,
+uploaded report link). Re-running with the same --run-dir skips clients that
+are done and resumes the others from their last finished stage, so a crashed
+run never pays for the scrapes, LLM calls or uploads it already made.
+
+Usage:
+    python batch_runner.py --csv clients.csv --workers 4
+    python batch_runner.py --sheet                      # tabs of config.SHEET_ID
+    python batch_runner.py --sheet --incremental        # monthly re-audit: only changed sections
+    python batch_runner.py --csv clients.csv --workers 8 --cpu-workers 4
+    python batch_runner.py --csv clients.csv --run-dir audit_runs/20250101-120000   # resume
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import config
+import scheduler
+import process_pool
+import llm_accounting
+from batch_audit import read_clients_csv
+
+AUDIT_RUNS_DIR = "audit_runs"
+DEFAULT_WORKERS = int(os.getenv("BATCH_RUNNER_WORKERS", "3"))
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# Header names accepted for the client columns in the client sheet (lowercased)
+SHEET_NAME_HEADERS = ("client_name", "client name", "client", "business name", "company", "name")
+SHEET_URL_HEADERS = ("website_url", "website url", "website", "url", "site", "domain")
+
+
+# ---------------------------------------------------
+# CLIENT SOURCES
+# ---------------------------------------------------
+def _find_column(header, candidates):
+    normalized = [str(cell).strip().lower() for cell in header]
+    for candidate in candidates:
+        if candidate in normalized:
+            return normalized.index(candidate)
+    return None
+
+
+def read_clients_sheet(g_clients, sheet_id=config.SHEET_ID, tab_names=None):
+    """
+    Reads (client_name, website_url) rows from the client sheet: every tab (or
+    just tab_names) except config.IGNORE_TABS whose header row has a name and
+    a website column.
+    """
+    sheets = g_clients.sheets_service
+    if sheets is None:
+        raise RuntimeError("Sheets service unavailable.")
+    if not tab_names:
+        spreadsheet = sheets.spreadsheets().get(spreadsheetId=sheet_id, fields="sheets.properties.title").execute()
+        tab_names = [s["properties"]["title"] for s in spreadsheet.get("sheets", [])]
+
+    clients = []
+    for tab_name in tab_names:
+        if tab_name in config.IGNORE_TABS:
+            continue
+        escaped = tab_name.replace("'", "''")
+        values = sheets.spreadsheets().values().get(spreadsheetId=sheet_id, range=f"'{escaped}'").execute().get("values", [])
+        if not values:
+            continue
+        name_col = _find_column(values[0], SHEET_NAME_HEADERS)
+        url_col = _find_column(values[0], SHEET_URL_HEADERS)
+        if name_col is None or url_col is None:
+            print(f"  ⚠️ Skipping tab '{tab_name}': no client name / website columns in its header row.")
+            continue
+        for row in values[1:]:
+            name = row[name_col].strip() if len(row) > name_col else ""
+            url = row[url_col].strip() if len(row) > url_col else ""
+            if name and url:
+                clients.append((name, url))
+    return clients
+
+
+def dedupe_clients(clients):
+    """Drops repeated (client_name, website_url) pairs, keeping the first."""
+    seen, unique = set(), []
+    for client in clients:
+        if client not in seen:
+            seen.add(client)
+            unique.append(client)
+    return unique
+
+
+# ---------------------------------------------------
+# CHECKPOINT
+# ---------------------------------------------------
+class ClientCheckpoint:
+    """
+    One client's progress, kept in a JSON file that is rewritten atomically
+    after every stage. Implements the load(stage)/save(stage, value) interface
+    run_master_audit expects.
+    """
+
+    def __init__(self, path: str, client_name: str, website_url: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.state = self._read() or {
+            "client_name": client_name,
+            "website_url": website_url,
+            "status": STATUS_PENDING,
+            "attempts": 0,
+            "stages": {},
+        }
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"  ⚠️ Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+
+    def _write(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def status(self):
+        return self.state["status"]
+
+    def load(self, stage: str):
+        return self.state["stages"].get(stage)
+
+    def save(self, stage: str, value):
+        with self._lock:
+            self.state["stages"][stage] = value
+            self._write()
+
+    def start_attempt(self):
+        with self._lock:
+            self.state["attempts"] += 1
+            self.state["status"] = STATUS_PENDING
+            self.state.pop("error", None)
+            self._write()
+
+    def finish(self, status: str, result: dict = None, error: str = None):
+        with self._lock:
+            self.state["status"] = status
+            if result is not None:
+                self.state["result"] = result
+            if error:
+                self.state["error"] = error
+            self._write()
+
+
+# ---------------------------------------------------
+# RUNNER
+# ---------------------------------------------------
+class BatchRunner:
+    def __init__(self, run_dir: str, clients, audit_fn, workers: int = DEFAULT_WORKERS, retry_failed: bool = False):
+        """
+        audit_fn(client_name, website_url, checkpoint) runs one audit and
+        returns a result dict with an "audit_link" (falsy when it failed).
+        """
+        self.run_dir = run_dir
+        self.audit_fn = audit_fn
+        self.workers = max(1, workers)
+        self.retry_failed = retry_failed
+        self.checkpoints_dir = os.path.join(run_dir, "clients")
+        os.makedirs(self.checkpoints_dir, exist_ok=True)
+        self.checkpoints = [
+            ClientCheckpoint(os.path.join(self.checkpoints_dir, checkpoint_filename(name, url)), name, url)
+            for name, url in clients
+        ]
+        self._progress_lock = threading.Lock()
+        self._finished = 0
+        self._succeeded = 0
+        self._started_at = None
+
+    def pending(self):
+        skip = (STATUS_DONE,) if self.retry_failed else (STATUS_DONE, STATUS_FAILED)
+        return [cp for cp in self.checkpoints if cp.status not in skip]
+
+    def _run_one(self, checkpoint):
+        client_name = checkpoint.state["client_name"]
+        checkpoint.start_attempt()
+        # Pool threads don't inherit the caller's context; set priority and job explicitly
+        with scheduler.priority_context(scheduler.BULK), llm_accounting.job_context(f"audit:{client_name}"):
+            try:
+                result = self.audit_fn(client_name, checkpoint.state["website_url"], checkpoint) or {}
+            except Exception as e:
+                print(f"  ❌ [{client_name}] Audit crashed: {e}")
+                checkpoint.finish(STATUS_FAILED, error=str(e))
+                return False
+        if result.get("audit_link"):
+            checkpoint.finish(STATUS_DONE, result=result)
+            return True
+        checkpoint.finish(STATUS_FAILED, result=result, error="No audit link produced.")
+        return False
+
+    def _report_progress(self, checkpoint, ok, total):
+        with self._progress_lock:
+            self._finished += 1
+            self._succeeded += ok
+            elapsed = time.monotonic() - self._started_at
+            per_minute = self._finished / elapsed * 60 if elapsed else 0.0
+            remaining = total - self._finished
+            eta = _format_duration(remaining * elapsed / self._finished) if remaining else "0s"
+            print(f"[RUN] {'✅' if ok else '❌'} {checkpoint.state['client_name']} | "
+                  f"{self._finished}/{total} ({self._succeeded} ok) | "
+                  f"{per_minute:.2f} clients/min | ETA {eta}")
+
+    def run(self):
+        todo = self.pending()
+        skipped = len(self.checkpoints) - len(todo)
+        print(f"[RUN] {len(self.checkpoints)} client(s), {skipped} already finished, "
+              f"{len(todo)} to run with {self.workers} worker(s): {self.run_dir}")
+        self._started_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="audit-runner") as pool:
+            futures = {pool.submit(self._run_one, cp): cp for cp in todo}
+            for future in as_completed(futures):
+                self._report_progress(futures[future], future.result(), len(todo))
+
+        counts = {}
+        for cp in self.checkpoints:
+            counts[cp.status] = counts.get(cp.status, 0) + 1
+        elapsed = time.monotonic() - self._started_at
+        print(f"\n[RUN] Finished in {_format_duration(elapsed)}: "
+              + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+        return counts
+
+
+def checkpoint_filename(client_name: str, website_url: str) -> str:
+    """Stable per-client file name, so a resumed run finds it even if the client list was reordered."""
+    slug = "".join(c if c.isalnum() else "_" for c in client_name)[:40]
+    digest = hashlib.sha1(f"{client_name}\n{website_url}".encode("utf-8")).hexdigest()[:10]
+    return f"{slug}-{digest}.json"
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+
+# ---------------------------------------------------
+# MAIN
+# ---------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run audits for many clients with checkpoint/resume.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", dest="csv_path", help="CSV with client_name,website_url columns")
+    source.add_argument("--sheet", nargs="?", const=config.SHEET_ID, default=None,
+                        help="Read clients from a Google Sheet (default: config.SHEET_ID)")
+    parser.add_argument("--sheet-tab", action="append", default=None, help="Only read this tab (repeatable)")
+    parser.add_argument("--run-dir", default=None, help="Run directory (reuse it to resume)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Audits in flight at once")
+    parser.add_argument("--retry-failed", action="store_true", help="Also re-run clients that failed last time")
+    parser.add_argument("--cpu-workers", type=int, default=process_pool.CPU_WORKERS,
+                        help="Processes for the CPU-bound stages (HTML parsing, DOCX rendering); 0 = inline")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Re-audit: regenerate only the sections whose inputs changed since the last audit")
+    args = parser.parse_args()
+
+    import audit_main
+
+    process_pool.configure(args.cpu_workers)
+    openai_client = audit_main.connect_openai()
+    g_clients = audit_main.connect_google()
+    main_folder_id = config.MAIN_DRIVE_FOLDER_ID
+    if not main_folder_id:
+        print("❌ FATAL ERROR: MAIN_DRIVE_FOLDER_ID not set in config.")
+        sys.exit()
+
+    if args.csv_path:
+        clients = read_clients_csv(args.csv_path)
+    else:
+        clients = read_clients_sheet(g_clients, args.sheet, args.sheet_tab)
+    clients = dedupe_clients(clients)
+    if not clients:
+        print("❌ No clients to audit.")
+        sys.exit()
+
+    def audit_client(client_name, website_url, checkpoint):
+        audit_link, website_summary, video_prompt_description, _ = audit_main.run_client_audit(
+            openai_client, g_clients, client_name, website_url, main_folder_id,
+            checkpoint=checkpoint, incremental=args.incremental,
+        )
+        return {
+            "audit_link": audit_link,
+            "website_summary": website_summary,
+            "video_prompt_description": video_prompt_description,
+        }
+
+    run_dir = args.run_dir or os.path.join(AUDIT_RUNS_DIR, time.strftime("%Y%m%d-%H%M%S"))
+    try:
+        BatchRunner(run_dir, clients, audit_client, workers=args.workers, retry_failed=args.retry_failed).run()
+    finally:
+        process_pool.shutdown()
+        g_clients.flush_logs()
@@ -0,0 +1,110 @@
+"""
+Benchmark: CPU-bound audit stages, inline threads vs the process pool, over 1..N cores.
+
+A bulk run is simulated by --clients concurrent client threads, each doing the
+two CPU stages of one audit: HTML -> visible text (web_scrapper) on a
+generated page and DOCX rendering (audit_research.render_audit_docx) of a
+generated report. The same workload runs inline (process_pool disabled, so
+the threads share one interpreter) and then with 1..N pool workers. Every
+pooled result is checked against the inline one before it is timed.
+
+Usage:
+    python benchmarks/cpu_scaling_bench.py
+    python benchmarks/cpu_scaling_bench.py --clients 32 --max-workers 8 --page-kb 400 --scale 5
+"""
+import os
+import io
+import sys
+import time
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import process_pool
+import web_scrapper
+import audit_sections
+import audit_research
+from docx_upload_bench import generate_report
+
+CLIENT_NAME = "Benchmark Co"
+WEBSITE_URL = "https://example.com"
+
+
+def generate_page(size_kb: int, seed: int = 0) -> str:
+    """A marketing-site-shaped HTML page of about size_kb, with scripts, nav and footer to strip."""
+    parts = ["<html><head><title>Example</title><style>body{font-family:sans-serif}</style>",
+             "<script>window.dataLayer=[];</script></head><body>",
+             "<header><nav><a href='/'>Home</a><a href='/services'>Services</a></nav></header>"]
+    i = 0
+    while sum(len(p) for p in parts) < size_kb * 1024:
+        parts.append(
+            f"<section id='s{i}'><h2>Service {seed}-{i}</h2><p>We help <b>growing brands</b> turn scattered "
+            f"marketing into measurable growth with <a href='/case/{i}'>case study {i}</a>.</p>"
+            f"<ul><li>Strategy</li><li>Content</li><li>Paid media</li></ul>"
+            f"<script>track('s{i}')</script><svg><path d='M0 0L10 10'/></svg></section>"
+        )
+        i += 1
+    parts.append("<footer>© Example Co</footer></body></html>")
+    return "".join(parts)
+
+
+def client_work(page: str, sections):
+    text = process_pool.run_cpu(web_scrapper.extract_visible_text_from_blob, process_pool.Blob(page))
+    docx_bytes = audit_research.render_audit_docx(CLIENT_NAME, WEBSITE_URL, sections, None)
+    return text, docx_bytes
+
+
+def run_workload(pages, sections, clients):
+    with ThreadPoolExecutor(max_workers=clients) as threads:
+        return list(threads.map(lambda page: client_work(page, sections), pages))
+
+
+def _docx_text(docx_bytes):
+    # Zip entry timestamps differ per save; compare the document body instead
+    import zipfile
+    with zipfile.ZipFile(io.BytesIO(docx_bytes)) as zf:
+        return zf.read("word/document.xml")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent client audits (threads)")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--page-kb", type=int, default=300)
+    parser.add_argument("--scale", type=int, default=3, help="Findings per report section")
+    args = parser.parse_args()
+
+    pages = [generate_page(args.page_kb, seed) for seed in range(args.clients)]
+    sections = audit_sections.parse_master_document(generate_report(args.scale))
+    print(f"{args.clients} clients, {args.page_kb} KB pages, report scale {args.scale}, "
+          f"{os.cpu_count()} CPU(s) visible")
+
+    with contextlib.redirect_stdout(io.StringIO()):  # the render helper prints per document
+        process_pool.configure(0)
+        run_workload(pages[:1], sections, 1)  # warm-up (imports, template cache)
+        started = time.perf_counter()
+        expected = run_workload(pages, sections, args.clients)
+        inline_s = time.perf_counter() - started
+
+    print(f"\n{'mode':>10} {'seconds':>8} {'clients/s':>10} {'speedup':>8}")
+    print(f"{'inline':>10} {inline_s:>8.2f} {args.clients / inline_s:>10.2f} {1.0:>7.2f}x")
+
+    for workers in range(1, args.max_workers + 1):
+        with contextlib.redirect_stdout(io.StringIO()):
+            process_pool.configure(workers)
+            run_workload(pages[:workers], sections, workers)  # start and warm every worker
+            started = time.perf_counter()
+            results = run_workload(pages, sections, args.clients)
+            elapsed = time.perf_counter() - started
+        for (text, docx_bytes), (expected_text, expected_docx) in zip(results, expected):
+            if text != expected_text or _docx_text(docx_bytes) != _docx_text(expected_docx):
+                print(f"❌ {workers} worker(s): output differs from the inline run.")
+                sys.exit(1)
+        print(f"{f'{workers} proc':>10} {elapsed:>8.2f} {args.clients / elapsed:>10.2f} {inline_s / elapsed:>7.2f}x")
+    process_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
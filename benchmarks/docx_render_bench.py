@@ -0,0 +1,58 @@
+"""
+Benchmark: docx_renderer vs the legacy line-by-line renderer.
+
+Both renderers are timed on generated reports of increasing size (render +
+save to memory, like the audit pipeline). That they produce identical
+package parts is checked by tests/test_docx_renderer.py.
+
+Usage:
+    python benchmarks/docx_render_bench.py
+    python benchmarks/docx_render_bench.py --iterations 10 --scales 1 5 20 50
+"""
+import os
+import io
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audit_sections
+import audit_research
+from docx_upload_bench import generate_report
+
+CLIENT_NAME = "Benchmark Co"
+WEBSITE_URL = "https://example.com"
+
+
+def _time(build, sections, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        build(CLIENT_NAME, WEBSITE_URL, sections, None).save(io.BytesIO())
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def benchmark(scales, iterations):
+    print(f"\n{'scale':>6} {'md_kb':>7} {'legacy_ms':>10} {'fast_ms':>9} {'speedup':>8}")
+    for scale in scales:
+        markdown = generate_report(scale)
+        sections = audit_sections.parse_master_document(markdown)
+        audit_research.build_audit_docx(CLIENT_NAME, WEBSITE_URL, sections, None)  # warm caches
+        legacy_ms = _time(audit_research.build_audit_docx_legacy, sections, iterations)
+        fast_ms = _time(audit_research.build_audit_docx, sections, iterations)
+        print(f"{scale:>6} {len(markdown) / 1024:>7.1f} {legacy_ms:>10.1f} {fast_ms:>9.1f} {legacy_ms / fast_ms:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 5, 20, 50])
+    args = parser.parse_args()
+    benchmark(args.scales, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark: audit DOCX hand-off to the Drive upload, file path vs in-memory path.
+
+  file    save_audit_docx() to temp_outputs/, MediaFileUpload reads it back,
+          the file is deleted (the pre-in-memory pipeline)
+  memory  render_audit_docx() into a BytesIO, MediaIoBaseUpload reads the
+          buffer (the current pipeline)
+
+Both paths stop where the HTTP request would start: the upload body is
+drained from the media object exactly as googleapiclient would, so the
+numbers cover rendering plus the hand-off, not network time. Disk I/O is
+read from /proc/self/io (Linux): rchar/wchar count bytes passed through
+read/write syscalls, including those served from the page cache.
+
+Usage:
+    python benchmarks/docx_upload_bench.py
+    python benchmarks/docx_upload_bench.py --iterations 50 --scale 4
+"""
+import os
+import io
+import sys
+import math
+import time
+import argparse
+import statistics
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
+
+import prompts
+import audit_sections
+import audit_research
+from google_clients import DOCX_MIME_TYPE
+
+CLIENT_NAME = "Benchmark Co"
+WEBSITE_URL = "https://example.com"
+
+
+def generate_report(scale: int) -> str:
+    """A master-audit-shaped markdown document; scale multiplies every section's body."""
+    parts = []
+    for key, heading in prompts.MASTER_AUDIT_SECTIONS:
+        parts.append(f"<!-- section: {key} -->")
+        parts.append(heading)
+        for i in range(scale):
+            parts.append(f"### Finding {i + 1}")
+            parts.append(
+                f"The **{key}** review found that the site's messaging is clear but the "
+                f"**call to action** is buried below the fold on mobile (item {i + 1})."
+            )
+            parts.extend(f"* **Recommendation {j + 1}:** tighten copy and add proof point {j + 1}." for j in range(4))
+            parts.append("| Metric | Client | Competitor A | Competitor B |")
+            parts.append("|---|---|---|---|")
+            parts.extend(f"| Signal {j + 1} | **Strong** | Medium | Weak |" for j in range(6))
+        parts.append("")
+    return "\n".join(parts)
+
+
+def _drain(media):
+    # What the upload client does with the body: read it in full
+    return len(media.getbytes(0, media.size()))
+
+
+def file_path(sections, workdir):
+    filename = audit_research.audit_docx_filename(CLIENT_NAME)
+    local_path = os.path.join(workdir, filename)
+    audit_research.save_audit_docx(CLIENT_NAME, WEBSITE_URL, sections, None, local_path)
+    media = MediaFileUpload(local_path, mimetype=DOCX_MIME_TYPE, resumable=True)
+    size = _drain(media)
+    media.stream().close()
+    os.remove(local_path)
+    return size
+
+
+def memory_path(sections, workdir):
+    docx_bytes = audit_research.render_audit_docx(CLIENT_NAME, WEBSITE_URL, sections, None)
+    media = MediaIoBaseUpload(io.BytesIO(docx_bytes), mimetype=DOCX_MIME_TYPE, resumable=False)
+    return _drain(media)
+
+
+def _proc_io():
+    try:
+        with open("/proc/self/io") as f:
+            return {k: int(v) for k, v in (line.split(":") for line in f)}
+    except OSError:
+        return None
+
+
+def run(name, fn, sections, workdir, iterations):
+    fn(sections, workdir)  # warm-up (imports, template load)
+    before = _proc_io()
+    timings = []
+    size = 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        size = fn(sections, workdir)
+        timings.append(time.perf_counter() - started)
+    after = _proc_io()
+
+    timings.sort()
+    row = {
+        "path": name,
+        "docx_kb": round(size / 1024, 1),
+        "median_ms": round(statistics.median(timings) * 1000, 2),
+        # Nearest-rank percentile: never below the median, the maximum for small runs
+        "p95_ms": round(timings[math.ceil(len(timings) * 0.95) - 1] * 1000, 2),
+    }
+    if before and after:
+        for key in ("wchar", "rchar", "write_bytes"):
+            row[f"{key}_kb_per_doc"] = round((after[key] - before[key]) / iterations / 1024, 1)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--scale", type=int, default=3, help="Findings per section (report size)")
+    parser.add_argument("--workdir", default="temp_outputs")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    sections = audit_sections.parse_master_document(generate_report(args.scale))
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):  # the render helpers print per document
+        for name, fn in (("file", file_path), ("memory", memory_path)):
+            results.append(run(name, fn, sections, args.workdir, args.iterations))
+
+    columns = list(results[0])
+    print("  ".join(f"{c:>18}" for c in columns))
+    for row in results:
+        print("  ".join(f"{str(row.get(c, '-')):>18}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
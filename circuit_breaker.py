@@ -0,0 +1,205 @@
+# circuit_breaker.py
+# Per-provider circuit breakers (Serper, PageSpeed, OpenAI, Higgsfield, Drive).
+# Each breaker watches the outcome and latency of the last calls to its
+# provider. When too many fail, or too many are slower than the provider's
+# "slow call" threshold, it opens: further calls fail immediately with
+# CircuitOpenError (callers with a soft-failure path degrade instead) rather
+# than every job waiting out full timeouts. After open_seconds it lets a probe
+# through (half-open); a successful probe closes it again, a failed one re-opens
+# it with a longer cool-down.
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import deadline
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+MAX_OPEN_SECONDS = 300  # cap for the growing cool-down after failed probes
+
+
+class CircuitOpenError(Exception):
+    """The provider's breaker is open; the call was not attempted."""
+
+
+class _Call:
+    def __init__(self):
+        self.failed_reason = None
+
+    def fail(self, reason="soft failure"):
+        """Marks a call that returned normally as failed (e.g. an error payload)."""
+        self.failed_reason = reason
+
+
+class CircuitBreaker:
+    def __init__(self, name, slow_call_seconds, window_size=20, min_calls=5,
+                 failure_rate_threshold=0.5, slow_rate_threshold=0.5, open_seconds=30, half_open_probes=1):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_rate_threshold = slow_rate_threshold
+        self.base_open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self.open_seconds = open_seconds
+        self._outcomes = deque(maxlen=window_size)  # (failed, slow)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0}
+
+    # --- Public API ---
+    @contextmanager
+    def guard(self, failure_exceptions=(Exception,)):
+        """
+        Wraps one provider call. Raises CircuitOpenError without running the
+        block while open. Exceptions from the block that are instances of
+        failure_exceptions count as failures; others (e.g. a 400 for a bad
+        request) mean the provider answered. A request deadline running out
+        says nothing about the provider and isn't counted. call.fail() marks a
+        soft failure.
+        """
+        self._before_call()
+        call = _Call()
+        started = time.monotonic()
+        try:
+            yield call
+        except deadline.DeadlineExceeded:
+            self._release_probe()
+            raise
+        except failure_exceptions as e:
+            self._record(failed=True, latency=time.monotonic() - started, reason=repr(e))
+            raise
+        except Exception:
+            self._record(failed=False, latency=time.monotonic() - started)
+            raise
+        except BaseException:
+            self._release_probe()
+            raise
+        self._record(failed=call.failed_reason is not None, latency=time.monotonic() - started, reason=call.failed_reason)
+
+    def allows_calls(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self.state != OPEN
+
+    def stats(self):
+        with self._lock:
+            self._maybe_half_open()
+            failures = sum(1 for failed, _ in self._outcomes if failed)
+            slow = sum(1 for _, is_slow in self._outcomes if is_slow)
+            window = len(self._outcomes)
+            return {
+                "state": self.state,
+                "window_calls": window,
+                "window_failure_rate": round(failures / window, 3) if window else 0.0,
+                "window_slow_rate": round(slow / window, 3) if window else 0.0,
+                "open_seconds": self.open_seconds,
+                **self.counters,
+            }
+
+    # --- State machine ---
+    def _maybe_half_open(self):
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+            self._probes_in_flight = 0
+            print(f"🟡 [Breaker] {self.name}: half-open, probing")
+
+    def _before_call(self):
+        with self._lock:
+            self._maybe_half_open()
+            if self.state == OPEN or (self.state == HALF_OPEN and self._probes_in_flight >= self.half_open_probes):
+                self.counters["rejected"] += 1
+                raise CircuitOpenError(f"{self.name} circuit is open; failing fast.")
+            if self.state == HALF_OPEN:
+                self._probes_in_flight += 1
+
+    def _release_probe(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _open(self, reason):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.counters["opened"] += 1
+        print(f"🔴 [Breaker] {self.name}: open for {self.open_seconds:.0f}s ({reason})")
+
+    def _record(self, failed, latency, reason=None):
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            self.counters["calls"] += 1
+            self.counters["failures"] += failed
+            self.counters["slow_calls"] += slow
+
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed or slow:
+                    self.open_seconds = min(MAX_OPEN_SECONDS, self.open_seconds * 2)
+                    self._open(f"probe {'failed' if failed else f'slow ({latency:.1f}s)'}")
+                else:
+                    self.state = CLOSED
+                    self.open_seconds = self.base_open_seconds
+                    self._outcomes.clear()
+                    print(f"🟢 [Breaker] {self.name}: closed after successful probe")
+                return
+
+            self._outcomes.append((failed, slow))
+            if self.state != CLOSED or len(self._outcomes) < self.min_calls:
+                return
+            window = len(self._outcomes)
+            failure_rate = sum(1 for f, _ in self._outcomes if f) / window
+            slow_rate = sum(1 for _, s in self._outcomes if s) / window
+            if failure_rate >= self.failure_rate_threshold:
+                self._open(f"failure rate {failure_rate:.0%} over last {window} calls; last: {reason}")
+            elif slow_rate >= self.slow_rate_threshold:
+                self._open(f"{slow_rate:.0%} of last {window} calls slower than {self.slow_call_seconds}s")
+
+
+# Slow-call thresholds sit well under each provider's timeout, so a degrading
+# provider trips the breaker before calls start hitting the timeout itself.
+PROVIDER_SETTINGS = {
+    "serper": {"slow_call_seconds": 5},
+    "pagespeed": {"slow_call_seconds": 12},
+    "openai": {"slow_call_seconds": 120, "window_size": 30, "min_calls": 8},
+    "higgsfield": {"slow_call_seconds": 5},
+    "drive": {"slow_call_seconds": 60},
+}
+
+_breakers = {name: CircuitBreaker(name, **settings) for name, settings in PROVIDER_SETTINGS.items()}
+
+
+def breaker(name) -> CircuitBreaker:
+    return _breakers[name]
+
+
+def all_stats():
+    return {name: b.stats() for name, b in _breakers.items()}
+
+
+def render_prometheus():
+    lines = [
+        "# HELP circuit_breaker_state Breaker state (0 closed, 1 half-open, 2 open)",
+        "# TYPE circuit_breaker_state gauge",
+    ]
+    stats = all_stats()
+    for name, s in stats.items():
+        lines.append(f'circuit_breaker_state{{provider="{name}"}} {_STATE_VALUES[s["state"]]}')
+    for field in ("calls", "failures", "slow_calls", "rejected", "opened"):
+        metric = f"circuit_breaker_{field}_total"
+        lines.append(f"# HELP {metric} Provider calls by outcome ({field.replace('_', ' ')})")
+        lines.append(f"# TYPE {metric} counter")
+        for name, s in stats.items():
+            lines.append(f'{metric}{{provider="{name}"}} {s[field]}')
+    for field in ("window_failure_rate", "window_slow_rate"):
+        metric = f"circuit_breaker_{field}"
+        lines.append(f"# TYPE {metric} gauge")
+        for name, s in stats.items():
+            lines.append(f'{metric}{{provider="{name}"}} {s[field]}')
+    return "\n".join(lines) + "\n"
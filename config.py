@@ -21,6 +21,24 @@ LOG_SHEET_NAME = 'AI SOP Generation Log'
 # --- AI Configuration ---
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# --- Model Routing Configuration ---
+# Per-stage model preference (primary first, then fallbacks) and latency budget.
+# The router (model_router.py) may skip the primary when the input is too large for
+# its context window or its recent latency/error rate doesn't fit the budget.
+MODEL_ROUTES = {
+    'competitor_json': {'models': ['gpt-4o-mini', 'gpt-4.1-mini'], 'latency_budget_seconds': 30},
+    'master_audit': {'models': ['gpt-4o-mini', 'gpt-4.1-mini'], 'latency_budget_seconds': 120},
+    'video_prompt': {'models': ['gpt-5-nano', 'gpt-4o-mini'], 'latency_budget_seconds': 60},
+    'section_repair': {'models': ['gpt-4o-mini', 'gpt-4.1-mini'], 'latency_budget_seconds': 45},
+}
+
+# Context window, price (USD per 1M tokens) and a latency prior used before any calls are observed.
+MODEL_PROFILES = {
+    'gpt-4o-mini': {'context_tokens': 128000, 'input_usd_per_1m': 0.15, 'output_usd_per_1m': 0.60, 'prior_latency_seconds': 8},
+    'gpt-4.1-mini': {'context_tokens': 1047576, 'input_usd_per_1m': 0.40, 'output_usd_per_1m': 1.60, 'prior_latency_seconds': 10},
+    'gpt-5-nano': {'context_tokens': 400000, 'input_usd_per_1m': 0.05, 'output_usd_per_1m': 0.40, 'prior_latency_seconds': 20},
+}
+
 # --- Script Behavior Configuration ---
 # Tabs in the input sheet to ignore.
 IGNORE_TABS = ['Dashboard', '⚒️ Tools & Templates']
@@ -0,0 +1,122 @@
+# deadline.py
+# Request-scoped time budgets. A video job or audit run opens a
+# deadline_context(); every stage underneath (scrapes, tool calls, LLM calls,
+# scheduler queueing, render polling, uploads) derives its own timeout from the
+# time that is left instead of a fixed constant, and a stage that clearly
+# can't finish in the remaining budget is skipped up front rather than started
+# and abandoned. Like the accounting job ID and the scheduler priority, the
+# active deadline travels in a contextvar, so it follows the work into
+# contextvars.copy_context() threads without widening every signature.
+#
+# All helpers are no-ops (return the stage default) when no deadline is active.
+import time
+import contextvars
+from contextlib import contextmanager
+
+MIN_STAGE_SECONDS = 1.0  # less than this left is treated as exhausted
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out (or can't cover the next stage)."""
+
+
+class Deadline:
+    def __init__(self, seconds: float, label: str = "request"):
+        self.label = label
+        self.budget_seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, stage: str):
+        """Raises DeadlineExceeded if the budget is already spent."""
+        if self.remaining() < MIN_STAGE_SECONDS:
+            raise DeadlineExceeded(f"{self.label}: {self.budget_seconds:g}s budget exhausted before {stage}.")
+
+    def timeout(self, default: float, stage: str = "stage") -> float:
+        """The stage's usual timeout, capped at what is left of the budget."""
+        self.check(stage)
+        return min(default, self.remaining())
+
+    def require(self, stage: str, needed_seconds: float):
+        """Skips a stage early (raises) when it typically needs more time than is left."""
+        remaining = self.remaining()
+        if remaining < needed_seconds:
+            raise DeadlineExceeded(
+                f"{self.label}: skipping {stage}, it needs ~{needed_seconds:.0f}s and only {remaining:.0f}s are left."
+            )
+
+
+_current = contextvars.ContextVar("deadline", default=None)
+
+
+def current_deadline():
+    return _current.get()
+
+
+@contextmanager
+def deadline_context(seconds: float, label: str = "request"):
+    """
+    Runs the enclosed work under a budget of `seconds`. Nested contexts never
+    extend an outer deadline: the earlier expiry wins.
+    """
+    deadline = Deadline(seconds, label)
+    outer = _current.get()
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+# --- Helpers for stage code (no-ops without an active deadline) ---
+def remaining():
+    deadline = _current.get()
+    return deadline.remaining() if deadline else None
+
+
+def check(stage: str):
+    deadline = _current.get()
+    if deadline:
+        deadline.check(stage)
+
+
+def timeout(default: float, stage: str = "stage") -> float:
+    deadline = _current.get()
+    return deadline.timeout(default, stage) if deadline else default
+
+
+@contextmanager
+def capped_call(stage: str, default: float, timeout_seconds: float, timeout_errors):
+    """
+    Wraps a call made with timeout_seconds = timeout(default, stage). When the
+    deadline capped it below the stage default and the call then times out, it
+    was the budget that ran out, not the provider: the timeout is re-raised as
+    DeadlineExceeded so circuit breakers and model health don't count it.
+    """
+    try:
+        yield
+    except timeout_errors as e:
+        if timeout_seconds < default:
+            raise DeadlineExceeded(
+                f"{stage} timed out after {timeout_seconds:.1f}s, the rest of the request budget."
+            ) from e
+        raise
+
+
+def require(stage: str, needed_seconds: float):
+    deadline = _current.get()
+    if deadline:
+        deadline.require(stage, needed_seconds)
+
+
+def can_afford(needed_seconds: float) -> bool:
+    deadline = _current.get()
+    return deadline is None or deadline.remaining() >= needed_seconds
@@ -0,0 +1,312 @@
+# drive_relay.py
+# Streams a remote file (the rendered video URL) straight into a Google Drive
+# resumable upload session, without landing it in temp_outputs first. Source
+# bytes are read in small chunks and forwarded to Drive in fixed-size upload
+# chunks (a multiple of 256 KiB, as the resumable protocol requires), so memory
+# is bounded by one upload chunk and nothing touches local disk unless a cache
+# copy is asked for.
+#
+# Both legs recover on their own: a dropped source connection resumes with an
+# HTTP Range request, and a failed chunk PUT asks Drive how many bytes it has
+# committed and resends from there. The session URL can be persisted by the
+# caller, so a relay interrupted by a restart continues where Drive left off.
+import os
+import time
+import hashlib
+
+import requests
+
+import video_download
+import deadline
+import circuit_breaker
+
+DRIVE_UPLOAD_URL = "https://www.googleapis.com/upload/drive/v2/files?uploadType=resumable&supportsAllDrives=true"
+UPLOAD_GRANULARITY = 256 * 1024
+RELAY_CHUNK_BYTES = 32 * UPLOAD_GRANULARITY  # 8 MiB per PUT
+SOURCE_READ_BYTES = 1024 * 1024
+RELAY_MAX_ATTEMPTS = 5  # per source connection and per chunk PUT
+RELAY_RETRY_BACKOFF_SECONDS = 2
+UPLOAD_TIMEOUT_SECONDS = (10, 120)
+RETRYABLE_UPLOAD_STATUSES = (429, 500, 502, 503, 504)
+
+_session = requests.Session()
+
+
+def _upload_timeout(stage="upload"):
+    connect, read = UPLOAD_TIMEOUT_SECONDS
+    return connect, deadline.timeout(read, stage)
+
+
+def _drive_request(session, method, url, **kwargs):
+    """One Drive API call through the Drive circuit breaker (network errors, 429 and 5xx count as failures)."""
+    timeout = _upload_timeout()
+    with circuit_breaker.breaker("drive").guard(failure_exceptions=(requests.RequestException,)) as call, \
+            deadline.capped_call("upload", UPLOAD_TIMEOUT_SECONDS[1], timeout[1], requests.Timeout):
+        response = session.request(method, url, timeout=timeout, **kwargs)
+        if response.status_code in RETRYABLE_UPLOAD_STATUSES:
+            call.fail(f"HTTP {response.status_code}")
+    return response
+
+
+class RelayError(Exception):
+    pass
+
+
+class UploadSessionExpired(RelayError):
+    """Drive no longer knows the upload session (404/410); a new one has to start from byte 0."""
+
+
+class _SourceStream:
+    """Iterates the source URL from `offset`, resuming with Range after a dropped connection."""
+
+    def __init__(self, url, offset, session):
+        self.url = url
+        self.offset = offset
+        self.session = session
+        self.total = None
+        self.expected_md5 = None
+        self.resumes = 0
+
+    def __iter__(self):
+        last_error = None
+        for attempt in range(RELAY_MAX_ATTEMPTS):
+            if attempt:
+                self.resumes += 1
+                time.sleep(RELAY_RETRY_BACKOFF_SECONDS * attempt)
+                print(f"  ↻ [Relay] Resuming source at byte {self.offset} (attempt {attempt + 1})...")
+            headers = {"Range": f"bytes={self.offset}-"} if self.offset else {}
+            read_timeout = deadline.timeout(video_download.DOWNLOAD_READ_TIMEOUT_SECONDS, "relay download")
+            try:
+                with self.session.get(
+                    self.url, headers=headers, stream=True,
+                    timeout=(video_download.DOWNLOAD_CONNECT_TIMEOUT_SECONDS, read_timeout),
+                ) as response:
+                    response.raise_for_status()
+                    if self.offset and response.status_code != 206:
+                        # Bytes before offset are already in Drive; they can't be un-sent
+                        raise RelayError("Source ignored the Range request; cannot resume the relay.")
+                    self.total = video_download._total_size(response, self.offset) or self.total
+                    if response.status_code == 200:
+                        self.expected_md5 = video_download._expected_md5(response)
+                    for chunk in response.iter_content(chunk_size=SOURCE_READ_BYTES):
+                        if chunk:
+                            self.offset += len(chunk)
+                            yield chunk
+                if self.total is None or self.offset >= self.total:
+                    return
+                last_error = RelayError(f"Source closed at {self.offset} of {self.total} bytes.")
+            except (requests.RequestException, OSError) as e:
+                last_error = e
+        raise RelayError(f"Source download failed after {RELAY_MAX_ATTEMPTS} attempts: {last_error}")
+
+
+def start_upload_session(token_provider, folder_id, file_name, mime_type="video/mp4", size=None, session=None):
+    """Opens a Drive resumable upload session and returns its URL."""
+    session = session or _session
+    headers = {"Authorization": f"Bearer {token_provider()}", "X-Upload-Content-Type": mime_type}
+    if size:
+        headers["X-Upload-Content-Length"] = str(size)
+    metadata = {"title": file_name, "parents": [{"id": folder_id}], "mimeType": mime_type}
+    response = _drive_request(session, "POST", DRIVE_UPLOAD_URL, json=metadata, headers=headers)
+    response.raise_for_status()
+    return response.headers["Location"]
+
+
+def _committed_offset(response):
+    # 308 responses carry "Range: bytes=0-N" for what Drive has stored (no header = nothing yet)
+    received = response.headers.get("Range")
+    return int(received.rsplit("-", 1)[1]) + 1 if received else 0
+
+
+def query_upload_offset(upload_url, token_provider, total=None, session=None):
+    """
+    Asks Drive how much of a session it has. Returns (committed_bytes, None),
+    or (size, file_resource) if the upload already finished.
+    """
+    session = session or _session
+    headers = {
+        "Authorization": f"Bearer {token_provider()}",
+        "Content-Range": f"bytes */{total if total is not None else '*'}",
+        "Content-Length": "0",
+    }
+    response = _drive_request(session, "PUT", upload_url, headers=headers)
+    if response.status_code in (200, 201):
+        resource = response.json()
+        return int(resource.get("fileSize") or 0), resource
+    if response.status_code == 308:
+        return _committed_offset(response), None
+    if response.status_code in (404, 410):
+        raise UploadSessionExpired("Drive upload session expired.")
+    response.raise_for_status()
+    raise RelayError(f"Unexpected status {response.status_code} querying the upload session.")
+
+
+def _put_chunk(upload_url, token_provider, data, start, total, session):
+    """
+    Sends data (which begins at byte `start` of the file), resending from
+    whatever Drive committed after a failure. Returns (committed_end,
+    file_resource or None, retries).
+    """
+    chunk_start, end = start, start + len(data)
+    retries = 0
+    while True:
+        total_text = total if total is not None else "*"
+        headers = {
+            "Authorization": f"Bearer {token_provider()}",
+            "Content-Length": str(end - start),
+            "Content-Range": f"bytes {start}-{end - 1}/{total_text}" if end > start else f"bytes */{total_text}",
+        }
+        try:
+            response = _drive_request(session, "PUT", upload_url, data=data[start - chunk_start:], headers=headers)
+            if response.status_code in (200, 201):
+                return end, response.json(), retries
+            if response.status_code == 308:
+                committed = _committed_offset(response)
+                if committed >= end:
+                    return committed, None, retries
+                error = RelayError(f"Drive committed {committed} of {end} bytes.")
+            elif response.status_code in RETRYABLE_UPLOAD_STATUSES:
+                error = RelayError(f"Drive returned {response.status_code}.")
+            else:
+                response.raise_for_status()
+                raise RelayError(f"Unexpected upload status {response.status_code}.")
+        except requests.RequestException as e:
+            error = e
+
+        retries += 1
+        if retries >= RELAY_MAX_ATTEMPTS:
+            raise RelayError(f"Chunk upload failed after {RELAY_MAX_ATTEMPTS} attempts: {error}")
+        time.sleep(RELAY_RETRY_BACKOFF_SECONDS * retries)
+        committed, resource = query_upload_offset(upload_url, token_provider, total, session)
+        if resource is not None:
+            return committed, resource, retries
+        print(f"  ↻ [Relay] Retrying upload from byte {committed} ({error})")
+        start = max(start, committed)
+
+
+def relay_to_drive(source_url, token_provider, folder_id, file_name, mime_type="video/mp4",
+                   cache_path=None, upload_url=None, on_session=None,
+                   chunk_size=RELAY_CHUNK_BYTES, session=None):
+    """
+    Streams source_url into a new Drive file in folder_id.
+
+    token_provider() returns a valid OAuth access token. cache_path, when set,
+    also writes the bytes to that local file (atomically, like video_download).
+    Pass a previously persisted upload_url to continue an interrupted relay
+    (if Drive has expired it, the relay starts over in a new session);
+    on_session(upload_url) is called as soon as a new session is opened.
+
+    Returns a report dict with the Drive file resource, bytes, throughput,
+    resumes/retries and peak buffer size. Raises RelayError on failure.
+    """
+    if chunk_size % UPLOAD_GRANULARITY:
+        raise ValueError(f"chunk_size must be a multiple of {UPLOAD_GRANULARITY} bytes")
+    session = session or _session
+    started = time.monotonic()
+
+    offset = 0
+    if upload_url:
+        try:
+            offset, resource = query_upload_offset(upload_url, token_provider, session=session)
+        except UploadSessionExpired:
+            print("  ↻ [Relay] Saved upload session expired; starting a new one from byte 0")
+            upload_url = None
+        else:
+            if resource is not None:
+                return _report(resource, offset, started, 0, 0, 0, 0, None, None)
+            print(f"  ↻ [Relay] Continuing upload session at byte {offset}")
+    if not upload_url:
+        upload_url = start_upload_session(token_provider, folder_id, file_name, mime_type, session=session)
+        if on_session:
+            on_session(upload_url)
+
+    source = _SourceStream(source_url, offset, session)
+    # Checksums and the cache copy only make sense when we saw every byte
+    md5 = hashlib.md5() if offset == 0 else None
+    cache_file = None
+    if cache_path and offset == 0:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        cache_file = open(cache_path + ".part", "wb")
+    if cache_path and cache_file is None:
+        print("  ⚠️ [Relay] Resumed mid-file; skipping the local cache copy.")
+
+    buffer = bytearray()
+    buffer_start = offset  # file position of buffer[0]
+    chunks = upload_retries = peak_buffer = 0
+    resource = None
+    try:
+        for piece in source:
+            buffer += piece
+            if md5:
+                md5.update(piece)
+            if cache_file:
+                cache_file.write(piece)
+            peak_buffer = max(peak_buffer, len(buffer))
+            while len(buffer) >= chunk_size:
+                committed, resource, retries = _put_chunk(
+                    upload_url, token_provider, bytes(buffer[:chunk_size]), buffer_start, source.total, session
+                )
+                upload_retries += retries
+                chunks += 1
+                del buffer[:committed - buffer_start]
+                buffer_start = committed
+
+        # Final (possibly empty) chunk carries the total size and closes the session
+        total = source.offset
+        while resource is None:
+            committed, resource, retries = _put_chunk(
+                upload_url, token_provider, bytes(buffer), buffer_start, total, session
+            )
+            upload_retries += retries
+            chunks += 1
+            del buffer[:committed - buffer_start]
+            buffer_start = committed
+
+        if cache_file:
+            cache_file.flush()
+            os.fsync(cache_file.fileno())
+    except BaseException:
+        if cache_file:
+            cache_file.close()
+            os.remove(cache_path + ".part")
+        raise
+    if cache_file:
+        cache_file.close()
+
+    # --- Integrity checks ---
+    problems = []
+    drive_size = int(resource.get("fileSize") or total)
+    if drive_size != total:
+        problems.append(f"Drive size {drive_size} != streamed {total}")
+    if source.total is not None and total != source.total:
+        problems.append(f"streamed {total} != advertised {source.total}")
+    if md5 and source.expected_md5 and md5.digest() != source.expected_md5:
+        problems.append("source md5 mismatch")
+    if md5 and resource.get("md5Checksum") and resource["md5Checksum"] != md5.hexdigest():
+        problems.append("Drive md5 mismatch")
+    if problems:
+        if cache_file:
+            os.remove(cache_path + ".part")
+        raise RelayError(f"Integrity check failed: {', '.join(problems)}")
+    if cache_file:
+        os.replace(cache_path + ".part", cache_path)
+
+    return _report(resource, total, started, chunks, source.resumes, upload_retries, peak_buffer,
+                   md5, cache_path if cache_file else None)
+
+
+def _report(resource, size, started, chunks, source_resumes, upload_retries, peak_buffer, md5, cache_path):
+    elapsed = max(time.monotonic() - started, 1e-6)
+    return {
+        "file": resource,
+        "link": resource.get("webContentLink") or resource.get("alternateLink"),
+        "bytes": size,
+        "seconds": round(elapsed, 3),
+        "throughput_mb_s": round(size / elapsed / (1024 * 1024), 2),
+        "chunks": chunks,
+        "source_resumes": source_resumes,
+        "upload_retries": upload_retries,
+        "peak_buffer_bytes": peak_buffer,
+        "md5_verified": bool(md5 and resource.get("md5Checksum")),
+        "cache_path": cache_path,
+    }
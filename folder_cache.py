@@ -0,0 +1,92 @@
+# folder_cache.py
+# Persistent (parent folder ID, folder name) -> Drive folder ID map. Client and
+# audit folders never move once created, so after the first run every
+# find_or_create_folder() for them is answered locally instead of costing a
+# files().list round trip (plus a create on first use). A miss still goes to
+# Drive, which both validates that the folder exists and finds folders created
+# by someone else; an ID that Drive later reports as gone is evicted.
+import os
+import time
+import sqlite3
+import threading
+
+FOLDER_CACHE_DB_PATH = os.path.join("data", "drive_folders.db")
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+FOLDER_CACHE_TTL_SECONDS = 24 * 3600  # re-check a cached folder against Drive this often
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS drive_folders (
+    parent_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    folder_id TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (parent_id, name)
+);
+CREATE INDEX IF NOT EXISTS idx_drive_folders_folder_id ON drive_folders(folder_id);
+"""
+
+
+def quote_query_value(value: str) -> str:
+    # Drive query strings are single-quoted; names like "Joe's Pizza" need escaping
+    return value.replace('\\', '\\\\').replace("'", "\\'")
+
+
+class FolderCache:
+    def __init__(self, db_path=FOLDER_CACHE_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, parent_id: str, name: str, max_age_seconds: float = None):
+        """
+        The cached folder ID, or None. With max_age_seconds, older entries count
+        as a miss so the caller re-checks Drive (e.g. for a folder trashed since).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT folder_id, updated_at FROM drive_folders WHERE parent_id = ? AND name = ?", (parent_id, name)
+            ).fetchone()
+        if not row or (max_age_seconds is not None and time.time() - row[1] > max_age_seconds):
+            return None
+        return row[0]
+
+    def get_many(self, parent_id: str, names, max_age_seconds: float = None) -> dict:
+        """{name: folder_id} for the names that are cached under parent_id (and fresh, with max_age_seconds)."""
+        names = list(names)
+        if not names:
+            return {}
+        placeholders = ", ".join("?" for _ in names)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT name, folder_id, updated_at FROM drive_folders WHERE parent_id = ? AND name IN ({placeholders})",
+                (parent_id, *names),
+            ).fetchall()
+        now = time.time()
+        return {
+            name: folder_id for name, folder_id, updated_at in rows
+            if max_age_seconds is None or now - updated_at <= max_age_seconds
+        }
+
+    def put(self, parent_id: str, name: str, folder_id: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO drive_folders (parent_id, name, folder_id, updated_at) VALUES (?, ?, ?, ?)",
+                (parent_id, name, folder_id, time.time()),
+            )
+
+    def forget(self, folder_id: str):
+        """
+        Evicts a folder Drive no longer knows (deleted or trashed), together with
+        any cached children of it, so the next lookup goes back to Drive.
+        """
+        with self._lock:
+            stale = [folder_id]
+            while stale:
+                current = stale.pop()
+                stale.extend(row[0] for row in self._conn.execute(
+                    "SELECT folder_id FROM drive_folders WHERE parent_id = ?", (current,)
+                ))
+                self._conn.execute("DELETE FROM drive_folders WHERE folder_id = ? OR parent_id = ?", (current, current))
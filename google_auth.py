@@ -0,0 +1,194 @@
+# google_auth.py
+# One authenticated Google identity per process. token.json is read once, the
+# interactive OAuth flow runs at most once, and a background thread refreshes
+# the access token shortly before it expires (the file is rewritten only when
+# the token actually changes). Request handlers just ask for a service or a
+# token and never pay for auth.
+#
+# googleapiclient services sit on an httplib2 transport that is not
+# thread-safe, so services are kept per thread: every thread builds its own
+# from a discovery document parsed once per process, all sharing the same
+# credentials. The pydrive client used by the video pipeline is adapted onto
+# the same credentials the same way.
+import os
+import json
+import time
+import datetime
+import threading
+
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from oauth2client.client import OAuth2Credentials
+from pydrive.auth import GoogleAuth
+from pydrive.drive import GoogleDrive
+
+SCOPES = ['https://www.googleapis.com/auth/drive', 'https://www.googleapis.com/auth/spreadsheets']
+CLIENT_SECRET_FILE = 'client_secret.json'
+TOKEN_FILE = 'token.json'
+
+REFRESH_AHEAD_SECONDS = 300  # refresh this long before the access token expires
+REFRESH_RETRY_SECONDS = 30  # wait after a failed background refresh
+
+_lock = threading.RLock()
+_credentials = None
+_refresher = None
+_local = threading.local()
+_discovery_docs = {}  # (api, version) -> parsed discovery document
+
+
+class GoogleAuthError(Exception):
+    """No usable Google credentials (and the interactive flow wasn't allowed)."""
+
+
+# --- Credentials ---
+def _load_token_file():
+    if not os.path.exists(TOKEN_FILE):
+        return None
+    with open(TOKEN_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if "access_token" in data:
+        # Written by pydrive/oauth2client before both paths shared one identity
+        expiry = data.get("token_expiry")
+        return Credentials(
+            token=data.get("access_token"),
+            refresh_token=data.get("refresh_token"),
+            token_uri=data.get("token_uri"),
+            client_id=data.get("client_id"),
+            client_secret=data.get("client_secret"),
+            scopes=data.get("scopes") or None,
+            expiry=datetime.datetime.strptime(expiry, "%Y-%m-%dT%H:%M:%SZ") if expiry else None,
+        )
+    return Credentials.from_authorized_user_info(data, SCOPES)
+
+
+def _save_token_file(creds):
+    tmp_path = f"{TOKEN_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(creds.to_json())
+    os.replace(tmp_path, TOKEN_FILE)
+
+
+def _refresh(creds):
+    """Refreshes and persists the token. Caller holds _lock."""
+    creds.refresh(Request())
+    _save_token_file(creds)
+
+
+def get_credentials(interactive=True):
+    """
+    The process-wide credentials, loaded on first use. With interactive=False
+    a missing or unrefreshable token raises GoogleAuthError instead of opening
+    a browser.
+    """
+    global _credentials
+    with _lock:
+        if _credentials is not None:
+            return _credentials
+        creds = _load_token_file()
+        if creds and not creds.valid and creds.refresh_token:
+            _refresh(creds)
+        if not creds or not creds.valid:
+            if not interactive:
+                raise GoogleAuthError(f"No valid Google token in {TOKEN_FILE}; run an interactive login first.")
+            flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, SCOPES)
+            creds = flow.run_local_server(port=0)
+            _save_token_file(creds)
+        _credentials = creds
+        _start_refresher()
+        return creds
+
+
+def access_token():
+    """A valid OAuth access token (refreshed inline only if the background refresh fell behind)."""
+    creds = get_credentials()
+    if not creds.valid:
+        with _lock:
+            if not creds.valid:
+                _refresh(creds)
+    return creds.token
+
+
+def warm_up():
+    """Loads (and if needed refreshes) the credentials ahead of the first request. Never prompts."""
+    try:
+        get_credentials(interactive=False)
+        print("✅ [Google] Credentials loaded; background refresh running.")
+        return True
+    except Exception as e:
+        print(f"⚠️ [Google] Credentials not warmed up: {e}")
+        return False
+
+
+# --- Background refresh ---
+def _seconds_until_refresh(creds):
+    if creds.expiry is None:
+        return REFRESH_RETRY_SECONDS
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)  # google-auth keeps expiry as naive UTC
+    remaining = (creds.expiry - now).total_seconds()
+    return max(0.0, remaining - REFRESH_AHEAD_SECONDS)
+
+
+def _refresh_loop():
+    while True:
+        creds = _credentials
+        time.sleep(_seconds_until_refresh(creds))
+        try:
+            with _lock:
+                if _seconds_until_refresh(creds) <= 0:
+                    _refresh(creds)
+        except Exception as e:
+            print(f"⚠️ [Google] Background token refresh failed, retrying in {REFRESH_RETRY_SECONDS}s: {e}")
+            time.sleep(REFRESH_RETRY_SECONDS)
+
+
+def _start_refresher():
+    global _refresher
+    if _refresher is None and _credentials.refresh_token:
+        _refresher = threading.Thread(target=_refresh_loop, name="google-token-refresh", daemon=True)
+        _refresher.start()
+
+
+# --- Per-thread services ---
+def _discovery_doc(api, version):
+    key = (api, version)
+    doc = _discovery_docs.get(key)
+    if doc is None:
+        # Parsing the bundled discovery document is most of build()'s cost; do it once per process
+        doc = _discovery_docs[key] = json.loads(get_static_doc(api, version))
+    return doc
+
+
+def service(api, version):
+    """This thread's googleapiclient service for api/version, built on the shared credentials."""
+    services = getattr(_local, "services", None)
+    if services is None:
+        services = _local.services = {}
+    key = (api, version)
+    if key not in services:
+        services[key] = build_from_document(_discovery_doc(api, version), credentials=get_credentials())
+    return services[key]
+
+
+def pydrive_client():
+    """
+    This thread's pydrive GoogleDrive, authorized with the shared credentials
+    (pydrive is built on oauth2client, so the current token is copied over).
+    """
+    creds = get_credentials()
+    access_token()  # make sure the token being copied is current
+    drive = getattr(_local, "pydrive", None)
+    if drive is None:
+        gauth = GoogleAuth()
+        gauth.credentials = OAuth2Credentials(
+            creds.token, creds.client_id, creds.client_secret, creds.refresh_token,
+            creds.expiry, creds.token_uri, None, scopes=creds.scopes,
+        )
+        gauth.Authorize()
+        drive = _local.pydrive = GoogleDrive(gauth)
+    else:
+        drive.auth.credentials.access_token = creds.token
+        drive.auth.credentials.token_expiry = creds.expiry
+    return drive
@@ -1,89 +1,203 @@
 import os
 import time
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+import threading
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
 from googleapiclient.errors import HttpError
 import io
 
+import google_auth
+from folder_cache import FolderCache, FOLDER_MIME_TYPE, FOLDER_CACHE_TTL_SECONDS, quote_query_value
+
 # Import necessary config variables
 from config import (
-    LOG_FOLDER_NAME, LOG_SHEET_NAME, LOG_HEADERS
+    LOG_FOLDER_NAME, LOG_SHEET_NAME, LOG_HEADERS, MAIN_DRIVE_FOLDER_ID
 )
+from sheet_logger import SheetLogWriter
+
+from google_auth import SCOPES, CLIENT_SECRET_FILE, TOKEN_FILE
+
+DOCX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+GOOGLE_DOC_MIME_TYPE = 'application/vnd.google-apps.document'
+# Smaller in-memory uploads go as one multipart request instead of a resumable session (two round trips)
+RESUMABLE_UPLOAD_THRESHOLD_BYTES = 5 * 1024 * 1024
 
-SCOPES = ['https://www.googleapis.com/auth/drive', 'https://www.googleapis.com/auth/spreadsheets']
-CLIENT_SECRET_FILE = 'client_secret.json'
-TOKEN_FILE = 'token.json'
+
+def _is_not_found(error) -> bool:
+    return isinstance(error, HttpError) and getattr(error.resp, 'status', None) == 404
 
 class GoogleClients:
     def __init__(self):
         self.creds = None
-        self.drive_service = None
-        self.sheets_service = None
+        self.folder_cache = FolderCache()
+        self._log_writers = {}  # log sheet ID (None = auto-created) -> SheetLogWriter
+        self._log_writers_lock = threading.Lock()
         self._authenticate_google()
 
     def _authenticate_google(self):
-        """Handles OAuth 2.0 authentication."""
-        if os.path.exists(TOKEN_FILE):
-            self.creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-        if not self.creds or not self.creds.valid:
-            if self.creds and self.creds.expired and self.creds.refresh_token:
-                self.creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, SCOPES)
-                self.creds = flow.run_local_server(port=0)
-            with open(TOKEN_FILE, 'w') as token:
-                token.write(self.creds.to_json())
-        
+        """Handles OAuth 2.0 authentication (once per process, shared by every GoogleClients)."""
+        self.creds = google_auth.get_credentials()
+
+    # Services are per thread: the underlying HTTP transport isn't thread-safe,
+    # so concurrent uploads each get their own instance on the shared credentials.
+    @property
+    def drive_service(self):
+        try:
+            return google_auth.service('drive', 'v3')
+        except Exception as e:
+            print(f"Failed to build Google Drive service: {e}")
+            return None
+
+    @property
+    def sheets_service(self):
         try:
-            self.drive_service = build('drive', 'v3', credentials=self.creds)
-            self.sheets_service = build('sheets', 'v4', credentials=self.creds)
+            return google_auth.service('sheets', 'v4')
         except Exception as e:
-            print(f"Failed to build Google services: {e}")
-            self.drive_service = None
-            self.sheets_service = None
+            print(f"Failed to build Google Sheets service: {e}")
+            return None
 
     def find_or_create_folder(self, parent_folder_id: str, folder_name: str) -> str or None:
         """Finds a folder by name inside a parent, or creates it if it doesn't exist."""
+        cached_id = self.folder_cache.get(parent_folder_id, folder_name, max_age_seconds=FOLDER_CACHE_TTL_SECONDS)
+        if cached_id:
+            return cached_id
+
         print(f"  [Drive] Searching for folder '{folder_name}'...")
-        query = (f"name='{folder_name}' and '{parent_folder_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false")
+        query = (f"name='{quote_query_value(folder_name)}' and '{parent_folder_id}' in parents and mimeType='{FOLDER_MIME_TYPE}' and trashed=false")
         
         try:
             results = self.drive_service.files().list(
                 q=query, 
                 spaces='drive', 
+                orderBy='createdTime',
                 fields='nextPageToken, files(id, name)'
             ).execute()
             
             items = results.get('files', [])
             if items:
-                return items[0]['id']
+                folder_id = items[0]['id']
             else:
                 print(f"  [Drive] Folder '{folder_name}' not found. Creating...")
                 file_metadata = {
                     'name': folder_name,
-                    'mimeType': 'application/vnd.google-apps.folder',
+                    'mimeType': FOLDER_MIME_TYPE,
                     'parents': [parent_folder_id]
                 }
                 folder = self.drive_service.files().create(body=file_metadata, fields='id').execute()
-                return folder.get('id')
+                folder_id = folder.get('id')
         except HttpError as error:
             print(f"  [Drive Error] Failed to find or create folder: {error}")
             return None
 
+        if folder_id:
+            self.folder_cache.put(parent_folder_id, folder_name, folder_id)
+        return folder_id
+
+    def ensure_subfolders(self, parent_folder_id: str, folder_names) -> dict:
+        """
+        Resolves several subfolders of one parent at once: cached names cost
+        nothing, the rest are looked up with a single children listing, and
+        whatever is still missing is created in one batch HTTP request.
+        Returns {name: folder_id}; a name whose creation failed is left out.
+        """
+        folder_ids = self.folder_cache.get_many(parent_folder_id, folder_names, max_age_seconds=FOLDER_CACHE_TTL_SECONDS)
+        missing = [name for name in folder_names if name not in folder_ids]
+        if not missing:
+            return folder_ids
+
+        try:
+            existing = self._list_child_folders(parent_folder_id)
+        except HttpError as error:
+            print(f"  [Drive Error] Failed to list folders: {error}")
+            return folder_ids
+        for name in missing:
+            if name in existing:
+                folder_ids[name] = existing[name]
+                self.folder_cache.put(parent_folder_id, name, existing[name])
+
+        to_create = [name for name in missing if name not in folder_ids]
+        if to_create:
+            print(f"  [Drive] Creating {len(to_create)} folder(s) in one batch: {', '.join(to_create)}")
+            created = self._batch_create_folders(parent_folder_id, to_create)
+            for name, folder_id in created.items():
+                folder_ids[name] = folder_id
+                self.folder_cache.put(parent_folder_id, name, folder_id)
+        return folder_ids
+
+    def _list_child_folders(self, parent_folder_id: str) -> dict:
+        """{name: folder_id} of the parent's folders; the oldest wins on duplicate names."""
+        query = f"'{parent_folder_id}' in parents and mimeType='{FOLDER_MIME_TYPE}' and trashed=false"
+        folders = {}
+        page_token = None
+        while True:
+            results = self.drive_service.files().list(
+                q=query,
+                spaces='drive',
+                orderBy='createdTime',
+                pageSize=1000,
+                pageToken=page_token,
+                fields='nextPageToken, files(id, name)'
+            ).execute()
+            for item in results.get('files', []):
+                folders.setdefault(item['name'], item['id'])
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return folders
+
+    def _batch_create_folders(self, parent_folder_id: str, folder_names) -> dict:
+        created = {}
+
+        def on_created(request_id, response, exception):
+            name = folder_names[int(request_id)]
+            if exception is not None:
+                print(f"  [Drive Error] Failed to create folder '{name}': {exception}")
+            elif response and response.get('id'):
+                created[name] = response['id']
+
+        batch = self.drive_service.new_batch_http_request(callback=on_created)
+        for index, name in enumerate(folder_names):
+            file_metadata = {'name': name, 'mimeType': FOLDER_MIME_TYPE, 'parents': [parent_folder_id]}
+            batch.add(self.drive_service.files().create(body=file_metadata, fields='id'), request_id=str(index))
+        try:
+            batch.execute()
+        except HttpError as error:
+            print(f"  [Drive Error] Batch folder creation failed: {error}")
+        return created
+
+    def _forget_missing_folder(self, error, folder_id):
+        """A cached folder ID that Drive reports as gone is evicted so the next run re-resolves it."""
+        if _is_not_found(error):
+            print(f"  [Drive] Folder {folder_id} no longer exists; dropping it from the folder cache.")
+            self.folder_cache.forget(folder_id)
+
     def upload_file_to_drive(self, docx_path, doc_title, parent_folder_id):
         """
         Uploads a local DOCX file and CONVERTS it to a Google Doc.
-        Used for the Marketing Audit Report.
+        Used for the Marketing Audit Report (and for debugging with a file on disk).
+        """
+        try:
+            media = MediaFileUpload(docx_path, mimetype=DOCX_MIME_TYPE, resumable=True)
+        except FileNotFoundError:
+             print(f"    ❌ [Local Error] File not found: {docx_path}")
+             return None
+        return self._create_google_doc(media, doc_title, parent_folder_id)
+
+    def upload_bytes_to_drive(self, docx_bytes, doc_title, parent_folder_id):
         """
+        Uploads a DOCX held in memory and converts it to a Google Doc, without
+        a temp file. Returns the Doc's webViewLink, or None.
+        """
+        media = MediaIoBaseUpload(
+            io.BytesIO(docx_bytes), mimetype=DOCX_MIME_TYPE,
+            resumable=len(docx_bytes) > RESUMABLE_UPLOAD_THRESHOLD_BYTES,
+        )
+        return self._create_google_doc(media, doc_title, parent_folder_id)
+
+    def _create_google_doc(self, media, doc_title, parent_folder_id):
         try:
-            media = MediaFileUpload(docx_path, mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document', resumable=True)
             file_metadata = {
                 'name': doc_title, 
                 'parents': [parent_folder_id], 
-                'mimeType': 'application/vnd.google-apps.document' # Convert to Google Doc
+                'mimeType': GOOGLE_DOC_MIME_TYPE # Convert to Google Doc
             }
             
             print(f"    [Drive] Uploading and converting '{doc_title}'...")
@@ -98,10 +212,8 @@ class GoogleClients:
             
         except HttpError as error:
             print(f"    [Drive Error] {error}")
+            self._forget_missing_folder(error, parent_folder_id)
             return None
-        except FileNotFoundError:
-             print(f"    ❌ [Local Error] File not found: {docx_path}")
-             return None
 
     def upload_audio_asset(self, parent_folder_id, file_path, file_name):
         """
@@ -127,6 +239,7 @@ class GoogleClients:
             return file.get('webViewLink')
         except Exception as e:
             print(f"    ❌ Audio Upload Failed: {e}")
+            self._forget_missing_folder(e, parent_folder_id)
             return None
 
     def upload_video_asset(self, parent_folder_id, file_path, file_name):
@@ -153,8 +266,27 @@ class GoogleClients:
             return file.get('webViewLink')
         except Exception as e:
             print(f"    ❌ Video Upload Failed: {e}")
+            self._forget_missing_folder(e, parent_folder_id)
             return None
 
     def log_to_google_sheet(self, log_sheet_id, target_log_tab_name, log_row_data):
-        # ... existing log logic if needed ...
-        pass
\ No newline at end of file
+        """
+        Queues one row (a list in LOG_HEADERS order, or a dict keyed by header)
+        for the target tab. Rows are written in batches by a background writer;
+        call flush_logs() before exiting. With log_sheet_id=None the log goes to
+        LOG_SHEET_NAME in the LOG_FOLDER_NAME folder, created on first use.
+        """
+        with self._log_writers_lock:
+            writer = self._log_writers.get(log_sheet_id)
+            if writer is None:
+                writer = self._log_writers[log_sheet_id] = SheetLogWriter(
+                    self, spreadsheet_id=log_sheet_id, parent_folder_id=MAIN_DRIVE_FOLDER_ID
+                )
+        writer.log(target_log_tab_name, log_row_data)
+
+    def flush_logs(self):
+        """Writes all queued log rows and stops the log writers."""
+        with self._log_writers_lock:
+            writers, self._log_writers = list(self._log_writers.values()), {}
+        for writer in writers:
+            writer.close()
@@ -0,0 +1,216 @@
+# higgsfield_poller.py
+# One background poller for every in-flight Higgsfield render. Instead of a
+# sleeping loop per job, each watched request_id gets a Future and a next-poll
+# time; a single thread polls whichever job is due over one pooled HTTP session.
+#
+# Intervals adapt per job: the first poll waits for most of the expected render
+# time, polls tighten as the expected finish approaches, a status transition
+# (e.g. queued -> in_progress) restarts the render clock, and an unchanged
+# status after the expected finish backs off. The expected render time itself
+# tracks observed completions.
+#
+# When completion webhooks are enabled, resolve() wakes the waiting job as soon
+# as the callback arrives and polling drops to a slow fallback sweep that only
+# catches missed callbacks.
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+import requests
+
+EXPECTED_RENDER_SECONDS = 90  # starting estimate; replaced by observed render times
+MIN_POLL_INTERVAL_SECONDS = 3
+MAX_POLL_INTERVAL_SECONDS = 30
+FIRST_POLL_FRACTION = 0.5  # first poll after this share of the expected render time
+OVERDUE_BACKOFF = 1.5  # interval multiplier while a job runs past its expected finish
+STATUS_REQUEST_TIMEOUT_SECONDS = 10
+RENDER_TIME_EWMA_ALPHA = 0.3
+EARLY_RESULT_TTL_SECONDS = 3600  # keep webhook results that arrive before watch() for this long
+
+DONE_STATUSES = ("completed", "succeeded")
+FAILED_STATUSES = ("failed", "nsfw", "cancelled")
+
+
+class _Watch:
+    def __init__(self, request_id, expected_seconds, max_wait_seconds):
+        now = time.monotonic()
+        self.request_id = request_id
+        self.future = Future()
+        self.started_at = now
+        self.deadline = now + max_wait_seconds
+        self.expected_done_at = now + expected_seconds
+        self.expected_seconds = expected_seconds
+        self.interval = MIN_POLL_INTERVAL_SECONDS
+        self.last_status = None
+        self.polls = 0
+
+
+class HiggsfieldPoller:
+    def __init__(self, status_url_template, headers, session=None, sweep_interval_seconds=None, breaker=None):
+        self.status_url_template = status_url_template
+        self.headers = headers
+        self.session = session or requests.Session()
+        self.breaker = breaker  # optional circuit_breaker.CircuitBreaker shared with the submit path
+        self.sweep_interval_seconds = sweep_interval_seconds  # fixed slow interval when webhooks deliver results
+        self.expected_render_seconds = EXPECTED_RENDER_SECONDS
+        self._early_results = {}  # request_id -> (received_at, payload) for callbacks before watch()
+        self._watches = {}  # request_id -> _Watch
+        self._heap = []  # (next_poll_at, seq, request_id)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    # --- Public API ---
+    def watch(self, request_id, max_wait_seconds) -> Future:
+        """
+        Starts tracking a render. The Future resolves with the terminal status
+        payload, or raises TimeoutError after max_wait_seconds.
+        """
+        with self._cond:
+            existing = self._watches.get(request_id)
+            if existing:
+                return existing.future
+            watch = _Watch(request_id, self.expected_render_seconds, max_wait_seconds)
+            early = self._early_results.pop(request_id, None)
+            if early:
+                watch.future.set_result(early[1])
+                return watch.future
+            self._watches[request_id] = watch
+            first_poll = self.sweep_interval_seconds or self.expected_render_seconds * FIRST_POLL_FRACTION
+            self._schedule(watch, first_poll)
+            self._ensure_thread()
+            self._cond.notify()
+        return watch.future
+
+    def resolve(self, request_id, status_data):
+        """
+        Delivers a completion notification (e.g. from a webhook). Returns True if
+        a waiting job was woken; otherwise the payload is kept for a later watch().
+        """
+        status = status_data.get("status") if isinstance(status_data, dict) else None
+        if status not in DONE_STATUSES and status not in FAILED_STATUSES:
+            return False
+        with self._cond:
+            watch = self._watches.get(request_id)
+            if watch is None:
+                now = time.monotonic()
+                self._early_results = {
+                    rid: item for rid, item in self._early_results.items() if now - item[0] < EARLY_RESULT_TTL_SECONDS
+                }
+                self._early_results[request_id] = (now, status_data)
+                return False
+        print(f"[Poller] {request_id}: {status} via callback after {watch.polls} poll(s)")
+        self._finish(watch, result=status_data)
+        return True
+
+    def stats(self):
+        with self._cond:
+            return {
+                "in_flight": len(self._watches),
+                "expected_render_seconds": round(self.expected_render_seconds, 1),
+            }
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    # --- Scheduling ---
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="higgsfield-poller", daemon=True)
+            self._thread.start()
+
+    def _schedule(self, watch, delay):
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), watch.request_id))
+
+    def _next_interval(self, watch, status):
+        if self.sweep_interval_seconds:
+            return self.sweep_interval_seconds
+        now = time.monotonic()
+        if status != watch.last_status and watch.last_status is not None and status == "in_progress":
+            # Rendering just started: the expected finish counts from now
+            watch.expected_done_at = now + watch.expected_seconds * (1 - FIRST_POLL_FRACTION)
+        remaining = watch.expected_done_at - now
+        if remaining > 0:
+            # Poll about twice more before the expected finish
+            interval = remaining / 2
+        else:
+            interval = watch.interval * OVERDUE_BACKOFF if status == watch.last_status else MIN_POLL_INTERVAL_SECONDS
+        return max(MIN_POLL_INTERVAL_SECONDS, min(MAX_POLL_INTERVAL_SECONDS, interval))
+
+    def _finish(self, watch, result=None, error=None):
+        with self._cond:
+            self._watches.pop(watch.request_id, None)
+            if result is not None and result.get("status") in DONE_STATUSES:
+                elapsed = time.monotonic() - watch.started_at
+                self.expected_render_seconds = (
+                    RENDER_TIME_EWMA_ALPHA * elapsed + (1 - RENDER_TIME_EWMA_ALPHA) * self.expected_render_seconds
+                )
+        try:
+            # A callback and a poll can both finish the same job; first one wins
+            if error is not None:
+                watch.future.set_exception(error)
+            else:
+                watch.future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _poll(self, watch):
+        watch.polls += 1
+        url = self.status_url_template.format(request_id=watch.request_id)
+        try:
+            if self.breaker:
+                # While the breaker is open this fails fast and the job just backs off
+                with self.breaker.guard():
+                    response = self.session.get(url, headers=self.headers, timeout=STATUS_REQUEST_TIMEOUT_SECONDS)
+                    status_data = response.json()
+            else:
+                response = self.session.get(url, headers=self.headers, timeout=STATUS_REQUEST_TIMEOUT_SECONDS)
+                status_data = response.json()
+            if not isinstance(status_data, dict):
+                raise ValueError(f"status body is {type(status_data).__name__}, not an object")
+        except Exception as e:
+            print(f"⚠️ [Poller] Status check failed for {watch.request_id}: {e}")
+            watch.interval = min(MAX_POLL_INTERVAL_SECONDS, watch.interval * OVERDUE_BACKOFF)
+            return watch.interval
+
+        status = status_data.get("status")
+        if status in DONE_STATUSES or status in FAILED_STATUSES:
+            print(f"[Poller] {watch.request_id}: {status} after {watch.polls} poll(s)")
+            self._finish(watch, result=status_data)
+            return None
+
+        watch.interval = self._next_interval(watch, status)
+        watch.last_status = status
+        return watch.interval
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+                _, _, request_id = heapq.heappop(self._heap)
+                watch = self._watches.get(request_id)
+            if watch is None or watch.future.done():
+                continue
+            if time.monotonic() > watch.deadline:
+                self._finish(watch, error=TimeoutError(f"Render {request_id} not finished before its deadline."))
+                continue
+            try:
+                delay = self._poll(watch)
+            except Exception as e:
+                # This thread serves every in-flight render; one bad response must not stop it
+                print(f"⚠️ [Poller] Unexpected error polling {request_id}: {e}")
+                delay = MAX_POLL_INTERVAL_SECONDS
+            if delay is not None:
+                with self._cond:
+                    self._schedule(watch, delay)
+
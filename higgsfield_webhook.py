@@ -0,0 +1,79 @@
+# higgsfield_webhook.py
+# Authentication of Higgsfield completion callbacks. Signed callbacks (HMAC-SHA256
+# of the raw body, hex) are verified against the shared secret, which never
+# appears in a URL. Unsigned callbacks must carry the random token registered
+# in that render's callback URL; the token is bound to the render's request_id
+# once the submit returns, so a leaked URL can't vouch for any other render.
+import os
+import hmac
+import time
+import secrets
+import hashlib
+import threading
+from urllib.parse import urlencode
+
+# Public URL of POST /webhooks/higgsfield, e.g. https://api.example.com/webhooks/higgsfield
+HIGGSFIELD_WEBHOOK_URL = os.environ.get("HIGGSFIELD_WEBHOOK_URL")
+HIGGSFIELD_WEBHOOK_SECRET = os.environ.get("HIGGSFIELD_WEBHOOK_SECRET")
+
+# With callbacks on, polling only sweeps for missed callbacks at this interval
+WEBHOOK_FALLBACK_SWEEP_SECONDS = 60
+RENDER_TOKEN_TTL_SECONDS = 24 * 3600  # tokens of renders older than this are forgotten
+
+_render_tokens = {}  # token -> (created_at, request_id or None until bound)
+_render_tokens_lock = threading.Lock()
+
+
+def webhooks_enabled() -> bool:
+    return bool(HIGGSFIELD_WEBHOOK_URL and HIGGSFIELD_WEBHOOK_SECRET)
+
+
+def new_callback():
+    """
+    (callback URL, token) to register with one render request, or (None, None)
+    when webhooks are not configured. Call bind_render(token, request_id) once
+    the submit returns the render's request_id.
+    """
+    if not webhooks_enabled():
+        return None, None
+    token = secrets.token_urlsafe(24)
+    now = time.time()
+    with _render_tokens_lock:
+        for stale in [t for t, (created_at, _) in _render_tokens.items() if now - created_at > RENDER_TOKEN_TTL_SECONDS]:
+            del _render_tokens[stale]
+        _render_tokens[token] = (now, None)
+    separator = "&" if "?" in HIGGSFIELD_WEBHOOK_URL else "?"
+    return f"{HIGGSFIELD_WEBHOOK_URL}{separator}{urlencode({'token': token})}", token
+
+
+def bind_render(token, request_id):
+    """Ties a callback token to the render it was registered with."""
+    with _render_tokens_lock:
+        if token in _render_tokens:
+            _render_tokens[token] = (_render_tokens[token][0], request_id)
+
+
+def discard_render_token(token):
+    """Forgets a token whose render was never submitted."""
+    with _render_tokens_lock:
+        _render_tokens.pop(token, None)
+
+
+def verify_callback(raw_body: bytes, request_id, signature=None, token=None) -> bool:
+    """
+    Accepts a callback with a valid body signature, or else with the token bound
+    to this request_id. A signature, when sent, must verify; the token is not a
+    fallback for a bad one.
+    """
+    if not HIGGSFIELD_WEBHOOK_SECRET:
+        return False
+    if signature:
+        expected = hmac.new(HIGGSFIELD_WEBHOOK_SECRET.encode(), raw_body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature.removeprefix("sha256=").strip())
+    if token and request_id:
+        with _render_tokens_lock:
+            created_at, bound_request_id = _render_tokens.get(token, (0, None))
+        if time.time() - created_at > RENDER_TOKEN_TTL_SECONDS:
+            return False
+        return bound_request_id is not None and hmac.compare_digest(str(bound_request_id), str(request_id))
+    return False
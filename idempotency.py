@@ -0,0 +1,55 @@
+# idempotency.py
+# Idempotency keys for POST /generate-video/. A client may send its own key in
+# the Idempotency-Key header; otherwise one is derived from the normalized
+# website and company name, so a form resubmit or a client retry lands on the
+# job that is already running (or its recent result) instead of paying for a
+# second scrape, LLM call, render and upload.
+import re
+import hashlib
+from urllib.parse import urlsplit
+
+CLIENT_KEY_TTL_SECONDS = 24 * 3600  # a client-supplied key returns the same completed job for this long
+DERIVED_KEY_TTL_SECONDS = 3600  # an identical form submission reuses a completed job for this long
+MAX_CLIENT_KEY_LENGTH = 255
+
+
+def normalize_website(url: str) -> str:
+    """'HTTPS://www.Example.com/about/?utm=x' -> 'example.com/about'"""
+    url = (url or "").strip()
+    parts = urlsplit(url if "://" in url else f"http://{url}")
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host + parts.path.rstrip("/")
+
+
+def normalize_company(name: str) -> str:
+    return re.sub(r"\s+", " ", (name or "").strip()).casefold()
+
+
+def request_fingerprint(company_name: str, website: str) -> str:
+    """Hash of the fields that determine the video; contact details don't count."""
+    material = f"{normalize_company(company_name)}\n{normalize_website(website)}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def resolve_key(client_key, company_name, website, variant=False):
+    """
+    Returns (idempotency_key, ttl_seconds). Client keys are namespaced so they
+    can never collide with derived ones. A variant request (fresh creative on
+    purpose) only attaches to an in-flight variant job, never to a finished one.
+    """
+    if client_key:
+        client_key = client_key.strip()
+        if not client_key or len(client_key) > MAX_CLIENT_KEY_LENGTH:
+            raise ValueError(f"Idempotency-Key must be 1-{MAX_CLIENT_KEY_LENGTH} characters.")
+        return f"client:{client_key}", CLIENT_KEY_TTL_SECONDS
+    if variant:
+        return f"derived-variant:{request_fingerprint(company_name, website)}", 0
+    return f"derived:{request_fingerprint(company_name, website)}", DERIVED_KEY_TTL_SECONDS
+
+
+def matches_request(job, company_name, website) -> bool:
+    """False when a client key is reused for a different video (a client bug, not a retry)."""
+    request = job["request"]
+    return request_fingerprint(request["company_name"], request["website"]) == request_fingerprint(company_name, website)
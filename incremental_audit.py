@@ -0,0 +1,286 @@
+# incremental_audit.py
+# Incremental re-audits. Every delivered audit is recorded with a comparable
+# snapshot of its inputs (site text, SEO snapshot, competitor set, PageSpeed
+# record) and the final master document. A re-audit fingerprints the fresh
+# inputs, works out which inputs changed, and regenerates only the sections
+# that depend on them (SECTION_DEPENDENCIES) through the section repair path;
+# every other section is carried over from the previous document unchanged.
+# The report opens with a "What Changed Since Last Audit" section built from
+# the snapshot diff.
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+
+import audit_sections
+import artifact_store
+from prompt_store import normalize_site_text
+
+AUDIT_HISTORY_DB_PATH = os.path.join("data", "audit_history.db")
+CHANGES_HEADING = "## What Changed Since Last Audit"
+MAX_LISTED_CHANGES = 5  # lines/sentences quoted per input in the changes section
+
+SITE_TEXT = "site_text"
+SEO_SNAPSHOT = "seo_snapshot"
+COMPETITORS = "competitors"
+PAGESPEED = "pagespeed"
+INPUT_KINDS = (SITE_TEXT, SEO_SNAPSHOT, COMPETITORS, PAGESPEED)
+INPUT_LABELS = {
+    SITE_TEXT: "Website content",
+    SEO_SNAPSHOT: "SEO snapshot",
+    COMPETITORS: "Competitor set",
+    PAGESPEED: "PageSpeed record",
+}
+
+# Master audit section -> inputs its content is written from (prompts.USER_PROMPT_MASTER_AUDIT).
+# The summary synthesizes every other section, so any change refreshes it.
+SECTION_DEPENDENCIES = {
+    "overview": {SITE_TEXT},
+    "website": {PAGESPEED},
+    "seo": {SEO_SNAPSHOT, SITE_TEXT},
+    "competitive": {COMPETITORS, SITE_TEXT},
+    "summary": set(INPUT_KINDS),
+    "video_strategy": {SITE_TEXT},
+}
+assert set(SECTION_DEPENDENCIES) == set(audit_sections.SECTION_ORDER), "every section needs its input dependencies"
+
+_LINK_RE = re.compile(r"Link:\s*(\S+)")
+_RECORD_LINE_RE = re.compile(r"^-\s*([^:]+):\s*(.+)$")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audits (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    client_key TEXT NOT NULL,
+    client_name TEXT NOT NULL,
+    website_url TEXT NOT NULL,
+    snapshot_json TEXT NOT NULL,
+    fingerprints_json TEXT NOT NULL,
+    document TEXT NOT NULL,
+    audit_link TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_audits_client ON audits(client_key, created_at);
+"""
+
+
+# --- Input snapshots and fingerprints ---
+def competitor_domains(competitors_data: str):
+    """Sorted competitor hosts from tools.get_competitors output (its 'Link: ...' parts)."""
+    domains = set()
+    for link in _LINK_RE.findall(competitors_data or ""):
+        host = re.sub(r"^https?://", "", link.rstrip(".")).split("/")[0]
+        domains.add(host[4:] if host.startswith("www.") else host)
+    return sorted(domains)
+
+
+def pagespeed_record(pagespeed_scores: str) -> dict:
+    """'- Label: value' lines of the PageSpeed report as {label: value} (scores, vitals, opportunities)."""
+    record = {}
+    for line in (pagespeed_scores or "").splitlines():
+        match = _RECORD_LINE_RE.match(line.strip())
+        if match:
+            record[match.group(1).strip()] = match.group(2).strip()
+    if not record and pagespeed_scores:
+        record["Report"] = " ".join(pagespeed_scores.split())  # failed/unparsed report: compare it whole
+    return record
+
+
+def input_snapshot(inputs: dict) -> dict:
+    """The comparable form of each input (noise such as whitespace and snippet wording dropped)."""
+    return {
+        SITE_TEXT: normalize_site_text(inputs["client_text"]),
+        SEO_SNAPSHOT: [line.strip() for line in inputs["seo_snapshot"].splitlines() if line.strip()],
+        COMPETITORS: competitor_domains(inputs["competitors_data"]),
+        PAGESPEED: pagespeed_record(inputs["pagespeed_scores"]),
+    }
+
+
+def fingerprint_snapshot(snapshot: dict) -> dict:
+    return {
+        kind: hashlib.sha256(json.dumps(snapshot[kind], sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+        for kind in INPUT_KINDS
+    }
+
+
+def affected_sections(changed_inputs):
+    """Section keys (document order) that depend on any of the changed inputs."""
+    changed = set(changed_inputs)
+    return [key for key in audit_sections.SECTION_ORDER if SECTION_DEPENDENCIES[key] & changed]
+
+
+# --- Change report ---
+def _listed(prefix, items):
+    shown = [f"  * {prefix} {item}" for item in items[:MAX_LISTED_CHANGES]]
+    if len(items) > MAX_LISTED_CHANGES:
+        shown.append(f"  * ...and {len(items) - MAX_LISTED_CHANGES} more")
+    return shown
+
+
+def describe_input_change(kind: str, previous, current):
+    """Markdown bullet lines describing how one input changed."""
+    label = INPUT_LABELS[kind]
+    if kind == SITE_TEXT:
+        old_sentences, new_sentences = _SENTENCE_SPLIT_RE.split(previous), _SENTENCE_SPLIT_RE.split(current)
+        old_set, new_set = set(old_sentences), set(new_sentences)
+        added = [s for s in new_sentences if s not in old_set]
+        removed = [s for s in old_sentences if s not in new_set]
+        return [f"* **{label}:** {len(added)} sentence(s) added, {len(removed)} removed "
+                f"({len(previous.split())} → {len(current.split())} words)."]
+    if kind == SEO_SNAPSHOT:
+        old_set, new_set = set(previous), set(current)
+        added = [line for line in current if line not in old_set]
+        removed = [line for line in previous if line not in new_set]
+        return ([f"* **{label}:** {len(added)} line(s) added, {len(removed)} removed."]
+                + _listed("New:", added) + _listed("Gone:", removed))
+    if kind == COMPETITORS:
+        added = [d for d in current if d not in previous]
+        removed = [d for d in previous if d not in current]
+        return ([f"* **{label}:** {len(added)} new, {len(removed)} no longer found."]
+                + _listed("New:", added) + _listed("Dropped:", removed))
+    lines = [f"* **{label}:**"]
+    for metric in list(previous) + [m for m in current if m not in previous]:
+        old, new = previous.get(metric, "—"), current.get(metric, "—")
+        if old != new:
+            lines.append(f"  * {metric}: {old} → {new}")
+    return lines
+
+
+def changes_section(plan) -> audit_sections.Section:
+    """The 'What Changed Since Last Audit' section for a re-audit plan."""
+    since = time.strftime("%Y-%m-%d", time.localtime(plan.previous["created_at"]))
+    if not plan.changed:
+        body = f"No changes in the audited inputs since the last audit on {since}; its findings still apply."
+        return audit_sections.Section(key=None, heading=CHANGES_HEADING, body=body)
+    lines = [f"Compared with the last audit on {since}:", ""]
+    for kind in plan.changed:
+        lines.extend(describe_input_change(kind, plan.previous_snapshot[kind], plan.snapshot[kind]))
+    unchanged = [INPUT_LABELS[kind] for kind in INPUT_KINDS if kind not in plan.changed]
+    if unchanged:
+        lines.append(f"* **Unchanged:** {', '.join(unchanged)}.")
+    titles = [audit_sections.SECTION_TITLES[key].lstrip("# ") for key in plan.affected]
+    lines.extend(["", f"**Sections updated for this audit:** {'; '.join(titles)}."])
+    return audit_sections.Section(key=None, heading=CHANGES_HEADING, body="\n".join(lines))
+
+
+def strip_changes_section(index: audit_sections.SectionIndex):
+    """Drops a changes section carried in a previous document (it is rebuilt on every re-audit)."""
+    index.sections = [s for s in index.sections if not (s.key is None and s.heading == CHANGES_HEADING)]
+    return index
+
+
+# --- Audit history ---
+def client_key(client_name: str, website_url: str) -> str:
+    url = re.sub(r"^https?://(www\.)?", "", (website_url or "").strip().casefold()).rstrip("/")
+    return f"{' '.join((client_name or '').split()).casefold()}|{url}"
+
+
+class AuditHistory:
+    def __init__(self, db_path=AUDIT_HISTORY_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def latest(self, client_name: str, website_url: str):
+        """The client's last recorded audit (snapshot and fingerprints decoded), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM audits WHERE client_key = ? ORDER BY created_at DESC, id DESC LIMIT 1",
+                (client_key(client_name, website_url),),
+            ).fetchone()
+        if not row:
+            return None
+        audit = dict(row)
+        audit["snapshot"] = json.loads(audit.pop("snapshot_json"))
+        audit["fingerprints"] = json.loads(audit.pop("fingerprints_json"))
+        return audit
+
+    def record(self, client_name: str, website_url: str, snapshot: dict, document: str, audit_link: str = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO audits (client_key, client_name, website_url, snapshot_json, fingerprints_json, "
+                "document, audit_link, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (client_key(client_name, website_url), client_name, website_url,
+                 json.dumps(snapshot, ensure_ascii=False), json.dumps(fingerprint_snapshot(snapshot)),
+                 document, audit_link, time.time()),
+            )
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history():
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = AuditHistory()
+        return _history
+
+
+# --- Re-audit ---
+@dataclass
+class ReauditPlan:
+    previous: dict  # AuditHistory.latest() row
+    snapshot: dict  # current input snapshot
+    changed: list = field(default_factory=list)  # input kinds whose fingerprint moved
+    affected: list = field(default_factory=list)  # section keys to regenerate
+
+    @property
+    def previous_snapshot(self):
+        return self.previous["snapshot"]
+
+
+def plan_reaudit(client_name: str, website_url: str, inputs: dict):
+    """A ReauditPlan against the client's last audit, or None when there is no previous audit."""
+    previous = get_history().latest(client_name, website_url)
+    if previous is None:
+        return None
+    snapshot = input_snapshot(inputs)
+    fingerprints = fingerprint_snapshot(snapshot)
+    changed = [kind for kind in INPUT_KINDS if previous["fingerprints"].get(kind) != fingerprints[kind]]
+    affected = affected_sections(changed)
+    # Sections the previous document lacks are regenerated as well
+    previous_index = audit_sections.parse_master_document(previous["document"])
+    affected += [key for key in previous_index.missing() if key not in affected]
+    affected.sort(key=audit_sections.SECTION_ORDER.index)
+    return ReauditPlan(previous=previous, snapshot=snapshot, changed=changed, affected=affected)
+
+
+def regenerate_document(openai_client, plan: ReauditPlan, master_prompt_data: dict, client_name: str = None):
+    """
+    The previous master document with plan.affected sections rewritten from the
+    fresh inputs in one targeted call. Sections the call fails to produce are
+    left missing for the caller's regular repair step.
+    """
+    index = strip_changes_section(audit_sections.parse_master_document(plan.previous["document"]))
+    if not plan.affected:
+        print("  ♻️ Inputs unchanged since the last audit; reusing its document.")
+        return index.to_markdown()
+    print(f"  🔄 Inputs changed ({', '.join(plan.changed) or 'none'}); "
+          f"regenerating section(s): {', '.join(plan.affected)}")
+    index.sections = [s for s in index.sections if s.key not in plan.affected]
+    request = audit_sections.build_section_repair_request(index, master_prompt_data, plan.affected)
+
+    def regenerate():
+        still_missing = audit_sections.repair_missing_sections(openai_client, index, master_prompt_data, plan.affected)
+        return None if still_missing else index.to_markdown()
+
+    regenerated = artifact_store.cached_stage("section_regeneration", request, regenerate, client_name)
+    return regenerated or index.to_markdown()
+
+
+def record_audit(client_name: str, website_url: str, inputs: dict, document: str, audit_link: str = None):
+    """Records a delivered audit as the baseline for the client's next re-audit."""
+    try:
+        get_history().record(client_name, website_url, input_snapshot(inputs), document, audit_link)
+    except (sqlite3.Error, KeyError, TypeError) as e:
+        print(f"  ⚠️ Could not record audit history: {e}")
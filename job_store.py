@@ -0,0 +1,155 @@
+# job_store.py
+# Persistent SQLite store for asynchronous video jobs. Each job keeps the
+# output of every finished stage (stage_data) so a worker that picks it up
+# again after a restart continues from the last completed stage.
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+JOB_DB_PATH = os.path.join("data", "jobs.db")
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+UNFINISHED_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+# The request fields a job runs on. Anything else in the request (the lead's
+# name, phone, email) is not persisted with the job.
+JOB_REQUEST_FIELDS = ("company_name", "website", "variant", "deadline_seconds", "priority")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS video_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    stage TEXT,
+    request_json TEXT NOT NULL,
+    stage_data_json TEXT NOT NULL DEFAULT '{}',
+    result_json TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    idempotency_key TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_video_jobs_status ON video_jobs(status);
+"""
+
+_IDEMPOTENCY_INDEX = "CREATE INDEX IF NOT EXISTS idx_video_jobs_idempotency ON video_jobs(idempotency_key, created_at)"
+
+
+class JobStore:
+    def __init__(self, db_path=JOB_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(video_jobs)")}
+        if "idempotency_key" not in columns:  # databases created before idempotency keys
+            self._conn.execute("ALTER TABLE video_jobs ADD COLUMN idempotency_key TEXT")
+        self._conn.execute(_IDEMPOTENCY_INDEX)
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["request"] = json.loads(job.pop("request_json"))
+        job["stage_data"] = json.loads(job.pop("stage_data_json") or "{}")
+        result = job.pop("result_json")
+        job["result"] = json.loads(result) if result else None
+        return job
+
+    def _insert_job(self, request, idempotency_key=None):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        request = {field: request[field] for field in JOB_REQUEST_FIELDS if field in request}
+        self._conn.execute(
+            "INSERT INTO video_jobs (id, status, request_json, idempotency_key, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, STATUS_QUEUED, json.dumps(request), idempotency_key, now, now),
+        )
+        return job_id
+
+    def create_job(self, request: dict) -> str:
+        with self._lock:
+            return self._insert_job(request)
+
+    def find_or_create_job(self, request: dict, idempotency_key: str, max_age_seconds: float):
+        """
+        Returns (job, created). A queued or running job with the same key is
+        reused whatever its age; a completed one only if it is younger than
+        max_age_seconds. Failed jobs are never reused, so a retry runs again.
+        The lookup and insert share one write transaction, so concurrent
+        duplicates (even from other processes) end up on the same job.
+        """
+        placeholders = ",".join("?" for _ in UNFINISHED_STATUSES)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"""SELECT * FROM video_jobs WHERE idempotency_key = ?
+                        AND (status IN ({placeholders}) OR (status = ? AND created_at >= ?))
+                        ORDER BY created_at DESC LIMIT 1""",
+                    (idempotency_key, *UNFINISHED_STATUSES, STATUS_COMPLETED, time.time() - max_age_seconds),
+                ).fetchone()
+                created = row is None
+                if created:
+                    job_id = self._insert_job(request, idempotency_key)
+                    row = self._conn.execute("SELECT * FROM video_jobs WHERE id = ?", (job_id,)).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._to_dict(row), created
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM video_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def mark_running(self, job_id: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE video_jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (STATUS_RUNNING, time.time(), job_id),
+            )
+
+    def save_stage(self, job_id: str, stage: str, **data):
+        """Records that `stage` finished, merging its outputs into stage_data."""
+        with self._lock:
+            row = self._conn.execute("SELECT stage_data_json FROM video_jobs WHERE id = ?", (job_id,)).fetchone()
+            stage_data = json.loads(row["stage_data_json"] or "{}") if row else {}
+            stage_data.update(data)
+            self._conn.execute(
+                "UPDATE video_jobs SET stage = ?, stage_data_json = ?, updated_at = ? WHERE id = ?",
+                (stage, json.dumps(stage_data), time.time(), job_id),
+            )
+
+    def complete(self, job_id: str, result: dict):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE video_jobs SET status = ?, result_json = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (STATUS_COMPLETED, json.dumps(result), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE video_jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (STATUS_FAILED, error, time.time(), job_id),
+            )
+
+    def unfinished_job_ids(self):
+        """Jobs that were queued or mid-flight, oldest first (e.g. to resume after a restart)."""
+        placeholders = ",".join("?" for _ in UNFINISHED_STATUSES)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM video_jobs WHERE status IN ({placeholders}) ORDER BY created_at",
+                UNFINISHED_STATUSES,
+            ).fetchall()
+        return [row["id"] for row in rows]
@@ -0,0 +1,203 @@
+# llm_accounting.py
+# Token and latency accounting for every chat-completion call. Each call is
+# appended to a JSONL file and aggregated per job and per stage in memory;
+# the aggregates are exported as Prometheus text on the API's /metrics route.
+import os
+import json
+import time
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import config
+
+USAGE_LOG_FILE = os.path.join("logs", "llm_usage.jsonl")
+JOB_SUMMARY_DIR = os.path.join("logs", "jobs")
+# Jobs kept in memory; the least recently updated is dropped past this. A job's
+# entry is also dropped once export_job_summary has written it out.
+MAX_TRACKED_JOBS = int(os.getenv("LLM_ACCOUNTING_MAX_JOBS", "500"))
+
+_current_job = contextvars.ContextVar("llm_accounting_job", default="unscoped")
+_lock = threading.Lock()
+_per_job = OrderedDict()  # job_id -> stage -> totals, least recently updated first
+_per_stage = {}  # (stage, model) -> totals
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """USD estimate from config.MODEL_PROFILES (0 for unknown models)."""
+    profile = config.MODEL_PROFILES.get(model, {})
+    return (prompt_tokens * profile.get("input_usd_per_1m", 0) + completion_tokens * profile.get("output_usd_per_1m", 0)) / 1_000_000
+
+
+@contextmanager
+def job_context(job_id):
+    """Attributes every LLM call made inside the block (and threads started with its context) to job_id."""
+    token = _current_job.set(job_id)
+    try:
+        yield job_id
+    finally:
+        _current_job.reset(token)
+
+
+def current_job():
+    return _current_job.get()
+
+
+def _empty_totals():
+    return {
+        "calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0,
+        "latency_seconds": 0.0, "retries": 0, "cache_hits": 0, "cost_usd": 0.0,
+    }
+
+
+def _add(totals, record):
+    totals["calls"] += 1
+    totals["errors"] += 1 if record["error"] else 0
+    totals["prompt_tokens"] += record["prompt_tokens"]
+    totals["completion_tokens"] += record["completion_tokens"]
+    totals["cached_tokens"] += record["cached_tokens"]
+    totals["latency_seconds"] += record["latency_seconds"] or 0.0
+    totals["retries"] += record["retries"]
+    totals["cache_hits"] += 1 if record["cache_hit"] else 0
+    totals["cost_usd"] += record["cost_usd"]
+
+
+def _usage_counts(completion, model, messages):
+    """Prompt/completion/cached tokens from the response usage, counted locally when absent."""
+    # Imported lazily: model_router records through this module
+    from model_router import count_message_tokens, count_tokens
+
+    if isinstance(completion, dict):
+        usage = completion.get("usage")
+    else:
+        usage = getattr(completion, "usage", None)
+    if isinstance(usage, dict):  # batch results carry plain JSON
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+        cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+    else:
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None) or 0
+
+    counted_locally = False
+    if prompt_tokens is None:
+        prompt_tokens = count_message_tokens(messages, model) if messages else 0
+        counted_locally = True
+    if completion_tokens is None:
+        content = ""
+        if completion is not None:
+            try:
+                choices = completion["choices"] if isinstance(completion, dict) else completion.choices
+                for choice in choices:
+                    message = choice["message"] if isinstance(choice, dict) else choice.message
+                    content += (message["content"] if isinstance(message, dict) else message.content) or ""
+            except Exception:
+                content = ""
+        completion_tokens = count_tokens(content, model) if content else 0
+        counted_locally = True
+    return prompt_tokens, completion_tokens, cached_tokens, counted_locally
+
+
+def record_call(stage, model, messages=None, completion=None, latency_seconds=None, retries=0, cache_hit=False, error=None, job_id=None):
+    """
+    Records one LLM call (or a cache hit that replaced one).
+    `completion` may be an SDK response object or a plain dict (batch output).
+    """
+    prompt_tokens, completion_tokens, cached_tokens, counted_locally = (0, 0, 0, False)
+    if not cache_hit:
+        prompt_tokens, completion_tokens, cached_tokens, counted_locally = _usage_counts(completion, model, messages)
+    record = {
+        "ts": time.time(),
+        "job_id": job_id or current_job(),
+        "stage": stage,
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cached_tokens": cached_tokens,
+        "tokens_counted_locally": counted_locally,
+        "latency_seconds": round(latency_seconds, 3) if latency_seconds is not None else None,
+        "retries": retries,
+        # Provider-side prompt caching also counts as a (partial) cache hit
+        "cache_hit": bool(cache_hit or cached_tokens),
+        # Cached prompt tokens are billed at roughly half price
+        "cost_usd": 0.0 if error else round(estimate_cost(model, prompt_tokens - cached_tokens / 2, completion_tokens), 6),
+        "error": str(error) if error else None,
+    }
+
+    with _lock:
+        _add(_per_job.setdefault(record["job_id"], {}).setdefault(stage, _empty_totals()), record)
+        _per_job.move_to_end(record["job_id"])
+        while len(_per_job) > MAX_TRACKED_JOBS:
+            _per_job.popitem(last=False)
+        _add(_per_stage.setdefault((stage, model), _empty_totals()), record)
+        try:
+            os.makedirs(os.path.dirname(USAGE_LOG_FILE), exist_ok=True)
+            with open(USAGE_LOG_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except Exception as e:
+            print(f"  ⚠️ [Accounting] Could not write usage log: {e}")
+    return record
+
+
+def job_summary(job_id=None):
+    """Per-stage totals for one job, plus an overall total."""
+    job_id = job_id or current_job()
+    with _lock:
+        stages = {stage: dict(totals) for stage, totals in _per_job.get(job_id, {}).items()}
+    overall = _empty_totals()
+    for totals in stages.values():
+        for k in overall:
+            overall[k] += totals[k]
+    return {"job_id": job_id, "stages": stages, "total": overall}
+
+
+def export_job_summary(job_id=None):
+    """
+    Writes the job's summary to logs/jobs/<job_id>.json and returns the path.
+    The job's in-memory totals are dropped afterwards.
+    """
+    summary = job_summary(job_id)
+    with _lock:
+        _per_job.pop(summary["job_id"], None)
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in summary["job_id"])
+    os.makedirs(JOB_SUMMARY_DIR, exist_ok=True)
+    path = os.path.join(JOB_SUMMARY_DIR, f"{safe_name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return path
+
+
+def print_job_summary(job_id=None):
+    summary = job_summary(job_id)
+    print(f"\n--- LLM Usage for {summary['job_id']} ---")
+    for stage, t in summary["stages"].items():
+        print(f"  {stage}: {t['calls']} call(s), {t['prompt_tokens']} prompt + {t['completion_tokens']} completion tokens, "
+              f"{t['latency_seconds']:.1f}s, {t['retries']} retries, {t['cache_hits']} cache hits, ${t['cost_usd']:.4f}")
+    t = summary["total"]
+    print(f"  TOTAL: {t['prompt_tokens'] + t['completion_tokens']} tokens, {t['latency_seconds']:.1f}s, ${t['cost_usd']:.4f}")
+
+
+def render_prometheus():
+    """Per stage/model counters in Prometheus text exposition format."""
+    metrics = [
+        ("llm_calls_total", "calls", "LLM calls"),
+        ("llm_errors_total", "errors", "Failed LLM calls"),
+        ("llm_prompt_tokens_total", "prompt_tokens", "Prompt tokens"),
+        ("llm_completion_tokens_total", "completion_tokens", "Completion tokens"),
+        ("llm_cached_tokens_total", "cached_tokens", "Prompt tokens served from the provider cache"),
+        ("llm_latency_seconds_total", "latency_seconds", "Summed LLM call latency"),
+        ("llm_retries_total", "retries", "Fallback attempts"),
+        ("llm_cache_hits_total", "cache_hits", "Calls answered fully or partly from a cache"),
+        ("llm_cost_usd_total", "cost_usd", "Estimated cost in USD"),
+    ]
+    with _lock:
+        snapshot = {key: dict(totals) for key, totals in _per_stage.items()}
+    lines = []
+    for name, field, help_text in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (stage, model), totals in sorted(snapshot.items()):
+            lines.append(f'{name}{{stage="{stage}",model="{model}"}} {totals[field]}')
+    return "\n".join(lines) + "\n"
@@ -1,10 +1,24 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Header, Response
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from video_generation import generate_video_asset, scrape_website_data, generate_video_prompt, get_drive_client, ensure_drive_folder, upload_to_drive
-import anyio
+from job_store import JobStore
+from video_jobs import VideoJobWorker, public_job_view
+import llm_accounting
+import higgsfield_webhook
+import idempotency
+import scheduler
+import circuit_breaker
+import google_auth
+from video_generation import get_video_poller
+import json
 
 app = FastAPI()
 
+# Jobs live in SQLite and run on a bounded worker pool, so requests return immediately
+job_store = JobStore()
+video_worker = VideoJobWorker(job_store)
+MAX_JOB_DEADLINE_SECONDS = 3600
+
 # Pydantic model to define expected input structure
 class VideoRequest(BaseModel):
     name: str
@@ -13,15 +27,47 @@ class VideoRequest(BaseModel):
     company_name: str  # Only company_name and website will be used for video generation
     website: str  # Only company_name and website will be used for video generation
     consent: bool
+    variant: bool = False  # True = fresh creative even if the site is unchanged since the last video
+    deadline_seconds: float = None  # end-to-end budget; defaults to VIDEO_JOB_DEADLINE_SECONDS
+    priority: str = scheduler.INTERACTIVE  # "bulk" for scripted/bulk submissions so live prospects go first
 
 @app.get("/")
 def home():
     return {"message": "✅ FastAPI server is live. Use POST /generate-video with JSON body"}
 
-@app.post("/generate-video/")
-async def generate_video(request: VideoRequest):
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus-format LLM counters per stage/model, scheduler queues per resource/priority and provider breaker state."""
+    return (
+        llm_accounting.render_prometheus()
+        + scheduler.scheduler.render_prometheus()
+        + circuit_breaker.render_prometheus()
+    )
+
+@app.on_event("startup")
+def warm_google_credentials():
+    # Load/refresh the shared Google token now, not inside the first job's upload
+    google_auth.warm_up()
+
+@app.on_event("startup")
+def resume_video_jobs():
+    resumed = video_worker.resume_unfinished()
+    if resumed:
+        print(f"♻️ Resumed {resumed} unfinished video job(s).")
+
+@app.on_event("shutdown")
+def stop_video_worker():
+    video_worker.shutdown()
+
+@app.post("/generate-video/", status_code=202)
+async def generate_video(request: VideoRequest, response: Response, idempotency_key: str = Header(None)):
     """
-    API endpoint to generate a video based on client data (only company_name and website will be used for video generation).
+    API endpoint to queue a video job based on client data (only company_name and website will be used for video generation).
+    Returns a job ID immediately; poll GET /generate-video/{job_id} for status and result.
+
+    Duplicate submissions (same Idempotency-Key header, or without one the same
+    company and website) attach to the job already in flight, and a recently
+    completed job is returned as-is with status 200.
     """
     # Extract the data from the request body
     name = request.name
@@ -33,32 +79,64 @@ async def generate_video(request: VideoRequest):
 
     print(f"📩 Received form data: {name}, {phone}, {email}, {company_name}, {website_url}, {consent}")
 
-    # Scrape the website data using the provided website URL
-    website_text = await anyio.to_thread.run_sync(scrape_website_data, website_url)  # Pass website_url to this function
-    if not website_text:
-        raise HTTPException(status_code=400, detail="Failed to scrape website data.")
+    if request.deadline_seconds is not None and not 0 < request.deadline_seconds <= MAX_JOB_DEADLINE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"deadline_seconds must be between 0 and {MAX_JOB_DEADLINE_SECONDS}.")
+    if request.priority not in scheduler.PRIORITY_CLASSES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of {scheduler.PRIORITY_CLASSES}.")
+    try:
+        key, ttl_seconds = idempotency.resolve_key(idempotency_key, company_name, website_url, variant=request.variant)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    job, created = job_store.find_or_create_job(request.dict(), key, max_age_seconds=ttl_seconds)
+    if created:
+        video_worker.submit(job["id"], priority=request.priority)
+        return {"job_id": job["id"], "status": "queued", "status_url": f"/generate-video/{job['id']}", "deduplicated": False}
+
+    if not idempotency.matches_request(job, company_name, website_url):
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request.")
+    print(f"🔁 Duplicate submission attached to job {job['id'][:8]} ({job['status']})")
+    if job["status"] == "completed":
+        response.status_code = 200
+    return {**public_job_view(job), "status_url": f"/generate-video/{job['id']}", "deduplicated": True}
 
-    # Generate JSON prompt for video generation using the scraped website data and company name
+@app.post("/webhooks/higgsfield")
+async def higgsfield_callback(request: Request, token: str = None):
+    """
+    Render-completion callback from Higgsfield. Verified by its body signature, or
+    by the per-render URL token bound to its request_id, then wakes the job
+    waiting on that render.
+    """
+    if not higgsfield_webhook.webhooks_enabled():
+        raise HTTPException(status_code=404, detail="Webhooks are not enabled.")
+
+    raw_body = await request.body()
     try:
-        json_prompt = generate_video_prompt(company_name, website_text)  # No await, since the function is not async
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to generate video prompt: {str(e)}")
-
-    # Generate the video based on the prompt
-    local_video_path = generate_video_asset(json_prompt, company_name)
-
-    if local_video_path:
-        # Upload the video to Google Drive
-        try:
-            drive = get_drive_client()  # Get Google Drive client
-            folder_id = ensure_drive_folder(drive, folder_name="Video Assets")  # Ensure the folder exists or create it
-            upload_link = upload_to_drive(drive, folder_id, local_video_path, f"{company_name} - Video.mp4")  # Upload the video
-            return {"message": "Video generated successfully", "video_path": local_video_path, "upload_link": upload_link}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to upload video to Drive: {str(e)}")
-    else:
-        raise HTTPException(status_code=500, detail="Video generation failed.")
-    
+        payload = json.loads(raw_body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body.")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Expected a JSON object.")
+    request_id = payload.get("request_id") or payload.get("id")
+    if not request_id:
+        raise HTTPException(status_code=400, detail="Missing request_id.")
+
+    signature = request.headers.get("X-Webhook-Signature") or request.headers.get("X-Higgsfield-Signature")
+    if not higgsfield_webhook.verify_callback(raw_body, request_id, signature=signature, token=token):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature.")
+
+    woken = get_video_poller().resolve(request_id, payload)
+    return {"received": True, "request_id": request_id, "woke_waiting_job": woken}
+
+@app.get("/generate-video/{job_id}")
+def get_video_job(job_id: str):
+    """
+    Status of a video job. `result` holds the video path and Drive link once status is 'completed';
+    `error` explains a 'failed' job.
+    """
+    job = job_store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return public_job_view(job)
 
 
 # %%
@@ -0,0 +1,295 @@
+# model_router.py
+# Picks a model per LLM call from the measured input size, the stage's latency
+# budget and recently observed latency/error rates, and falls back to the next
+# model in the stage's route when the chosen one times out.
+import os
+import json
+import time
+import threading
+from dataclasses import dataclass, field
+
+import openai
+
+import config
+import llm_accounting
+import deadline
+import circuit_breaker
+from scheduler import scheduler
+
+ROUTING_LOG_FILE = os.path.join("logs", "model_routing.jsonl")
+
+EWMA_ALPHA = 0.3  # weight of the newest observation in latency/error averages
+MAX_ERROR_RATE = 0.5  # skip a model whose recent error rate is above this
+# A skipped model gets no new observations, so its averages decay over time
+# instead: the error rate toward 0 and latency toward the profile prior, each
+# losing half its weight per half-life, until the model is eligible again.
+HEALTH_HALF_LIFE_SECONDS = float(os.getenv("ROUTER_HEALTH_HALF_LIFE_SECONDS", "300"))
+OUTPUT_TOKEN_RESERVE = 4096  # context headroom kept for the completion
+PREFILL_SECONDS_PER_1K_TOKENS = 0.15  # rough extra latency per 1k input tokens
+
+# Errors that trigger a fallback to the next model instead of failing the call.
+FALLBACK_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to a character estimate
+    tiktoken = None
+
+_encodings = {}
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    """Counts tokens locally with tiktoken (approximate ~4 chars/token without it)."""
+    key = model or "default"
+    if tiktoken is not None and key not in _encodings:
+        try:
+            _encodings[key] = tiktoken.encoding_for_model(model)
+        except Exception:
+            try:
+                _encodings[key] = tiktoken.get_encoding("o200k_base")
+            except Exception:  # encoding files not cached and no network
+                _encodings[key] = None
+    encoding = _encodings.get(key)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages, model: str = None) -> int:
+    # ~4 tokens of framing per chat message
+    return sum(count_tokens(m.get("content") or "", model) + 4 for m in messages)
+
+
+@dataclass
+class Route:
+    stage: str
+    models: list  # chosen model first, then fallbacks in order
+    input_tokens: int
+    latency_budget_seconds: float
+    reason: str
+    skipped: dict = field(default_factory=dict)  # model -> why it wasn't chosen
+
+
+@dataclass
+class _ModelStats:
+    latency_ewma: float = None
+    error_rate_ewma: float = 0.0
+    calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    fallbacks: int = 0
+    total_latency: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    updated_at: float = None  # time.monotonic() of the last recorded outcome
+
+
+class ModelRouter:
+    def __init__(self, routes=None, profiles=None, log_file=ROUTING_LOG_FILE):
+        self.routes = routes or config.MODEL_ROUTES
+        self.profiles = profiles or config.MODEL_PROFILES
+        self.log_file = log_file
+        self._stats = {}  # (stage, model) -> _ModelStats
+        self._lock = threading.Lock()
+
+    # --- Decision ---
+    def _stats_for(self, stage, model):
+        return self._stats.setdefault((stage, model), _ModelStats())
+
+    def _prior_latency(self, model):
+        return self.profiles.get(model, {}).get("prior_latency_seconds", 10)
+
+    def _decayed(self, stats, model, now):
+        """(error_rate, latency) averages with the decay since the last outcome applied."""
+        if stats.updated_at is None:
+            return stats.error_rate_ewma, stats.latency_ewma
+        weight = 0.5 ** ((now - stats.updated_at) / HEALTH_HALF_LIFE_SECONDS)
+        latency = stats.latency_ewma
+        if latency is not None:
+            prior = self._prior_latency(model)
+            latency = prior + (latency - prior) * weight
+        return stats.error_rate_ewma * weight, latency
+
+    def predicted_latency(self, stage, model, input_tokens):
+        with self._lock:
+            _, observed = self._decayed(self._stats_for(stage, model), model, time.monotonic())
+        base = observed if observed is not None else self._prior_latency(model)
+        return base + input_tokens / 1000 * PREFILL_SECONDS_PER_1K_TOKENS
+
+    def choose_route(self, stage, messages, preferred_model=None) -> Route:
+        route_config = self.routes[stage]
+        candidates = list(route_config["models"])
+        if preferred_model:
+            candidates = [preferred_model] + [m for m in candidates if m != preferred_model]
+        budget = route_config["latency_budget_seconds"]
+        input_tokens = count_message_tokens(messages, candidates[0])
+
+        eligible, skipped = [], {}
+        for model in candidates:
+            context = self.profiles.get(model, {}).get("context_tokens")
+            if context and input_tokens + OUTPUT_TOKEN_RESERVE > context:
+                skipped[model] = f"input {input_tokens} tokens exceeds context {context}"
+                continue
+            with self._lock:
+                error_rate, _ = self._decayed(self._stats_for(stage, model), model, time.monotonic())
+            if error_rate > MAX_ERROR_RATE:
+                skipped[model] = f"recent error rate {error_rate:.2f}"
+                continue
+            predicted = self.predicted_latency(stage, model, input_tokens)
+            if predicted > budget:
+                skipped[model] = f"predicted {predicted:.1f}s over {budget}s budget"
+                continue
+            eligible.append(model)
+
+        if eligible:
+            chosen = eligible
+            reason = "preferred" if eligible[0] == candidates[0] else f"skipped {', '.join(skipped)}"
+        else:
+            # Nothing fits: try the fastest predicted model first, rest as fallbacks
+            chosen = sorted(candidates, key=lambda m: self.predicted_latency(stage, m, input_tokens))
+            reason = "no model fits the budget; fastest predicted first"
+        fallbacks = [m for m in candidates if m not in chosen]
+        return Route(stage, chosen + fallbacks, input_tokens, budget, reason, skipped)
+
+    # --- Outcome recording ---
+    def _record(self, route, model, outcome, latency, completion=None, fallback_used=False):
+        """
+        outcome is "ok", "timeout", "error" (a FALLBACK_ERRORS failure) or
+        "rejected" (the request itself was refused, e.g. a 400); rejections are
+        counted as errors but say nothing about the model's health.
+        """
+        usage = getattr(completion, "usage", None)
+        input_tokens = getattr(usage, "prompt_tokens", None) or route.input_tokens
+        output_tokens = getattr(usage, "completion_tokens", None) or 0
+        cost = llm_accounting.estimate_cost(model, input_tokens, output_tokens) if completion is not None else 0.0
+
+        with self._lock:
+            stats = self._stats_for(route.stage, model)
+            now = time.monotonic()
+            stats.error_rate_ewma, stats.latency_ewma = self._decayed(stats, model, now)
+            stats.updated_at = now
+            stats.calls += 1
+            stats.total_latency += latency
+            failed = outcome != "ok"
+            if outcome != "rejected":
+                stats.error_rate_ewma = EWMA_ALPHA * (1.0 if failed else 0.0) + (1 - EWMA_ALPHA) * stats.error_rate_ewma
+            if failed:
+                stats.errors += 1
+                if outcome == "timeout":
+                    stats.timeouts += 1
+            else:
+                base_latency = max(0.0, latency - route.input_tokens / 1000 * PREFILL_SECONDS_PER_1K_TOKENS)
+                stats.latency_ewma = base_latency if stats.latency_ewma is None else EWMA_ALPHA * base_latency + (1 - EWMA_ALPHA) * stats.latency_ewma
+                stats.input_tokens += input_tokens
+                stats.output_tokens += output_tokens
+                stats.cost_usd += cost
+            if fallback_used:
+                stats.fallbacks += 1
+
+        record = {
+            "ts": time.time(),
+            "stage": route.stage,
+            "model": model,
+            "route": route.models,
+            "reason": route.reason,
+            "skipped": route.skipped,
+            "input_tokens": route.input_tokens,
+            "latency_budget_seconds": route.latency_budget_seconds,
+            "outcome": outcome,
+            "latency_seconds": round(latency, 3),
+            "output_tokens": output_tokens,
+            "cost_usd": round(cost, 6),
+            "fallback": fallback_used,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+            with self._lock, open(self.log_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except Exception as e:
+            print(f"  ⚠️ [Router] Could not write routing log: {e}")
+
+    # --- Execution ---
+    def complete(self, openai_client, stage, messages, route=None, **kwargs):
+        """
+        Runs a chat completion for `stage` following the route, with the stage's
+        latency budget (capped by the request deadline, if any) as the
+        per-attempt timeout. Returns (completion, model).
+        """
+        route = route or self.choose_route(stage, messages, kwargs.pop("model", None))
+        kwargs.pop("model", None)
+        last_error = None
+        openai_breaker = circuit_breaker.breaker("openai")
+        for i, model in enumerate(route.models):
+            if i > 0:
+                print(f"  ↪️ [Router] {stage}: falling back to {model} ({last_error.__class__.__name__}).")
+            if not openai_breaker.allows_calls():
+                # Every model in the route is the same provider; don't queue for a slot just to fail
+                raise circuit_breaker.CircuitOpenError(f"openai circuit is open; {stage} call not attempted.")
+            # The slot is held for the call only; queueing for it isn't counted as model latency
+            with scheduler.slot("llm"):
+                timeout = deadline.timeout(route.latency_budget_seconds, f"{stage} LLM call")
+                started = time.monotonic()
+                try:
+                    # Only provider-side errors (timeouts, 5xx, rate limits) count against the breaker;
+                    # a timeout the request deadline cut short is DeadlineExceeded and counts nowhere
+                    with openai_breaker.guard(failure_exceptions=FALLBACK_ERRORS), deadline.capped_call(
+                        f"{stage} LLM call", route.latency_budget_seconds, timeout, openai.APITimeoutError
+                    ):
+                        completion = openai_client.with_options(
+                            timeout=timeout, max_retries=0
+                        ).chat.completions.create(model=model, messages=messages, **kwargs)
+                except (circuit_breaker.CircuitOpenError, deadline.DeadlineExceeded):
+                    raise
+                except FALLBACK_ERRORS as e:
+                    latency = time.monotonic() - started
+                    outcome = "timeout" if isinstance(e, openai.APITimeoutError) else "error"
+                    self._record(route, model, outcome, latency, fallback_used=i > 0)
+                    llm_accounting.record_call(stage, model, messages, latency_seconds=latency, retries=i, error=e)
+                    last_error = e
+                    continue
+                except Exception as e:
+                    latency = time.monotonic() - started
+                    self._record(route, model, "rejected", latency, fallback_used=i > 0)
+                    llm_accounting.record_call(stage, model, messages, latency_seconds=latency, retries=i, error=e)
+                    raise
+                latency = time.monotonic() - started
+            self._record(route, model, "ok", latency, completion, fallback_used=i > 0)
+            llm_accounting.record_call(stage, model, messages, completion, latency_seconds=latency, retries=i)
+            return completion, model
+        raise last_error
+
+    def summary(self):
+        """Per stage/model latency, error and cost totals."""
+        with self._lock:
+            return {
+                f"{stage}/{model}": {
+                    "calls": s.calls,
+                    "errors": s.errors,
+                    "timeouts": s.timeouts,
+                    "fallbacks": s.fallbacks,
+                    "avg_latency_seconds": round(s.total_latency / s.calls, 3) if s.calls else None,
+                    "error_rate_ewma": round(s.error_rate_ewma, 3),
+                    "input_tokens": s.input_tokens,
+                    "output_tokens": s.output_tokens,
+                    "cost_usd": round(s.cost_usd, 6),
+                }
+                for (stage, model), s in self._stats.items()
+            }
+
+
+# Process-wide router shared by audit_research and video_generation
+router = ModelRouter()
+
+
+def choose_route(stage, messages, preferred_model=None) -> Route:
+    return router.choose_route(stage, messages, preferred_model)
+
+
+def routed_completion(openai_client, stage, messages, route=None, **kwargs):
+    return router.complete(openai_client, stage, messages, route=route, **kwargs)
@@ -0,0 +1,147 @@
+# process_pool.py
+# Optional process-pool execution for the CPU-bound pipeline stages (HTML ->
+# visible text in the scraper, DOCX rendering). Threads can't run pure-Python
+# work in parallel, so in a bulk run those stages serialize on one core while
+# the I/O stages (browser, Serper, PageSpeed, LLM, Drive) sit waiting. With
+# CPU_WORKERS > 0 the CPU stages run in a pool of worker processes instead; the
+# I/O stages stay on the existing threads and scheduler slots. CPU_WORKERS=0
+# (the default) runs everything inline, as before.
+#
+# Large text blobs (page HTML, the master document) are handed over through a
+# shared-memory block rather than pickled through the pool's pipe: the parent
+# writes the UTF-8 bytes once, the worker decodes straight from the mapping,
+# and only the block's name and size cross the pipe. Small blobs go inline.
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import deadline
+
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", "0"))
+CPU_TASK_TIMEOUT_SECONDS = 120
+SHARED_MEMORY_MIN_BYTES = int(os.getenv("SHARED_MEMORY_MIN_BYTES", str(64 * 1024)))
+
+_pool = None
+_workers = CPU_WORKERS
+_pool_lock = threading.Lock()
+
+
+class Blob:
+    """
+    A str handed to a worker process: in shared memory from SHARED_MEMORY_MIN_BYTES
+    up (when a pool is configured), inline bytes otherwise.
+    """
+
+    def __init__(self, text: str):
+        data = text.encode("utf-8")
+        self.size = len(data)
+        self._shm = None
+        self.inline = None
+        self.shm_name = None
+        if self.size >= SHARED_MEMORY_MIN_BYTES and _workers > 0:
+            self._shm = shared_memory.SharedMemory(create=True, size=self.size)
+            self._shm.buf[:self.size] = data
+            self.shm_name = self._shm.name
+        else:
+            self.inline = data
+
+    def __getstate__(self):
+        return {"size": self.size, "inline": self.inline, "shm_name": self.shm_name, "_shm": None}
+
+    def text(self) -> str:
+        """The str again (in the worker, or inline in the parent)."""
+        if self.shm_name is None:
+            return self.inline.decode("utf-8")
+        if self._shm is not None:
+            return str(self._shm.buf[:self.size], "utf-8")
+        shm = shared_memory.SharedMemory(name=self.shm_name)
+        try:
+            return str(shm.buf[:self.size], "utf-8")
+        finally:
+            shm.close()
+
+    def release(self):
+        """Frees the shared-memory block (parent side, once the worker is done with it)."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+def workers() -> int:
+    return _workers
+
+
+def configure(worker_count: int):
+    """Sets the pool size (0 = run CPU stages inline). Replaces a running pool."""
+    global _workers, _pool
+    with _pool_lock:
+        if worker_count == _workers and (_pool is not None or worker_count == 0):
+            return
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+        _workers = max(0, worker_count)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None and _workers > 0:
+            # Not fork: the parent has threads holding locks and SQLite connections
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=_workers, mp_context=context)
+        return _pool
+
+
+def _reset_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def shutdown():
+    configure(0)
+
+
+atexit.register(shutdown)
+
+
+def run_cpu(fn, *args, stage: str = "cpu stage"):
+    """
+    Runs fn(*args) in the worker pool when one is configured, else inline.
+    fn must be a module-level function; Blob arguments are released after the
+    call. A broken pool (a worker killed) is replaced and the call runs inline.
+    A task that outlives CPU_TASK_TIMEOUT_SECONDS raises TimeoutError naming the
+    stage, or DeadlineExceeded when the request deadline cut the wait short.
+    """
+    pool = _get_pool()
+    try:
+        if pool is None:
+            return fn(*args)
+        try:
+            future = pool.submit(fn, *args)
+            timeout = deadline.timeout(CPU_TASK_TIMEOUT_SECONDS, stage)
+            with deadline.capped_call(stage, CPU_TASK_TIMEOUT_SECONDS, timeout, FuturesTimeoutError):
+                try:
+                    return future.result(timeout=timeout)
+                except FuturesTimeoutError:
+                    future.cancel()  # drops it if still queued; a running task can't be interrupted
+                    raise FuturesTimeoutError(
+                        f"{stage} did not finish within {timeout:.1f}s in the CPU worker pool."
+                    ) from None
+        except BrokenProcessPool as e:
+            print(f"  ⚠️ [CPU Pool] Worker pool broke during {stage} ({e}); running inline.")
+            _reset_pool(pool)
+            return fn(*args)
+    finally:
+        for arg in args:
+            if isinstance(arg, Blob):
+                arg.release()
@@ -0,0 +1,74 @@
+# prompt_store.py
+# Persistent store of finished video prompts (the JSON after
+# enforce_voiceover_rules), keyed by a fingerprint of the company name and the
+# normalized scraped site text. A brand whose site hasn't changed gets its last
+# prompt back without an LLM call; asking for a variant generates fresh
+# creative and stores it as the brand's newest prompt.
+import os
+import re
+import time
+import hashlib
+import sqlite3
+import threading
+
+PROMPT_DB_PATH = os.path.join("data", "prompts.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS video_prompts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fingerprint TEXT NOT NULL,
+    company_name TEXT NOT NULL,
+    json_prompt TEXT NOT NULL,
+    model TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_video_prompts_fingerprint ON video_prompts(fingerprint, created_at);
+"""
+
+
+def normalize_site_text(text: str) -> str:
+    # Scrapes of an unchanged site differ only in whitespace and case noise
+    return re.sub(r"\s+", " ", (text or "")).strip().casefold()
+
+
+def prompt_fingerprint(company_name: str, website_text: str, template_digest: str = "") -> str:
+    """
+    template_digest identifies the prompt template, so editing the template
+    invalidates every stored prompt instead of serving output of the old one.
+    """
+    company = re.sub(r"\s+", " ", (company_name or "").strip()).casefold()
+    material = "\n".join((template_digest, company, normalize_site_text(website_text)))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class PromptStore:
+    def __init__(self, db_path=PROMPT_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def latest(self, fingerprint: str):
+        """Newest stored prompt for the fingerprint as a dict, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM video_prompts WHERE fingerprint = ? ORDER BY created_at DESC, id DESC LIMIT 1",
+                (fingerprint,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def put(self, fingerprint: str, company_name: str, json_prompt: str, model: str = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO video_prompts (fingerprint, company_name, json_prompt, model, created_at) VALUES (?, ?, ?, ?, ?)",
+                (fingerprint, company_name, json_prompt, model, time.time()),
+            )
+
+    def variant_count(self, fingerprint: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM video_prompts WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()[0]
@@ -18,15 +18,21 @@ You are writing a **Master Marketing Audit Document** for {client_name}.
 4. **Technical & Performance Data:** {pagespeed_scores}
 5. **Business Context:** {business_type}
 
+**Output Contract (Mandatory):**
+- Follow the Markdown sequence below exactly and keep every numbered heading verbatim.
+- Put each `<!-- section: ... -->` marker on its own line directly above its heading, exactly as shown.
+
 **Structure (Must follow this Markdown sequence):**
 
 # Master Marketing Audit: {client_name}
 
+<!-- section: overview -->
 ## 1. Client Overview & Core Strategy
 * **Business Type:** {business_type}
 * **Core Value Proposition:** (Analyze {client_text})
 * **Target Audience:** (Infer from {client_text})
 
+<!-- section: website -->
 ## 2. Website Audit Summary (UX, Speed, Mobile)
 * **Performance Snapshot:**
 {pagespeed_scores}
@@ -34,19 +40,57 @@ You are writing a **Master Marketing Audit Document** for {client_name}.
 * **Business Impact:** Explain clearly how specific scores are likely hurting revenue (e.g., "High bounce rates on mobile").
 * **Actionable Fix:** Select the #1 opportunity and detail the steps to fix it.
 
+<!-- section: seo -->
 ## 3. SEO & Content Strategy
 * **On-Page SEO Audit:** (Analyze {seo_snapshot} and {client_text}. Comment on title tags, headings, and internal linking structure.)
 * **Content Gap Analysis:** (Recommend 3 high-value, unmet content topics based on {client_text} and implied search intent.)
 * **Actionable Fix:** Recommend the highest-impact content piece to create now.
 
+<!-- section: competitive -->
 ## 4. Competitive Landscape
 * **Competitive Table:** (Reference the JSON table provided below.)
 * **Positioning Analysis:** Summarize {client_name}'s market position relative to its competitors (unique strengths vs. shared weaknesses).
 * **Actionable Fix:** Propose a single messaging change to immediately differentiate {client_name} in the market.
 
+<!-- section: summary -->
 ## 5. Summary & Next Steps
 * **Top 3 Strategic Priorities:** (List the three most important, non-technical marketing actions.)
 * **30-Day Execution Plan:** (List 5 concrete, first-step tasks for the marketing team.)
+
+<!-- section: video_strategy -->
+## 6. Video Strategy Recommendation
+* **Video Concept:** (Describe a 12-second outdoor, selfie-style UGC video that communicates {client_name}'s core value proposition.)
+* **Presenter & Setting:** (Describe the presenter archetype and outdoor environment that best fit the brand.)
+* **Key Message:** (The single message the voiceover must land, in one sentence.)
+"""
+
+# 2b. MASTER AUDIT SECTION CONTRACT
+# (key, canonical heading) in document order. The keys match the <!-- section: key --> markers above.
+MASTER_AUDIT_SECTIONS = [
+    ("overview", "## 1. Client Overview & Core Strategy"),
+    ("website", "## 2. Website Audit Summary (UX, Speed, Mobile)"),
+    ("seo", "## 3. SEO & Content Strategy"),
+    ("competitive", "## 4. Competitive Landscape"),
+    ("summary", "## 5. Summary & Next Steps"),
+    ("video_strategy", "## 6. Video Strategy Recommendation"),
+]
+
+# 2c. TARGETED SECTION REPAIR PROMPT
+# Regenerates only the sections that were missing from the master document.
+USER_PROMPT_SECTION_REPAIR = """
+The Master Marketing Audit Document below for {client_name} is missing these sections:
+{missing_sections}
+
+Write ONLY those sections, following the same instructions as the original request.
+Start each one with its marker line and its exact heading, e.g.:
+<!-- section: key -->
+## N. Heading
+
+**Original Request:**
+{original_prompt}
+
+**Current Document:**
+{current_document}
 """
 
 # 3. COMPETITOR JSON PROMPT (Strict Structure - Competitors Only)
@@ -0,0 +1,230 @@
+# scheduler.py
+# Priority-aware admission to the shared pipeline resources (whole video jobs,
+# browser scrapes, LLM calls, Higgsfield renders). Interactive work (a live
+# prospect's form submission) and bulk work (batch audit runs) wait in the same
+# queue per resource, but:
+#   - each class can have slots reserved for it that the other class may not
+#     take while they sit idle, so a bulk run never fills a resource completely;
+#   - among eligible waiters the higher class goes first, and every
+#     AGING_SECONDS of waiting promotes a waiter by one class, so bulk work is
+#     delayed but never starved;
+#   - queue depth, slots in use and wait times are tracked per resource/class.
+#
+# The priority of the calling code comes from a contextvar (priority_context),
+# so stage code just says `with scheduler.slot("llm"):`.
+import os
+import time
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+import deadline
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITY_CLASSES = (INTERACTIVE, BULK)  # highest first
+DEFAULT_PRIORITY = INTERACTIVE
+
+AGING_SECONDS = float(os.getenv("SCHEDULER_AGING_SECONDS", "30"))
+
+# Slots per resource, and slots per resource that only interactive work may use
+RESOURCE_CAPACITY = {
+    "video_job": int(os.getenv("VIDEO_JOB_WORKERS", "4")),
+    "scrape": int(os.getenv("SCRAPE_CONCURRENCY", "4")),
+    "llm": int(os.getenv("LLM_CONCURRENCY", "8")),
+    "render": int(os.getenv("RENDER_CONCURRENCY", "4")),
+}
+RESERVED_SLOTS = {
+    INTERACTIVE: {"video_job": 1, "scrape": 1, "llm": 2, "render": 1},
+}
+
+_priority = contextvars.ContextVar("scheduler_priority", default=DEFAULT_PRIORITY)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+@contextmanager
+def priority_context(priority: str):
+    """Runs the enclosed work (and anything it calls) at `priority`."""
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class {priority!r}; expected one of {PRIORITY_CLASSES}.")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _Waiter:
+    def __init__(self, seq, priority, task=None):
+        self.seq = seq
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.event = threading.Event()
+        self.task = task  # set for submit(); None for a blocking slot()
+
+    def rank(self, now):
+        # Lower runs first; waiting AGING_SECONDS is worth one class
+        return PRIORITY_CLASSES.index(self.priority) - (now - self.enqueued_at) / AGING_SECONDS
+
+
+class _ClassStats:
+    def __init__(self):
+        self.waiting = 0
+        self.in_use = 0
+        self.granted = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+
+class Scheduler:
+    def __init__(self, capacity=None, reserved=None):
+        self.capacity = dict(capacity or RESOURCE_CAPACITY)
+        self.reserved = reserved if reserved is not None else RESERVED_SLOTS
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiters = {resource: [] for resource in self.capacity}
+        self._stats = {(r, c): _ClassStats() for r in self.capacity for c in PRIORITY_CLASSES}
+
+    # --- Public API ---
+    @contextmanager
+    def slot(self, resource, priority=None):
+        """
+        Blocks until a slot of `resource` is granted to the caller's priority
+        class. Gives up with DeadlineExceeded if the request deadline passes first.
+        """
+        priority = priority or current_priority()
+        with self._cond:
+            waiter = self._enqueue(resource, priority)
+        if not waiter.event.wait(deadline.remaining()):
+            with self._cond:
+                if not waiter.event.is_set():  # not granted in the meantime
+                    self._waiters[resource].remove(waiter)
+                    self._stats[(resource, priority)].waiting -= 1
+                    raise deadline.DeadlineExceeded(f"Request deadline passed while queued for a {resource} slot.")
+        try:
+            yield
+        finally:
+            self._release(resource, priority)
+
+    def submit(self, resource, fn, *args, priority=None):
+        """
+        Queues fn(*args) to run on its own thread once a slot of `resource` is
+        granted; the slot is held until fn returns. Nothing blocks meanwhile.
+        """
+        priority = priority or current_priority()
+
+        def task():
+            try:
+                with priority_context(priority):
+                    fn(*args)
+            finally:
+                self._release(resource, priority)
+
+        with self._cond:
+            self._enqueue(resource, priority, task)
+
+    def cancel_pending(self, resource):
+        """Drops queued submit() tasks that haven't started (e.g. on shutdown)."""
+        with self._cond:
+            kept = []
+            for waiter in self._waiters[resource]:
+                if waiter.task is None:
+                    kept.append(waiter)
+                else:
+                    self._stats[(resource, waiter.priority)].waiting -= 1
+            self._waiters[resource] = kept
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            result = {}
+            for (resource, priority), s in self._stats.items():
+                oldest = [now - w.enqueued_at for w in self._waiters[resource] if w.priority == priority]
+                result[f"{resource}/{priority}"] = {
+                    "capacity": self.capacity[resource],
+                    "reserved": self.reserved.get(priority, {}).get(resource, 0),
+                    "queue_depth": s.waiting,
+                    "in_use": s.in_use,
+                    "granted": s.granted,
+                    "avg_wait_seconds": round(s.wait_seconds_total / s.granted, 3) if s.granted else 0.0,
+                    "max_wait_seconds": round(s.wait_seconds_max, 3),
+                    "oldest_waiting_seconds": round(max(oldest), 3) if oldest else 0.0,
+                }
+            return result
+
+    def render_prometheus(self):
+        lines = []
+        metrics = (
+            ("scheduler_queue_depth", "queue_depth", "gauge", "Waiters queued for a resource slot"),
+            ("scheduler_slots_in_use", "in_use", "gauge", "Resource slots currently held"),
+            ("scheduler_grants_total", "granted", "counter", "Resource slots granted"),
+            ("scheduler_wait_seconds_avg", "avg_wait_seconds", "gauge", "Average queueing time before a grant"),
+            ("scheduler_wait_seconds_max", "max_wait_seconds", "gauge", "Longest queueing time before a grant"),
+            ("scheduler_oldest_waiting_seconds", "oldest_waiting_seconds", "gauge", "Age of the oldest queued waiter"),
+        )
+        stats = self.stats()
+        for name, field, kind, help_text in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, values in stats.items():
+                resource, priority = key.split("/")
+                lines.append(f'{name}{{resource="{resource}",priority="{priority}"}} {values[field]}')
+        return "\n".join(lines) + "\n"
+
+    # --- Granting ---
+    def _enqueue(self, resource, priority, task=None):
+        if resource not in self.capacity:
+            raise KeyError(f"Unknown scheduler resource {resource!r}.")
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class {priority!r}; expected one of {PRIORITY_CLASSES}.")
+        waiter = _Waiter(next(self._seq), priority, task)
+        self._waiters[resource].append(waiter)
+        self._stats[(resource, priority)].waiting += 1
+        self._dispatch(resource)
+        return waiter
+
+    def _release(self, resource, priority):
+        with self._cond:
+            self._stats[(resource, priority)].in_use -= 1
+            self._dispatch(resource)
+
+    def _free_for(self, resource, priority):
+        in_use = {c: self._stats[(resource, c)].in_use for c in PRIORITY_CLASSES}
+        free = self.capacity[resource] - sum(in_use.values())
+        # Idle reserved slots of other classes are off limits
+        for other in PRIORITY_CLASSES:
+            if other != priority:
+                free -= max(0, self.reserved.get(other, {}).get(resource, 0) - in_use[other])
+        return free
+
+    def _dispatch(self, resource):
+        """Grants free slots to the best-ranked eligible waiters. Caller holds the lock."""
+        waiters = self._waiters[resource]
+        while waiters:
+            now = time.monotonic()
+            eligible = [w for w in waiters if self._free_for(resource, w.priority) > 0]
+            if not eligible:
+                return
+            waiter = min(eligible, key=lambda w: (w.rank(now), w.seq))
+            waiters.remove(waiter)
+
+            stats = self._stats[(resource, waiter.priority)]
+            waited = now - waiter.enqueued_at
+            stats.waiting -= 1
+            stats.in_use += 1
+            stats.granted += 1
+            stats.wait_seconds_total += waited
+            stats.wait_seconds_max = max(stats.wait_seconds_max, waited)
+
+            if waiter.task is None:
+                waiter.event.set()
+            else:
+                threading.Thread(target=waiter.task, name=f"{resource}-{waiter.priority}", daemon=True).start()
+
+
+# Process-wide scheduler shared by the API workers, the audit pipeline and batch runs
+scheduler = Scheduler()
@@ -0,0 +1,221 @@
+# sheet_logger.py
+# Buffered job log in Google Sheets. Callers queue rows and return immediately;
+# a background thread appends everything queued so far in a single
+# spreadsheets.batchUpdate once LOG_FLUSH_ROWS rows are waiting or the oldest
+# has waited LOG_FLUSH_INTERVAL_SECONDS, so a burst of events costs one API
+# call instead of one each (and stays under the Sheets write quota).
+#
+# The log spreadsheet (LOG_SHEET_NAME in a LOG_FOLDER_NAME folder under the main
+# Drive folder) and its tabs are created on first use, new tabs starting with
+# LOG_HEADERS. Rows that can't be written (Sheets down, quota, auth) are
+# appended to a local JSONL journal and replayed before the next batch.
+import os
+import json
+import time
+import atexit
+import random
+import threading
+
+from config import LOG_FOLDER_NAME, LOG_SHEET_NAME, LOG_HEADERS
+from folder_cache import quote_query_value
+
+LOG_FLUSH_ROWS = int(os.getenv("SHEET_LOG_FLUSH_ROWS", "50"))
+LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("SHEET_LOG_FLUSH_INTERVAL_SECONDS", "10"))
+LOG_JOURNAL_PATH = os.path.join("data", "sheet_log_journal.jsonl")
+SPREADSHEET_MIME_TYPE = 'application/vnd.google-apps.spreadsheet'
+
+
+class SheetLogWriter:
+    def __init__(self, g_clients, spreadsheet_id=None, parent_folder_id=None,
+                 flush_rows=LOG_FLUSH_ROWS, flush_interval_seconds=LOG_FLUSH_INTERVAL_SECONDS,
+                 journal_path=LOG_JOURNAL_PATH):
+        """
+        Writes to spreadsheet_id, or (when None) to the LOG_SHEET_NAME sheet in
+        the LOG_FOLDER_NAME folder under parent_folder_id, found or created on
+        the first flush.
+        """
+        self.g_clients = g_clients
+        self.spreadsheet_id = spreadsheet_id
+        self.parent_folder_id = parent_folder_id
+        self.flush_rows = flush_rows
+        self.flush_interval_seconds = flush_interval_seconds
+        self.journal_path = journal_path
+
+        self._tabs = None  # title -> sheetId, loaded on first flush
+        self._buffer = []  # (tab_name, values)
+        self._oldest_at = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self.counters = {"queued": 0, "written": 0, "journaled": 0, "flushes": 0, "failed_flushes": 0}
+        self._thread = threading.Thread(target=self._run, name="sheet-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # --- Public API ---
+    def log(self, tab_name, row):
+        """Queues one row. row is a list in LOG_HEADERS order or a dict keyed by header."""
+        values = _row_values(row)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Sheet log writer is closed.")
+            self._buffer.append((tab_name, values))
+            self.counters["queued"] += 1
+            if self._oldest_at is None:
+                self._oldest_at = time.monotonic()
+                self._cond.notify()  # the writer starts this batch's interval timer
+            elif len(self._buffer) >= self.flush_rows:
+                self._cond.notify()
+
+    def flush(self):
+        """Writes everything queued (plus any journaled rows) now. Returns True on success."""
+        with self._cond:
+            rows, self._buffer, self._oldest_at = self._buffer, [], None
+        return self._write(rows)
+
+    def close(self):
+        """Stops the background thread after a final flush."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=max(30.0, self.flush_interval_seconds))
+
+    # --- Background loop ---
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    wait = None
+                    if self._oldest_at is not None:
+                        wait = max(0.0, self._oldest_at + self.flush_interval_seconds - time.monotonic())
+                    self._cond.wait(wait)
+                closing = self._closed
+            self.flush()
+            if closing:
+                return
+
+    def _due(self):
+        if not self._buffer:
+            return False
+        return (len(self._buffer) >= self.flush_rows
+                or time.monotonic() - self._oldest_at >= self.flush_interval_seconds)
+
+    # --- Writing ---
+    def _write(self, rows):
+        with self._flush_lock:
+            journaled = self._read_journal()
+            if not rows and not journaled:
+                return True
+            try:
+                self._append(journaled + rows)
+            except Exception as e:
+                self._tabs = None  # a tab may have been added or removed meanwhile; reload next time
+                self.counters["failed_flushes"] += 1
+                print(f"  ⚠️ [Sheet Log] Sheets write failed, journaling {len(rows)} row(s): {e}")
+                self._append_journal(rows)
+                return False
+            if journaled:
+                os.remove(self.journal_path)
+            self.counters["flushes"] += 1
+            self.counters["written"] += len(journaled) + len(rows)
+            return True
+
+    def _append(self, rows):
+        """One batchUpdate: adds missing tabs (with a header row) and appends every row."""
+        sheets = self.g_clients.sheets_service
+        if sheets is None:
+            raise RuntimeError("Sheets service unavailable.")
+        self._ensure_spreadsheet()
+        if self._tabs is None:
+            self._tabs = self._load_tabs(sheets)
+
+        requests, new_tabs = [], {}
+        by_tab = {}
+        for tab_name, values in rows:
+            by_tab.setdefault(tab_name, []).append(values)
+        for tab_name, tab_rows in by_tab.items():
+            sheet_id = self._tabs.get(tab_name)
+            if sheet_id is None:
+                sheet_id = new_tabs[tab_name] = random.randint(1, 2**31 - 1)
+                requests.append({"addSheet": {"properties": {"sheetId": sheet_id, "title": tab_name}}})
+                tab_rows = [list(LOG_HEADERS)] + tab_rows
+            requests.append({"appendCells": {
+                "sheetId": sheet_id,
+                "rows": [{"values": [_cell(value) for value in values]} for values in tab_rows],
+                "fields": "userEnteredValue",
+            }})
+        sheets.spreadsheets().batchUpdate(spreadsheetId=self.spreadsheet_id, body={"requests": requests}).execute()
+        self._tabs.update(new_tabs)
+
+    def _load_tabs(self, sheets):
+        spreadsheet = sheets.spreadsheets().get(
+            spreadsheetId=self.spreadsheet_id, fields="sheets.properties(sheetId,title)"
+        ).execute()
+        return {s["properties"]["title"]: s["properties"]["sheetId"] for s in spreadsheet.get("sheets", [])}
+
+    def _ensure_spreadsheet(self):
+        if self.spreadsheet_id:
+            return
+        if not self.parent_folder_id:
+            raise RuntimeError("No log spreadsheet ID and no parent folder to create it in.")
+        folder_id = self.g_clients.find_or_create_folder(self.parent_folder_id, LOG_FOLDER_NAME)
+        if not folder_id:
+            raise RuntimeError(f"Could not find or create the '{LOG_FOLDER_NAME}' folder.")
+
+        drive = self.g_clients.drive_service
+        query = (f"name='{quote_query_value(LOG_SHEET_NAME)}' and '{folder_id}' in parents "
+                 f"and mimeType='{SPREADSHEET_MIME_TYPE}' and trashed=false")
+        existing = drive.files().list(q=query, spaces='drive', orderBy='createdTime', fields='files(id)').execute()
+        if existing.get('files'):
+            self.spreadsheet_id = existing['files'][0]['id']
+            return
+        print(f"  [Sheet Log] Creating log sheet '{LOG_SHEET_NAME}'...")
+        created = drive.files().create(
+            body={'name': LOG_SHEET_NAME, 'mimeType': SPREADSHEET_MIME_TYPE, 'parents': [folder_id]}, fields='id'
+        ).execute()
+        self.spreadsheet_id = created['id']
+
+    # --- Local journal ---
+    def _read_journal(self):
+        if not os.path.exists(self.journal_path):
+            return []
+        rows = []
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    rows.append((entry["tab"], entry["values"]))
+        return rows
+
+    def _append_journal(self, rows):
+        if not rows:
+            return
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            for tab_name, values in rows:
+                f.write(json.dumps({"tab": tab_name, "values": values}) + "\n")
+        self.counters["journaled"] += len(rows)
+
+
+def _row_values(row):
+    if isinstance(row, dict):
+        values = [row.get(header, "") for header in LOG_HEADERS]
+    else:
+        values = list(row)
+    # Callers may leave the trailing Timestamp column to the logger
+    if LOG_HEADERS[-1] == 'Timestamp':
+        if len(values) == len(LOG_HEADERS) - 1:
+            values.append("")
+        if len(values) == len(LOG_HEADERS) and not values[-1]:
+            values[-1] = time.strftime("%Y-%m-%d %H:%M:%S")
+    return values
+
+
+def _cell(value):
+    if isinstance(value, bool) or value is None:
+        return {"userEnteredValue": {"stringValue": "" if value is None else str(value)}}
+    if isinstance(value, (int, float)):
+        return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import prompts
+import audit_sections
+from audit_sections import match_section_key
+
+
+@pytest.mark.parametrize("key, title", prompts.MASTER_AUDIT_SECTIONS)
+def test_canonical_headings_match_their_section(key, title):
+    assert match_section_key(title) == key
+
+
+@pytest.mark.parametrize("heading, key", [
+    ("Video Content Strategy", "video_strategy"),
+    ("## 6. Video Content Strategy", "video_strategy"),
+    ("Summary", "summary"),
+    ("Executive Summary", "summary"),
+    ("5. Executive Summary & Next Steps", "summary"),
+    ("Website Audit Summary", "website"),
+    ("Content Strategy", "seo"),
+    ("SEO & Content", "seo"),
+    ("Competitor Analysis", "competitive"),
+    ("Competitve Landscape", "competitive"),
+    ("Section 2: Website Audit Sumary", "website"),
+])
+def test_drifted_headings(heading, key):
+    assert match_section_key(heading) == key
+
+
+@pytest.mark.parametrize("heading", ["Social Media Strategy", "Appendix", ""])
+def test_unrelated_headings_match_nothing(heading):
+    assert match_section_key(heading) is None
+
+
+def test_drifted_headings_parse_into_sections():
+    document = "\n\n".join([
+        "## Client Overview",
+        "Overview body.",
+        "## Video Content Strategy",
+        "Video body.",
+        "## Executive Summary",
+        "Summary body.",
+    ])
+    sections = audit_sections.parse_master_document(document)
+    assert "video_strategy" not in sections.missing()
+    assert "summary" not in sections.missing()
+    assert "seo" in sections.missing()
@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audit_research
+import batch_audit
+from batch_audit import BatchAuditRun, LocalBatchEndpoint
+
+CLIENTS = [("Acme Plumbing", "https://acme.example"), ("Bright Dental", "https://bright.example")]
+
+
+class RecordingEndpoint(LocalBatchEndpoint):
+    """LocalBatchEndpoint that records submissions and can hold batches in progress."""
+
+    def __init__(self, state_dir, ready=True):
+        super().__init__(state_dir)
+        self.ready = ready
+        self.submitted = []
+
+    def submit(self, jsonl_path):
+        batch_id = super().submit(jsonl_path)
+        self.submitted.append(batch_id)
+        return batch_id
+
+    def poll(self, batch_id):
+        return super().poll(batch_id) if self.ready else "in_progress"
+
+
+def _fake_inputs(client_name, website_url):
+    return {
+        "client_text": f"{client_name} helps local customers. Visit {website_url}.",
+        "pagespeed_scores": "Performance: 90",
+        "seo_snapshot": "Top result: homepage",
+        "competitors_data": "Title: Rival Co, Link: https://rival.example",
+    }
+
+
+@pytest.fixture
+def run_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # usage logs are written relative to the working directory
+    monkeypatch.setattr(audit_research, "gather_audit_inputs", _fake_inputs)
+    return str(tmp_path / "run")
+
+
+def _submitted_custom_ids(state):
+    return [custom_id for batch in state["batches"] for custom_id in batch["custom_ids"]]
+
+
+def test_local_endpoint_runs_every_client_to_done(run_dir):
+    endpoint = RecordingEndpoint(os.path.join(run_dir, "local_endpoint"))
+    run = BatchAuditRun(run_dir, endpoint)
+    run.start(CLIENTS)
+    state = run.run(wait=True, poll_interval=0)
+
+    for entry in state["clients"].values():
+        assert entry["stage"] == batch_audit.STAGE_DONE, entry.get("error")
+        assert entry["table_json"]["columns"][0] == "Feature"
+        assert os.path.exists(entry["audit_link"])
+        assert json.loads(entry["video_prompt"])["voice_over"]["enabled"]
+    # One batch per LLM stage, each carrying every client's request
+    assert len(endpoint.submitted) == 3
+    assert all(len(batch["custom_ids"]) == len(CLIENTS) for batch in state["batches"])
+    assert all(batch["processed"] for batch in state["batches"])
+
+
+def test_restart_from_checkpoint_reuses_submitted_batch(run_dir):
+    first_endpoint = RecordingEndpoint(os.path.join(run_dir, "local_endpoint"), ready=False)
+    first = BatchAuditRun(run_dir, first_endpoint)
+    first.start(CLIENTS)
+    state = first.run(wait=False)
+    assert len(first_endpoint.submitted) == 1
+    assert not state["batches"][0]["processed"]
+    with open(os.path.join(run_dir, "checkpoint.json"), encoding="utf-8") as f:
+        assert json.load(f)["batches"][0]["batch_id"] == first_endpoint.submitted[0]
+
+    # A new process on the same run directory: the checkpointed batch is polled, not resubmitted
+    resumed_endpoint = RecordingEndpoint(os.path.join(run_dir, "local_endpoint"))
+    resumed = BatchAuditRun(run_dir, resumed_endpoint)
+    resumed.start(CLIENTS)
+    state = resumed.run(wait=True, poll_interval=0)
+
+    assert state["batches"][0]["batch_id"] == first_endpoint.submitted[0]
+    assert first_endpoint.submitted[0] not in resumed_endpoint.submitted
+    assert len(resumed_endpoint.submitted) == 2  # master audit and video prompt only
+    custom_ids = _submitted_custom_ids(state)
+    assert len(custom_ids) == len(set(custom_ids))
+    assert all(entry["stage"] == batch_audit.STAGE_DONE for entry in state["clients"].values())
@@ -0,0 +1,74 @@
+import io
+import os
+import sys
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import prompts
+import audit_sections
+import audit_research
+
+CLIENT_NAME = "Golden Co"
+WEBSITE_URL = "https://example.com"
+
+# Hand-written edge cases of the markdown the master audit produces
+GOLDEN_CASES = {
+    "plain": "## 1. Client Overview & Core Strategy\nA single paragraph.",
+    "inline_bold": (
+        "<!-- section: overview -->\n## 1. Client Overview & Core Strategy\n"
+        "**Bold start** then plain, **bold** again and a dangling ** marker\n"
+        "Text with **two** bold **parts** here."
+    ),
+    "headings": "# H1 text\n## H2 text\n### H3 text\n#### Deeper heading\n##\n###   padded ###",
+    "bullets": "* one\n* **bold** bullet\n*not a bullet\n  * indented bullet\n* ",
+    "tables": (
+        "| A | B | C |\n|---|---|---|\n| **x** | y | z |\n| 1 | 2 |\n"
+        "Between tables\n"
+        "|Name|Score|\n|:-|-:|\n|Client|**90**|\n"
+        "## 4. Competitive Landscape\n| only | header |"
+    ),
+    "table_at_end": "Intro line\n| K | V |\n|---|---|\n| a | b |",
+    "blank_lines": "\n\n   \nText\n\n\n* item\n\n",
+    "tabs_and_unicode": "Tab\there — café ✅ “quotes”\n* bullet\twith tab",
+}
+
+
+def generate_report(scale: int) -> str:
+    """A master-audit-shaped document with findings, bullets and a table per section."""
+    parts = []
+    for key, heading in prompts.MASTER_AUDIT_SECTIONS:
+        parts += [f"<!-- section: {key} -->", heading]
+        for i in range(scale):
+            parts.append(f"### Finding {i + 1}")
+            parts.append(f"The **{key}** review found the **call to action** buried on mobile (item {i + 1}).")
+            parts.extend(f"* **Recommendation {j + 1}:** add proof point {j + 1}." for j in range(3))
+            parts += ["| Metric | Client | Competitor |", "|---|---|---|"]
+            parts.extend(f"| Signal {j + 1} | **Strong** | Weak |" for j in range(3))
+        parts.append("")
+    return "\n".join(parts)
+
+
+GOLDEN_CASES.update({f"generated_x{scale}": generate_report(scale) for scale in (1, 5)})
+
+
+def _parts(doc):
+    # The zip container isn't compared: its entry timestamps change on every save
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    with zipfile.ZipFile(buffer) as zf:
+        return {name: zf.read(name) for name in zf.namelist()}
+
+
+@pytest.mark.parametrize("name", list(GOLDEN_CASES))
+def test_renderer_matches_legacy_package_parts(name):
+    sections = audit_sections.parse_master_document(GOLDEN_CASES[name])
+    legacy = _parts(audit_research.build_audit_docx_legacy(CLIENT_NAME, WEBSITE_URL, sections, None))
+    fast = _parts(audit_research.build_audit_docx(CLIENT_NAME, WEBSITE_URL, sections, None))
+
+    assert sorted(fast) == sorted(legacy)
+    differing = sorted(part for part in legacy if legacy[part] != fast[part])
+    assert not differing, f"package parts differ from the legacy renderer: {', '.join(differing)}"
@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import hashlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import drive_relay
+
+SOURCE_URL = "https://renders.example/video.mp4"
+VIDEO = bytes(range(256)) * 4096  # 1 MiB
+
+
+class _Response:
+    def __init__(self, status_code, headers=None, body=b""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def json(self):
+        return json.loads(self.body)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise drive_relay.requests.HTTPError(f"HTTP {self.status_code}")
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+class FakeDrive:
+    """Resumable-upload sessions held in memory, plus the source video."""
+
+    def __init__(self):
+        self.sessions = {}  # upload URL -> bytearray, or None once expired
+        self.created = 0
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        start = int(headers["Range"][6:-1]) if headers and "Range" in headers else 0
+        return _Response(206 if start else 200, {"Content-Length": str(len(VIDEO) - start)}, VIDEO[start:])
+
+    def request(self, method, url, timeout=None, headers=None, data=None, **kwargs):
+        if method == "POST":
+            self.created += 1
+            upload_url = f"https://drive.example/upload/session-{self.created}"
+            self.sessions[upload_url] = bytearray()
+            return _Response(200, {"Location": upload_url})
+        stored = self.sessions.get(url)
+        if stored is None:
+            return _Response(404)
+        span, total = headers["Content-Range"][6:].split("/")
+        if span != "*":
+            start = int(span.split("-")[0])
+            del stored[start:]
+            stored += data
+        if total != "*" and len(stored) == int(total):
+            resource = {"id": "file-1", "fileSize": str(len(stored)), "md5Checksum": hashlib.md5(stored).hexdigest(),
+                        "alternateLink": "https://drive.example/file-1"}
+            return _Response(200, body=json.dumps(resource).encode())
+        return _Response(308, {"Range": f"bytes=0-{len(stored) - 1}"} if stored else {})
+
+
+def _relay(drive, **kwargs):
+    sessions = []
+    report = drive_relay.relay_to_drive(
+        SOURCE_URL, lambda: "token", "folder-1", "video.mp4",
+        chunk_size=drive_relay.UPLOAD_GRANULARITY, session=drive, on_session=sessions.append, **kwargs
+    )
+    return report, sessions
+
+
+def test_relay_streams_the_whole_file():
+    drive = FakeDrive()
+    report, sessions = _relay(drive)
+    assert report["bytes"] == len(VIDEO)
+    assert report["md5_verified"]
+    assert sessions == ["https://drive.example/upload/session-1"]
+    assert bytes(drive.sessions[sessions[0]]) == VIDEO
+
+
+def test_resume_continues_a_live_session():
+    drive = FakeDrive()
+    upload_url = drive_relay.start_upload_session(lambda: "token", "folder-1", "video.mp4", session=drive)
+    drive.sessions[upload_url] += VIDEO[:drive_relay.UPLOAD_GRANULARITY]
+
+    report, sessions = _relay(drive, upload_url=upload_url)
+    assert sessions == []  # no new session
+    assert bytes(drive.sessions[upload_url]) == VIDEO
+    assert report["bytes"] == len(VIDEO)
+
+
+def test_expired_session_restarts_in_a_new_one():
+    drive = FakeDrive()
+    expired_url = "https://drive.example/upload/expired"
+    drive.sessions[expired_url] = None
+
+    report, sessions = _relay(drive, upload_url=expired_url)
+    assert sessions == ["https://drive.example/upload/session-1"]
+    assert bytes(drive.sessions[sessions[0]]) == VIDEO
+    assert report["bytes"] == len(VIDEO)
+    assert report["md5_verified"]
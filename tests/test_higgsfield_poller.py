@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import higgsfield_poller
+from higgsfield_poller import HiggsfieldPoller
+
+QUEUED_SECONDS = 0.2
+RENDER_SECONDS = {"job": 0.4, "slow": 0.8}
+
+
+class _StandIn:
+    """
+    Local Higgsfield status endpoint. "job-*" and "slow-*" renders are queued,
+    then in progress, then completed; "stuck-*" never finish; "bad-*" answer
+    with a JSON list instead of an object.
+    """
+
+    def __init__(self):
+        self.created = {}
+        self.polls = Counter()
+        self.lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                request_id = self.path.split("/")[2]
+                self.send_json(stand_in.status(request_id))
+
+            def send_json(self, body):
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/requests/{{request_id}}/status"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def status(self, request_id):
+        kind = request_id.split("-")[0]
+        with self.lock:
+            self.polls[request_id] += 1
+            started = self.created.setdefault(request_id, time.monotonic())
+        if kind == "bad":
+            return ["not", "an", "object"]
+        elapsed = time.monotonic() - started
+        if elapsed < QUEUED_SECONDS:
+            return {"status": "queued"}
+        if kind == "stuck" or elapsed < QUEUED_SECONDS + RENDER_SECONDS[kind]:
+            return {"status": "in_progress"}
+        return {"status": "completed", "video": {"url": f"https://example.invalid/{request_id}.mp4"}}
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    # Scale the poll intervals down so renders of a fraction of a second behave like real ones
+    monkeypatch.setattr(higgsfield_poller, "MIN_POLL_INTERVAL_SECONDS", 0.02)
+    monkeypatch.setattr(higgsfield_poller, "MAX_POLL_INTERVAL_SECONDS", 0.2)
+    server = _StandIn()
+    yield server
+    server.server.shutdown()
+
+
+def _poller(stand_in):
+    poller = HiggsfieldPoller(stand_in.url, headers={})
+    poller.expected_render_seconds = QUEUED_SECONDS + RENDER_SECONDS["job"]
+    return poller
+
+
+def test_all_jobs_resolve_with_few_polls(stand_in):
+    poller = _poller(stand_in)
+    ids = [f"job-{i}" for i in range(10)] + [f"slow-{i}" for i in range(5)]
+    futures = {request_id: poller.watch(request_id, max_wait_seconds=10) for request_id in ids}
+
+    for request_id, future in futures.items():
+        assert future.result(timeout=10)["status"] == "completed"
+    poller.stop()
+
+    # Adaptive intervals: well under half the polls of polling every MIN_POLL_INTERVAL_SECONDS
+    for request_id in ids:
+        duration = QUEUED_SECONDS + RENDER_SECONDS[request_id.split("-")[0]]
+        fixed_interval_polls = duration / higgsfield_poller.MIN_POLL_INTERVAL_SECONDS
+        assert 1 <= stand_in.polls[request_id] < fixed_interval_polls / 2, (request_id, stand_in.polls[request_id])
+    assert poller.stats()["in_flight"] == 0
+
+
+def test_watch_is_idempotent_per_request_id(stand_in):
+    poller = _poller(stand_in)
+    assert poller.watch("job-a", max_wait_seconds=10) is poller.watch("job-a", max_wait_seconds=10)
+    assert poller.watch("job-a", max_wait_seconds=10).result(timeout=10)["status"] == "completed"
+    poller.stop()
+
+
+def test_unfinished_render_times_out(stand_in):
+    poller = _poller(stand_in)
+    stuck = poller.watch("stuck-1", max_wait_seconds=0.6)
+    done = poller.watch("job-1", max_wait_seconds=10)
+
+    with pytest.raises(TimeoutError):
+        stuck.result(timeout=5)
+    assert done.result(timeout=10)["status"] == "completed"
+    poller.stop()
+
+
+def test_non_object_status_body_does_not_stop_the_poller(stand_in):
+    poller = _poller(stand_in)
+    bad = poller.watch("bad-1", max_wait_seconds=0.8)
+    good = [poller.watch(f"job-{i}", max_wait_seconds=10) for i in range(3)]
+
+    with pytest.raises(TimeoutError):
+        bad.result(timeout=5)
+    for future in good:
+        assert future.result(timeout=10)["status"] == "completed"
+    assert stand_in.polls["bad-1"] >= 1
+    assert poller._thread.is_alive()
+    poller.stop()
+
+
+def test_resolve_ignores_non_object_payloads(stand_in):
+    poller = _poller(stand_in)
+    assert poller.resolve("job-x", ["completed"]) is False
+    assert poller.resolve("job-x", {"status": "in_progress"}) is False
+    poller.stop()
+
+
+def test_callback_wakes_waiting_job_before_first_poll(stand_in):
+    poller = _poller(stand_in)
+    poller.expected_render_seconds = 60  # first poll far away
+    future = poller.watch("job-cb", max_wait_seconds=10)
+
+    assert poller.resolve("job-cb", {"status": "completed", "request_id": "job-cb"}) is True
+    assert future.result(timeout=1)["status"] == "completed"
+    assert stand_in.polls["job-cb"] == 0
+    poller.stop()
@@ -0,0 +1,75 @@
+import os
+import sys
+import hmac
+import hashlib
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import higgsfield_webhook
+
+SECRET = "shared-secret"
+BODY = b'{"request_id": "req-1", "status": "completed"}'
+
+
+@pytest.fixture(autouse=True)
+def webhooks(monkeypatch):
+    monkeypatch.setattr(higgsfield_webhook, "HIGGSFIELD_WEBHOOK_URL", "https://api.example.com/webhooks/higgsfield")
+    monkeypatch.setattr(higgsfield_webhook, "HIGGSFIELD_WEBHOOK_SECRET", SECRET)
+    monkeypatch.setattr(higgsfield_webhook, "_render_tokens", {})
+
+
+def _sign(body, secret=SECRET):
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def test_callback_url_carries_a_per_render_token_not_the_secret():
+    url, token = higgsfield_webhook.new_callback()
+    other_url, other_token = higgsfield_webhook.new_callback()
+
+    assert SECRET not in url
+    assert parse_qs(urlparse(url).query)["token"] == [token]
+    assert token != other_token
+
+
+def test_token_only_verifies_the_render_it_is_bound_to():
+    _, token = higgsfield_webhook.new_callback()
+    assert not higgsfield_webhook.verify_callback(BODY, "req-1", token=token)  # not bound yet
+
+    higgsfield_webhook.bind_render(token, "req-1")
+    assert higgsfield_webhook.verify_callback(BODY, "req-1", token=token)
+    assert not higgsfield_webhook.verify_callback(BODY, "req-2", token=token)
+    assert not higgsfield_webhook.verify_callback(BODY, "req-1", token=SECRET)
+    assert not higgsfield_webhook.verify_callback(BODY, "req-1", token="guess")
+
+
+def test_signature_is_checked_against_the_secret():
+    assert higgsfield_webhook.verify_callback(BODY, "req-1", signature=_sign(BODY))
+    assert higgsfield_webhook.verify_callback(BODY, "req-1", signature="sha256=" + _sign(BODY))
+    assert not higgsfield_webhook.verify_callback(BODY, "req-1", signature=_sign(BODY, "wrong"))
+
+
+def test_bad_signature_is_not_rescued_by_a_valid_token():
+    _, token = higgsfield_webhook.new_callback()
+    higgsfield_webhook.bind_render(token, "req-1")
+    assert not higgsfield_webhook.verify_callback(BODY, "req-1", signature="forged", token=token)
+
+
+def test_expired_and_discarded_tokens_are_rejected(monkeypatch):
+    _, token = higgsfield_webhook.new_callback()
+    higgsfield_webhook.bind_render(token, "req-1")
+    monkeypatch.setattr(higgsfield_webhook, "RENDER_TOKEN_TTL_SECONDS", -1)
+    assert not higgsfield_webhook.verify_callback(BODY, "req-1", token=token)
+
+    monkeypatch.setattr(higgsfield_webhook, "RENDER_TOKEN_TTL_SECONDS", 3600)
+    _, token = higgsfield_webhook.new_callback()
+    higgsfield_webhook.discard_render_token(token)
+    higgsfield_webhook.bind_render(token, "req-1")
+    assert not higgsfield_webhook.verify_callback(BODY, "req-1", token=token)
+
+
+def test_disabled_webhooks_register_nothing(monkeypatch):
+    monkeypatch.setattr(higgsfield_webhook, "HIGGSFIELD_WEBHOOK_URL", None)
+    assert higgsfield_webhook.new_callback() == (None, None)
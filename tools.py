@@ -2,9 +2,17 @@ import requests
 import os
 from dotenv import load_dotenv
 import json
+import deadline
+import circuit_breaker
 
 load_dotenv()
 
+# What counts against the Serper/Pagespeed breakers: no answer, rate limiting or a
+# server error. Other 4xx (e.g. Pagespeed's 400 for an unreachable client URL)
+# are about the request, not the provider.
+PROVIDER_FAILURE_EXCEPTIONS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+PROVIDER_FAILURE_STATUSES = (429, 500, 502, 503, 504)
+
 # 1. Domain Blacklist (Directories & Socials)
 BLACKLIST_DOMAINS = [
     "zoominfo.com", "rocketreach.co", "craft.co", "linkedin.com", 
@@ -54,10 +62,19 @@ def get_seo_snapshot(url: str, client_name: str) -> str:
         'Content-Type': 'application/json'
     }
 
+    timeout = deadline.timeout(10, "SEO snapshot")
     try:
-        response = requests.request("POST", serper_url, headers=headers, data=payload, timeout=10)
+        with circuit_breaker.breaker("serper").guard(failure_exceptions=PROVIDER_FAILURE_EXCEPTIONS) as call, \
+                deadline.capped_call("SEO snapshot", 10, timeout, requests.exceptions.Timeout):
+            response = requests.request("POST", serper_url, headers=headers, data=payload, timeout=timeout)
+            if response.status_code in PROVIDER_FAILURE_STATUSES:
+                call.fail(f"HTTP {response.status_code}")
         response.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
         data = response.json()
+    except deadline.DeadlineExceeded:
+        raise
+    except circuit_breaker.CircuitOpenError as e:
+        return f"Error: Serper API unavailable: {e}"
     except requests.exceptions.RequestException as e:
         return f"Error: Serper API request failed: {e}"
     except Exception as e:
@@ -138,10 +155,20 @@ def get_pagespeed_insights(url: str) -> str:
     # Use the PageSpeed Insights API endpoint
     api_url = f"https://www.googleapis.com/pagespeedonline/v5/runPagespeed?url={url}&key={google_api_key}&strategy=mobile"
 
+    timeout = deadline.timeout(15, "Pagespeed")
     try:
-        response = requests.get(api_url, timeout=15)
+        with circuit_breaker.breaker("pagespeed").guard(failure_exceptions=PROVIDER_FAILURE_EXCEPTIONS) as call, \
+                deadline.capped_call("Pagespeed", 15, timeout, requests.exceptions.Timeout):
+            response = requests.get(api_url, timeout=timeout)
+            if response.status_code in PROVIDER_FAILURE_STATUSES:
+                call.fail(f"HTTP {response.status_code}")
         response.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
         data = response.json()
+    except deadline.DeadlineExceeded:
+        raise
+    except circuit_breaker.CircuitOpenError as e:
+        # Same soft-failure shape as any other Pagespeed error: the audit continues without it
+        return f"Error: Pagespeed API unavailable: {e}"
     except requests.exceptions.RequestException as e:
         return f"Error: Pagespeed API request failed: {e}"
     except Exception as e:
@@ -232,10 +259,19 @@ def get_competitors(client_name: str) -> str:
         'Content-Type': 'application/json'
     }
 
+    timeout = deadline.timeout(10, "competitor search")
     try:
-        response = requests.request("POST", serper_url, headers=headers, data=payload, timeout=10)
-        response.raise_for_status() 
+        with circuit_breaker.breaker("serper").guard(failure_exceptions=PROVIDER_FAILURE_EXCEPTIONS) as call, \
+                deadline.capped_call("competitor search", 10, timeout, requests.exceptions.Timeout):
+            response = requests.request("POST", serper_url, headers=headers, data=payload, timeout=timeout)
+            if response.status_code in PROVIDER_FAILURE_STATUSES:
+                call.fail(f"HTTP {response.status_code}")
+        response.raise_for_status()
         data = response.json()
+    except deadline.DeadlineExceeded:
+        raise
+    except circuit_breaker.CircuitOpenError as e:
+        return f"Error: Serper API unavailable: {e}"
     except requests.exceptions.RequestException as e:
         return f"Error: Serper API request failed: {e}"
     except Exception as e:
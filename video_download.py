@@ -0,0 +1,158 @@
+# video_download.py
+# Streaming, resumable download of rendered videos. Bytes go to disk in fixed
+# chunks (memory stays bounded by one chunk), a dropped connection resumes with
+# an HTTP Range request from the last written byte, the result is checked
+# against the advertised size (and MD5 when the server sends one), and the file
+# only appears under its final name after an atomic rename.
+import os
+import time
+import base64
+import hashlib
+
+import requests
+
+try:
+    import resource
+except ImportError:  # Unix-only; peak RSS is reported as None elsewhere
+    resource = None
+
+import deadline
+
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+DOWNLOAD_MAX_ATTEMPTS = 5
+DOWNLOAD_CONNECT_TIMEOUT_SECONDS = 10
+DOWNLOAD_READ_TIMEOUT_SECONDS = 60  # max silence between chunks, not total time
+DOWNLOAD_RETRY_BACKOFF_SECONDS = 2
+
+_session = requests.Session()
+
+
+class DownloadError(Exception):
+    pass
+
+
+def _expected_md5(response):
+    """MD5 advertised by the server (Content-MD5 or GCS x-goog-hash), as raw bytes."""
+    value = response.headers.get("Content-MD5")
+    if not value:
+        for part in response.headers.get("x-goog-hash", "").split(","):
+            if part.strip().startswith("md5="):
+                value = part.strip()[4:]
+    try:
+        return base64.b64decode(value) if value else None
+    except Exception:
+        return None
+
+
+def _total_size(response, offset):
+    content_range = response.headers.get("Content-Range")  # "bytes 100-999/1000"
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("Content-Length")
+    return offset + int(length) if length and length.isdigit() else None
+
+
+def _hash_existing(path, hashers):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_BYTES), b""):
+            for h in hashers:
+                h.update(chunk)
+
+
+def download_file(url, dest_path, expected_size=None, expected_sha256=None, chunk_size=DOWNLOAD_CHUNK_BYTES, session=None):
+    """
+    Streams url to dest_path. Returns a report dict (bytes, seconds, throughput,
+    resumes, peak buffer, sha256). Raises DownloadError on failure.
+    """
+    session = session or _session
+    part_path = dest_path + ".part"
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+
+    sha256, md5 = hashlib.sha256(), hashlib.md5()
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if offset:
+        # Leftover from an interrupted run: continue it instead of starting over
+        _hash_existing(part_path, (sha256, md5))
+
+    started = time.monotonic()
+    total = None
+    expected_md5 = None
+    resumes = 0
+    peak_buffer = 0
+    last_error = None
+
+    for attempt in range(DOWNLOAD_MAX_ATTEMPTS):
+        if attempt:
+            resumes += 1
+            time.sleep(DOWNLOAD_RETRY_BACKOFF_SECONDS * attempt)
+            print(f"  ↻ Resuming download at byte {offset} (attempt {attempt + 1})...")
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        read_timeout = deadline.timeout(DOWNLOAD_READ_TIMEOUT_SECONDS, "download")
+        try:
+            with session.get(url, headers=headers, stream=True,
+                             timeout=(DOWNLOAD_CONNECT_TIMEOUT_SECONDS, read_timeout)) as response:
+                if offset and response.status_code == 416:
+                    break  # nothing left to fetch; size check below decides
+                response.raise_for_status()
+                if offset and response.status_code != 206:
+                    # Server ignored the Range header: start over
+                    offset = 0
+                    sha256, md5 = hashlib.sha256(), hashlib.md5()
+                total = _total_size(response, offset) or total
+                if response.status_code == 200:
+                    expected_md5 = _expected_md5(response)
+
+                with open(part_path, "r+b" if offset else "wb") as f:
+                    f.seek(offset)
+                    f.truncate()
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if not chunk:
+                            continue
+                        deadline.check("download")
+                        f.write(chunk)
+                        sha256.update(chunk)
+                        md5.update(chunk)
+                        offset += len(chunk)
+                        peak_buffer = max(peak_buffer, len(chunk))
+                    f.flush()
+                    os.fsync(f.fileno())
+            if total is None or offset >= total:
+                break
+            last_error = DownloadError(f"Connection closed at {offset} of {total} bytes.")
+        except (requests.RequestException, OSError) as e:
+            last_error = e
+    else:
+        raise DownloadError(f"Download failed after {DOWNLOAD_MAX_ATTEMPTS} attempts: {last_error}")
+
+    # --- Integrity checks ---
+    problems = []
+    if total is not None and offset != total:
+        problems.append(f"size {offset} != advertised {total}")
+    if expected_size is not None and offset != expected_size:
+        problems.append(f"size {offset} != expected {expected_size}")
+    if expected_sha256 and sha256.hexdigest() != expected_sha256.lower():
+        problems.append("sha256 mismatch")
+    if expected_md5 and md5.digest() != expected_md5:
+        problems.append("md5 mismatch")
+    if offset == 0:
+        problems.append("empty file")
+    if problems:
+        os.remove(part_path)
+        raise DownloadError(f"Integrity check failed: {', '.join(problems)}")
+
+    os.replace(part_path, dest_path)
+
+    elapsed = max(time.monotonic() - started, 1e-6)
+    return {
+        "path": dest_path,
+        "bytes": offset,
+        "seconds": round(elapsed, 3),
+        "throughput_mb_s": round(offset / elapsed / (1024 * 1024), 2),
+        "resumes": resumes,
+        "peak_buffer_bytes": peak_buffer,
+        # Process-wide high-water mark (ru_maxrss is KiB on Linux)
+        "process_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1) if resource else None,
+        "sha256": sha256.hexdigest(),
+        "md5_verified": bool(expected_md5),
+    }
@@ -2,12 +2,28 @@ import os
 import requests
 import json
 import re
+import math
 import time
-from pydrive.auth import GoogleAuth
-from pydrive.drive import GoogleDrive
+import threading
+import contextvars
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from openai import OpenAI
 import tiktoken
+import config
+import model_router
+import llm_accounting
+from scheduler import scheduler
+import deadline
+import circuit_breaker
+from prompt_store import PromptStore, prompt_fingerprint
+from folder_cache import FolderCache, FOLDER_MIME_TYPE, FOLDER_CACHE_TTL_SECONDS, quote_query_value
+from higgsfield_poller import HiggsfieldPoller
+import higgsfield_webhook
+import video_download
+import drive_relay
+import google_auth
 from bs4 import BeautifulSoup
 from openai import AsyncOpenAI
 from playwright.sync_api import sync_playwright
@@ -19,35 +35,108 @@ load_dotenv()
 SORA2_API_URL = os.environ.get("SORA2_API_URL")
 SORA2_API_KEY = os.environ.get("SORA2_API_KEY")
 SORA2_API_SECRET = os.environ.get("SORA2_API_SECRET")
-client = OpenAI(
-  api_key=os.environ['OPENAI_API_KEY'],  # this is also the default, it can be omitted
-)
+# Built only when a key is set, so importing this module (e.g. from batch_audit --local) doesn't need one
+client = OpenAI(api_key=os.environ["OPENAI_API_KEY"]) if os.environ.get("OPENAI_API_KEY") else None
  
  
  
-POLL_INTERVAL_SECONDS = 10
-MAX_POLL_ATTEMPTS = 50  # increased to ensure video has time to complete
+HIGGSFIELD_STATUS_URL = os.environ.get(
+    "HIGGSFIELD_STATUS_URL", "https://platform.higgsfield.ai/requests/{request_id}/status"
+)
+
+HIGGSFIELD_SUBMIT_TIMEOUT_SECONDS = 30
+MAX_RENDER_WAIT_SECONDS = 500  # give up on a render after this long (was 50 polls x 10s)
+
+# Speculative prompt generation: parallel candidates, first valid one wins
+PROMPT_MODEL = config.MODEL_ROUTES["video_prompt"]["models"][0]
+DEFAULT_PROMPT_CANDIDATES = 3
+MIN_PROMPT_CANDIDATES = 1
+MAX_PROMPT_CANDIDATES = 5
+MIN_CANDIDATE_SAMPLES = 10  # outcomes needed before adapting the candidate count
+PROMPT_CANDIDATE_TARGET_SUCCESS = 0.95  # desired chance that at least one candidate passes
+
+_candidate_stats = {}  # model -> {"attempted": int, "accepted": int}
+_candidate_stats_lock = threading.Lock()
  
  
 # Function to Ensure Google Drive Folder Exists
-def ensure_drive_folder(drive, folder_name="Video Assets") -> str:
+# Where the video folder lives; My Drive's root, where it has always been created
+VIDEO_FOLDER_PARENT_ID = os.getenv("VIDEO_DRIVE_PARENT_ID", "root")
+
+_folder_cache = None
+_folder_cache_lock = threading.Lock()
+_folder_locks = {}  # (parent_id, folder_name) -> lock serializing first-time resolution
+
+
+def get_folder_cache():
+    global _folder_cache
+    with _folder_cache_lock:
+        if _folder_cache is None:
+            _folder_cache = FolderCache()
+        return _folder_cache
+
+
+def _folder_lock(parent_id, folder_name):
+    with _folder_cache_lock:
+        return _folder_locks.setdefault((parent_id, folder_name), threading.Lock())
+
+
+def _list_child_folders_named(drive, parent_id, folder_name):
+    """Folders called folder_name directly under parent_id, oldest first."""
+    query = (
+        f"'{parent_id}' in parents and title='{quote_query_value(folder_name)}' "
+        f"and mimeType='{FOLDER_MIME_TYPE}' and trashed=false"
+    )
+    return drive.ListFile({'q': query, 'orderBy': 'createdDate'}).GetList()
+
+
+def ensure_drive_folder(drive, folder_name="Video Assets", parent_id=None) -> str:
     """
-    Checks if a folder exists in Google Drive. If it doesn't exist, it creates a new folder.
-    Returns the folder ID as a string.
+    Returns the ID of the folder named folder_name directly under parent_id
+    (default VIDEO_FOLDER_PARENT_ID), creating it if it doesn't exist.
+    The lookup is a parent-scoped query instead of a scan of every folder in
+    the Drive, and its result is cached, so most calls don't touch Drive.
     """
-    # Check if the folder exists in Google Drive
-    file_list = drive.ListFile({'q': f"mimeType='application/vnd.google-apps.folder' and trashed=false and title='{folder_name}'"}).GetList()
-   
-    # If the folder exists, return its ID
-    for f in file_list:
-        if f['title'] == folder_name:
-            return f['id']
-   
-    # If the folder doesn't exist, create it
-    folder_metadata = {'title': folder_name, 'mimeType': 'application/vnd.google-apps.folder'}
-    folder = drive.CreateFile(folder_metadata)
-    folder.Upload()
-    return folder['id']
+    parent_id = parent_id or VIDEO_FOLDER_PARENT_ID
+    cache = get_folder_cache()
+    folder_id = cache.get(parent_id, folder_name, max_age_seconds=FOLDER_CACHE_TTL_SECONDS)
+    if folder_id:
+        return folder_id
+
+    # Concurrent requests that all miss would otherwise each create the folder
+    with _folder_lock(parent_id, folder_name):
+        folder_id = cache.get(parent_id, folder_name, max_age_seconds=FOLDER_CACHE_TTL_SECONDS)
+        if folder_id:
+            return folder_id
+
+        existing = _list_child_folders_named(drive, parent_id, folder_name)
+        if existing:
+            folder_id = existing[0]['id']
+        else:
+            folder = drive.CreateFile({'title': folder_name, 'mimeType': FOLDER_MIME_TYPE, 'parents': [{'id': parent_id}]})
+            folder.Upload()
+            folder_id = _settle_folder_race(drive, parent_id, folder_name, folder['id'])
+        cache.put(parent_id, folder_name, folder_id)
+        return folder_id
+
+
+def _settle_folder_race(drive, parent_id, folder_name, created_id):
+    """
+    Another process may have created the same folder at the same moment. Every
+    racer keeps the oldest one, and a racer whose own folder lost trashes it
+    (it is still empty).
+    """
+    folders = _list_child_folders_named(drive, parent_id, folder_name)
+    if not folders:
+        return created_id
+    oldest_id = folders[0]['id']
+    if oldest_id != created_id:
+        print(f"  [Drive] Folder '{folder_name}' was created concurrently; using the older one.")
+        try:
+            drive.CreateFile({'id': created_id}).Trash()
+        except Exception as e:
+            print(f"  ⚠️ [Drive] Could not trash duplicate folder {created_id}: {e}")
+    return oldest_id
  
 def upload_to_drive(drive, folder_id, file_path, file_name):
     try:
@@ -89,23 +178,11 @@ def upload_to_drive(drive, folder_id, file_path, file_name):
 # GOOGLE DRIVE FUNCTIONALITY
 # ---------------------------------------------------
 def get_drive_client():
-    gauth = GoogleAuth()
-   
-    # Check if token.json file exists (this contains saved credentials)
-    if os.path.exists("token.json"):
-        # Load saved credentials from the token.json file
-        gauth.LoadCredentialsFile("token.json")
-       
-    # If credentials are not available or expired
-    if not gauth.credentials or gauth.access_token_expired:
-        # Perform the full authentication process
-        gauth.LocalWebserverAuth()
-   
-    # Save the credentials for future use
-    gauth.SaveCredentialsFile("token.json")
-   
-    drive = GoogleDrive(gauth)
-    return drive
+    """
+    This thread's pydrive client on the process-wide Google credentials: no
+    token.json re-read, auth flow or token rewrite per request.
+    """
+    return google_auth.pydrive_client()
  
  
  
@@ -117,6 +194,12 @@ def get_drive_client():
 
 
 def scrape_website_data(url):
+    # Browser scrapes are heavy; the scheduler caps them and lets interactive work go first
+    with scheduler.slot("scrape"):
+        return _scrape_website_data(url)
+
+
+def _scrape_website_data(url):
     print(f"🌐 Scraping website with browser: {url}")
 
     try:
@@ -132,12 +215,14 @@ def scrape_website_data(url):
 
             page = context.new_page()
             try:
-                page.goto(url, wait_until="domcontentloaded", timeout=60000)
+                page.goto(url, wait_until="domcontentloaded", timeout=deadline.timeout(60, "scrape") * 1000)
+            except deadline.DeadlineExceeded:
+                raise
             except:
-                page.goto(url, wait_until="load", timeout=60000)
+                page.goto(url, wait_until="load", timeout=deadline.timeout(60, "scrape retry") * 1000)
 
-            # Let Incapsula JS finish
-            page.wait_for_timeout(4000)
+            # Let Incapsula JS finish (but don't spend the last of the budget on it)
+            page.wait_for_timeout(min(4000, max(0, (deadline.remaining() or 4) - 1) * 1000))
 
             text = page.inner_text("body")
 
@@ -150,6 +235,8 @@ def scrape_website_data(url):
             print("✅ Website scraped successfully via browser")
             return text[:6000]
 
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"❌ Browser scraping failed: {e}")
         return None
@@ -219,13 +306,10 @@ def enforce_voiceover_rules(json_output: str) -> str:
     return json.dumps(data, ensure_ascii=False, indent=2)
 
 
-def generate_video_prompt(company_name, website_text, video_duration=12):
+def build_video_prompt_messages(company_name, website_text):
     """
-    ONE SINGLE LLM CALL:
-    - Analyzes full website content
-    - Creates 10s voiceover script
-    - Creates full Higgsfield JSON prompt
-    - Returns final JSON string
+    Builds the chat messages for the unified video-prompt call.
+    Shared by every candidate request so they all see the same prompt.
     """
  
     system_prompt = """
@@ -337,32 +421,157 @@ Analyze the website + brand deeply and produce the FULL JSON described above.
 Remember: ONE output = the FINAL JSON ONLY.
 """
  
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+#------------------------------ Speculative Prompt Candidates ------------------------------
+
+def _candidate_acceptance_rate(model):
+    """Returns the observed acceptance rate for a model, or None until enough samples exist."""
+    with _candidate_stats_lock:
+        stats = _candidate_stats.get(model)
+        if not stats or stats["attempted"] < MIN_CANDIDATE_SAMPLES:
+            return None
+        return stats["accepted"] / stats["attempted"]
+
+
+def _record_candidate_outcome(model, accepted):
+    with _candidate_stats_lock:
+        stats = _candidate_stats.setdefault(model, {"attempted": 0, "accepted": 0})
+        stats["attempted"] += 1
+        if accepted:
+            stats["accepted"] += 1
+
+
+def get_candidate_stats():
+    """Snapshot of per-model candidate acceptance, e.g. for logging or metrics."""
+    with _candidate_stats_lock:
+        return {
+            model: dict(stats, acceptance_rate=stats["accepted"] / stats["attempted"] if stats["attempted"] else None)
+            for model, stats in _candidate_stats.items()
+        }
+
+
+def choose_candidate_count(model):
+    """
+    Picks how many candidates to request in parallel so that at least one
+    passes validation with PROMPT_CANDIDATE_TARGET_SUCCESS probability,
+    based on the model's observed acceptance rate.
+    """
+    rate = _candidate_acceptance_rate(model)
+    if rate is None:
+        return DEFAULT_PROMPT_CANDIDATES
+    if rate >= PROMPT_CANDIDATE_TARGET_SUCCESS:
+        return MIN_PROMPT_CANDIDATES
+    if rate <= 0:
+        return MAX_PROMPT_CANDIDATES
+    needed = math.ceil(math.log(1 - PROMPT_CANDIDATE_TARGET_SUCCESS) / math.log(1 - rate))
+    return max(MIN_PROMPT_CANDIDATES, min(MAX_PROMPT_CANDIDATES, needed))
+
+
+def _generate_prompt_candidate(messages, route, candidate_no):
+    """One candidate request: LLM call + JSON parsing + voiceover rules. Raises if rejected."""
+    model = route.models[0]
     try:
-        completion = client.chat.completions.create(
-            model="gpt-5-nano",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ]
-        )
- 
+        completion, model = model_router.routed_completion(client, "video_prompt", messages, route=route)
         json_output = completion.choices[0].message.content.strip()
-        print("\n📦 RAW JSON FROM CHATGPT:")
-        print(json_output)
-        
-        
-        # ✅ enforce rules before sending to Higgsfield
         json_output = enforce_voiceover_rules(json_output)
-        print("\n📦 FINAL JSON AFTER ENFORCEMENT:")
-        
-        
-        
-        return json_output
+    except Exception as e:
+        _record_candidate_outcome(model, accepted=False)
+        print(f"⚠️ Prompt candidate {candidate_no} rejected: {e}")
+        raise
+    _record_candidate_outcome(model, accepted=True)
+    return json_output
 
 
-    except Exception as e:
-        print(f"❌ Error generating unified prompt: {e}")
-        return None
+def generate_video_prompt(company_name, website_text, video_duration=12, model=None):
+    """
+    Requests several prompt candidates in parallel:
+    - Analyzes full website content
+    - Creates 10s voiceover script
+    - Creates full Higgsfield JSON prompt
+    - Returns the first candidate that passes JSON parsing and voiceover rules
+    """
+    messages = build_video_prompt_messages(company_name, website_text)
+    route = model_router.choose_route("video_prompt", messages, model or PROMPT_MODEL)
+    candidate_count = choose_candidate_count(route.models[0])
+    print(f"🎯 Requesting {candidate_count} prompt candidate(s) from {route.models[0]} ({route.reason})...")
+
+    executor = ThreadPoolExecutor(max_workers=candidate_count)
+    try:
+        # Each candidate runs in a copy of the caller's context so usage is billed to the caller's job
+        futures = [
+            executor.submit(contextvars.copy_context().run, _generate_prompt_candidate, messages, route, i + 1)
+            for i in range(candidate_count)
+        ]
+        for future in as_completed(futures):
+            try:
+                json_output = future.result()
+            except Exception:
+                continue
+
+            # First valid candidate wins; the rest are cancelled or ignored
+            for other in futures:
+                other.cancel()
+            print("\n📦 FINAL JSON AFTER ENFORCEMENT:")
+            print(json_output)
+            return json_output
+    finally:
+        # Don't block on candidates still in flight once we have a winner
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    print(f"❌ Error generating unified prompt: all {candidate_count} candidate(s) failed validation.")
+    return None
+
+
+#------------------------------ Prompt Reuse ------------------------------
+
+_prompt_store = None
+_prompt_store_lock = threading.Lock()
+
+
+def get_prompt_store():
+    global _prompt_store
+    with _prompt_store_lock:
+        if _prompt_store is None:
+            _prompt_store = PromptStore()
+        return _prompt_store
+
+
+def _prompt_template_digest():
+    # The messages built from empty inputs are the template itself
+    template = json.dumps(build_video_prompt_messages("", ""), sort_keys=True)
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+
+def get_or_generate_video_prompt(company_name, website_text, variant=False, model=None):
+    """
+    Returns the stored prompt when the company's scraped site text is unchanged
+    (no LLM call), otherwise generates one and stores it.
+    variant=True always generates fresh creative and makes it the stored prompt.
+    """
+    store = get_prompt_store()
+    fingerprint = prompt_fingerprint(company_name, website_text, _prompt_template_digest())
+    if not variant:
+        started = time.monotonic()
+        stored = store.latest(fingerprint)
+        if stored:
+            llm_accounting.record_call(
+                "video_prompt", stored["model"] or PROMPT_MODEL,
+                latency_seconds=time.monotonic() - started, cache_hit=True,
+            )
+            print(f"♻️ Site unchanged for {company_name}: reusing stored video prompt ({fingerprint[:12]}).")
+            return stored["json_prompt"]
+
+    json_prompt = generate_video_prompt(company_name, website_text, model=model)
+    if json_prompt:
+        store.put(fingerprint, company_name, json_prompt, model or PROMPT_MODEL)
+        if variant:
+            print(f"🎨 Stored prompt variant #{store.variant_count(fingerprint)} for {company_name}.")
+    return json_prompt
  
  
  
@@ -370,16 +579,19 @@ Remember: ONE output = the FINAL JSON ONLY.
 # ---------------------------------------------------
 # GENERATE VIDEO AND DOWNLOAD
 # ---------------------------------------------------
-def generate_video_asset(json_prompt, client_name):
-    if not SORA2_API_URL or not SORA2_API_KEY or not SORA2_API_SECRET:
-        print("❌ SORA2 API keys missing.")
-        return None
- 
-    headers = {
+def _higgsfield_headers():
+    return {
         "Content-Type": "application/json",
         "hf-api-key": SORA2_API_KEY,
         "hf-secret": SORA2_API_SECRET
     }
+
+
+def submit_video_request(json_prompt):
+    """Queues a render job on Higgsfield. Returns the request_id, or None on failure."""
+    if not SORA2_API_URL or not SORA2_API_KEY or not SORA2_API_SECRET:
+        print("❌ SORA2 API keys missing.")
+        return None
  
     payload = {
         "prompt": json_prompt,
@@ -388,61 +600,144 @@ def generate_video_asset(json_prompt, client_name):
         "aspect_ratio": "9:16"
     }
  
+    # Ask Higgsfield to call us back on completion (POST /webhooks/higgsfield in main.py)
+    params = {}
+    webhook_url, webhook_token = higgsfield_webhook.new_callback()
+    if webhook_url:
+        params["hf_webhook"] = webhook_url
+
     print("🎬 Sending JSON prompt to SORA...")
     try:
-        response = requests.post(SORA2_API_URL, headers=headers, json=payload)
+        deadline.require("render", get_video_poller().expected_render_seconds)
+        timeout = deadline.timeout(HIGGSFIELD_SUBMIT_TIMEOUT_SECONDS, "render submit")
+        with circuit_breaker.breaker("higgsfield").guard() as call, \
+                deadline.capped_call("render submit", HIGGSFIELD_SUBMIT_TIMEOUT_SECONDS, timeout, requests.Timeout):
+            response = requests.post(
+                SORA2_API_URL, headers=_higgsfield_headers(), params=params, json=payload, timeout=timeout,
+            )
+            if response.status_code >= 500:
+                call.fail(f"HTTP {response.status_code}")
         response_json = response.json()
+    except deadline.DeadlineExceeded:
+        higgsfield_webhook.discard_render_token(webhook_token)
+        raise
     except Exception as e:
         print(f"❌ API POST failed: {e}")
+        higgsfield_webhook.discard_render_token(webhook_token)
         return None
  
     request_id = response_json.get("request_id")
     if not request_id:
         print(f"❌ SORA rejected request: {response_json}")
+        higgsfield_webhook.discard_render_token(webhook_token)
         return None
  
+    higgsfield_webhook.bind_render(webhook_token, request_id)
     print(f"⏳ Job queued: {request_id}")
- 
-    # Polling loop
-    for attempt in range(MAX_POLL_ATTEMPTS):
-        time.sleep(POLL_INTERVAL_SECONDS)
-        print(f"[POLL {attempt+1}] Checking status...")
- 
-        status_url = f"https://platform.higgsfield.ai/requests/{request_id}/status"
-        try:
-            status_response = requests.get(status_url, headers=headers)
-            status_data = status_response.json()
-        except Exception as e:
-            print(f"⚠️ Polling request failed: {e}")
-            continue
- 
-        job_status = status_data.get("status")
-        if job_status in ["completed", "succeeded"]:
-            # Check multiple possible locations for video URL
-            video_url = status_data.get("video_url") or (status_data.get("video") or {}).get("url")
-            if video_url:
-                print(f"⬇️ Downloading video from: {video_url[:50]}...")
-                if not os.path.exists("temp_outputs"):
-                    os.makedirs("temp_outputs")
-                local_path = os.path.join("temp_outputs", f"{client_name} - Video.mp4")
-                try:
-                    video_content = requests.get(video_url).content
-                    with open(local_path, "wb") as f:
-                        f.write(video_content)
-                    print(f"✅ Video saved locally: {local_path}")
-                    return local_path
-                except Exception as e:
-                    print(f"❌ Failed to download video: {e}")
-                    return None
-            else:
-                print("❌ Video URL not found in response.")
-                return None
-        elif job_status == "failed":
-            print(f"❌ Video generation failed: {status_data.get('error')}")
-            return None
- 
-    print(f"❌ Video generation timed out after {MAX_POLL_ATTEMPTS*POLL_INTERVAL_SECONDS} seconds.")
+    return request_id
+
+
+_video_poller = None
+_video_poller_lock = threading.Lock()
+
+
+def get_video_poller():
+    """Process-wide poller shared by every in-flight render."""
+    global _video_poller
+    with _video_poller_lock:
+        if _video_poller is None:
+            sweep = higgsfield_webhook.WEBHOOK_FALLBACK_SWEEP_SECONDS if higgsfield_webhook.webhooks_enabled() else None
+            _video_poller = HiggsfieldPoller(
+                HIGGSFIELD_STATUS_URL, _higgsfield_headers(), sweep_interval_seconds=sweep,
+                breaker=circuit_breaker.breaker("higgsfield"),
+            )
+        return _video_poller
+
+
+def wait_for_video(request_id):
+    """Waits for a queued render on the shared poller. Returns the video URL, or None."""
+    max_wait = deadline.timeout(MAX_RENDER_WAIT_SECONDS, "render wait")
+    future = get_video_poller().watch(request_id, max_wait_seconds=MAX_RENDER_WAIT_SECONDS)
+    try:
+        # The poller keeps watching past our budget (another job may re-attach); we just stop waiting
+        status_data = future.result(timeout=max_wait)
+    except TimeoutError:
+        deadline.check("render wait")
+        print(f"❌ Video generation timed out after {MAX_RENDER_WAIT_SECONDS} seconds.")
+        return None
+
+    job_status = status_data.get("status")
+    if job_status in ["completed", "succeeded"]:
+        # Check multiple possible locations for video URL
+        video_url = status_data.get("video_url") or (status_data.get("video") or {}).get("url")
+        if not video_url:
+            print("❌ Video URL not found in response.")
+        return video_url
+
+    print(f"❌ Video generation failed: {status_data.get('error') or job_status}")
     return None
+
+
+def download_video(video_url, local_path):
+    """Streams the rendered video to local_path (resumable, verified). Returns local_path, or None."""
+    print(f"⬇️ Downloading video from: {video_url[:50]}...")
+    try:
+        report = video_download.download_file(video_url, local_path)
+    except deadline.DeadlineExceeded:
+        raise
+    except Exception as e:
+        print(f"❌ Failed to download video: {e}")
+        return None
+    print(
+        f"✅ Video saved locally: {local_path} ({report['bytes']} bytes in {report['seconds']}s, "
+        f"{report['throughput_mb_s']} MB/s, {report['resumes']} resume(s), "
+        f"peak buffer {report['peak_buffer_bytes']} bytes, process peak RSS {report['process_peak_rss_mb']} MB)"
+    )
+    return local_path
+
+
+def relay_video_to_drive(video_url, file_name, folder_name="Video Assets", cache_path=None, upload_url=None, on_session=None):
+    """
+    Streams the rendered video straight into Drive (no temp file unless
+    cache_path is given). Returns the Drive link, or None.
+    """
+    print(f"📤 Relaying video to Drive from: {video_url[:50]}...")
+    folder_id = None
+    try:
+        folder_id = ensure_drive_folder(get_drive_client(), folder_name=folder_name)
+        report = drive_relay.relay_to_drive(
+            video_url, google_auth.access_token, folder_id, file_name,
+            cache_path=cache_path, upload_url=upload_url, on_session=on_session,
+        )
+    except deadline.DeadlineExceeded:
+        raise
+    except requests.HTTPError as e:
+        if folder_id and e.response is not None and e.response.status_code == 404:
+            # The cached folder was deleted; resolve it again on the next attempt
+            get_folder_cache().forget(folder_id)
+        print(f"❌ Failed to relay video to Drive: {e}")
+        return None
+    except Exception as e:
+        print(f"❌ Failed to relay video to Drive: {e}")
+        return None
+    print(
+        f"✅ Uploaded successfully: {file_name} ({report['bytes']} bytes in {report['seconds']}s, "
+        f"{report['throughput_mb_s']} MB/s, {report['chunks']} chunk(s), {report['source_resumes']} source resume(s), "
+        f"{report['upload_retries']} upload retry(ies), peak buffer {report['peak_buffer_bytes']} bytes)"
+    )
+    return report["link"]
+
+
+def generate_video_asset(json_prompt, client_name):
+    request_id = submit_video_request(json_prompt)
+    if not request_id:
+        return None
+
+    video_url = wait_for_video(request_id)
+    if not video_url:
+        return None
+
+    return download_video(video_url, os.path.join("temp_outputs", f"{client_name} - Video.mp4"))
  
  
 # ---------------------------------------------------
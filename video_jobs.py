@@ -0,0 +1,190 @@
+# video_jobs.py
+# Asynchronous video pipeline: scrape -> prompt -> Higgsfield render -> streamed
+# relay into Drive, executed by a bounded worker pool over jobs in the SQLite
+# job store. Every finished stage is persisted, so a job resumed after a restart
+# skips work it already did (most importantly, it re-attaches to the render it
+# already paid for instead of submitting a new one).
+import os
+import time
+import threading
+
+import llm_accounting
+import video_generation
+import deadline
+from scheduler import scheduler, DEFAULT_PRIORITY
+
+MAX_JOB_ATTEMPTS = 3  # a job that keeps crashing the worker is failed instead of resumed forever
+VIDEO_FOLDER_NAME = "Video Assets"
+VIDEO_JOB_DEADLINE_SECONDS = int(os.getenv("VIDEO_JOB_DEADLINE_SECONDS", "900"))  # submit-to-upload budget
+VIDEO_CACHE_DIR = os.getenv("VIDEO_CACHE_DIR")  # optional local copy of each relayed video
+
+
+class JobFailed(Exception):
+    """A pipeline stage failed in an expected way; the message is shown to the client."""
+
+
+def job_budget_seconds(job):
+    """
+    What is left of the job's deadline. The clock starts at submission, so
+    queueing counts; a job resumed after a restart gets a fresh budget instead
+    of failing for downtime it didn't cause.
+    """
+    budget = job["request"].get("deadline_seconds") or VIDEO_JOB_DEADLINE_SECONDS
+    if job["attempts"] > 1:
+        return budget
+    return budget - (time.time() - job["created_at"])
+
+
+def run_video_job(store, job_id):
+    """Runs (or resumes) one job through every stage that hasn't finished yet, within the job's deadline."""
+    job = store.get(job_id)
+    with deadline.deadline_context(job_budget_seconds(job), f"job {job_id[:8]}"):
+        return _run_video_job_stages(store, job_id, job)
+
+
+def _run_video_job_stages(store, job_id, job):
+    request = job["request"]
+    data = job["stage_data"]
+    company_name = request["company_name"]
+    website_url = request["website"]
+
+    # --- 1. Scrape ---
+    if not data.get("website_text"):
+        website_text = video_generation.scrape_website_data(website_url)
+        if not website_text:
+            deadline.check("scrape")
+            raise JobFailed("Failed to scrape website data.")
+        data["website_text"] = website_text
+        store.save_stage(job_id, "scraped", website_text=website_text)
+
+    # --- 2. Video prompt ---
+    if not data.get("json_prompt"):
+        with llm_accounting.job_context(f"video:{job_id}"):
+            try:
+                json_prompt = video_generation.get_or_generate_video_prompt(
+                    company_name, data["website_text"], variant=request.get("variant", False)
+                )
+            finally:
+                llm_accounting.export_job_summary(f"video:{job_id}")
+        if not json_prompt:
+            deadline.check("video prompt")
+            raise JobFailed("No video prompt candidate passed validation. Please retry.")
+        data["json_prompt"] = json_prompt
+        store.save_stage(job_id, "prompted", json_prompt=json_prompt)
+
+    # --- 3 & 4. Submit render and wait for it (one Higgsfield render slot) ---
+    if not data.get("video_url"):
+        with scheduler.slot("render"):
+            if not data.get("request_id"):
+                request_id = video_generation.submit_video_request(data["json_prompt"])
+                if not request_id:
+                    raise JobFailed("Video generation failed: render request was rejected.")
+                data["request_id"] = request_id
+                store.save_stage(job_id, "submitted", request_id=request_id)
+
+            video_url = video_generation.wait_for_video(data["request_id"])
+        if not video_url:
+            raise JobFailed("Video generation failed.")
+        data["video_url"] = video_url
+        store.save_stage(job_id, "rendered", video_url=video_url)
+
+    # --- 5. Relay to Drive ---
+    if not data.get("upload_link"):
+        file_name = f"{company_name} - Video.mp4"
+        if data.get("video_path") and os.path.exists(data["video_path"]):
+            # Job from before the relay existed: the video is already on disk
+            try:
+                drive = video_generation.get_drive_client()
+                folder_id = video_generation.ensure_drive_folder(drive, folder_name=VIDEO_FOLDER_NAME)
+                upload_link = video_generation.upload_to_drive(drive, folder_id, data["video_path"], file_name)
+            except Exception as e:
+                raise JobFailed(f"Failed to upload video to Drive: {e}")
+        else:
+            # Job ID in the cache name: two jobs for the same company must not collide
+            cache_path = os.path.join(VIDEO_CACHE_DIR, f"{company_name} - {job_id[:8]} - Video.mp4") if VIDEO_CACHE_DIR else None
+            upload_link = video_generation.relay_video_to_drive(
+                data["video_url"], file_name, folder_name=VIDEO_FOLDER_NAME, cache_path=cache_path,
+                upload_url=data.get("upload_session_url"),
+                on_session=lambda url: store.save_stage(job_id, "relaying", upload_session_url=url),
+            )
+            data["video_path"] = cache_path
+        if not upload_link:
+            raise JobFailed("Failed to upload video to Drive.")
+        data["upload_link"] = upload_link
+        store.save_stage(job_id, "uploaded", upload_link=upload_link, video_path=data["video_path"])
+
+    return {
+        "message": "Video generated successfully",
+        "video_path": data.get("video_path"),
+        "upload_link": data["upload_link"],
+    }
+
+
+class VideoJobWorker:
+    """
+    Executes jobs from the store; resumes unfinished ones on start. Jobs are
+    admitted through the scheduler's "video_job" slots, so an interactive job
+    overtakes queued bulk jobs instead of waiting behind them.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def submit(self, job_id, priority=None):
+        with self._lock:
+            if job_id in self._active:
+                return
+            self._active.add(job_id)
+        if priority is None:
+            priority = self.store.get(job_id)["request"].get("priority", DEFAULT_PRIORITY)
+        scheduler.submit("video_job", self._run, job_id, priority=priority)
+
+    def _run(self, job_id):
+        try:
+            job = self.store.get(job_id)
+            if job["attempts"] >= MAX_JOB_ATTEMPTS:
+                self.store.fail(job_id, f"Gave up after {job['attempts']} attempts.")
+                return
+            self.store.mark_running(job_id)
+            print(f"🎬 [Job {job_id[:8]}] Started (stage: {job['stage'] or 'new'})")
+            result = run_video_job(self.store, job_id)
+            self.store.complete(job_id, result)
+            print(f"✅ [Job {job_id[:8]}] Completed: {result['upload_link']}")
+        except JobFailed as e:
+            print(f"❌ [Job {job_id[:8]}] {e}")
+            self.store.fail(job_id, str(e))
+        except deadline.DeadlineExceeded as e:
+            # Finished stages stay recorded; nothing after the deadline was started
+            print(f"⏱️ [Job {job_id[:8]}] {e}")
+            self.store.fail(job_id, f"Deadline exceeded: {e}")
+        except Exception as e:
+            print(f"❌ [Job {job_id[:8]}] Unexpected error: {e}")
+            self.store.fail(job_id, f"Unexpected error: {e}")
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+
+    def resume_unfinished(self):
+        job_ids = self.store.unfinished_job_ids()
+        for job_id in job_ids:
+            self.submit(job_id)
+        return len(job_ids)
+
+    def shutdown(self):
+        # Running jobs are daemon threads; queued ones are resumed on the next start
+        scheduler.cancel_pending("video_job")
+
+
+def public_job_view(job):
+    """The fields of a job that the status endpoint returns."""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
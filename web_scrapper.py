@@ -1,6 +1,12 @@
 from playwright.sync_api import sync_playwright, TimeoutError
 from bs4 import BeautifulSoup
 import sys
+from scheduler import scheduler
+import deadline
+import process_pool
+
+# Elements whose text isn't part of the page's readable content
+NON_CONTENT_TAGS = ["script", "style", "noscript", "header", "footer", "nav", "svg"]
 
 def scrape_webpage(url: str) -> str:
     """
@@ -10,6 +16,12 @@ def scrape_webpage(url: str) -> str:
     if not url:
         return "No URL provided."
 
+    # Browser scrapes are heavy; the scheduler caps them and lets interactive work go first
+    with scheduler.slot("scrape"):
+        return _scrape_webpage(url)
+
+
+def _scrape_webpage(url: str) -> str:
     print(f"      [Scraper] Starting scrape for: {url}")
     sys.stdout.flush()
 
@@ -23,8 +35,8 @@ def scrape_webpage(url: str) -> str:
             sys.stdout.flush()
             
             # 'domcontentloaded' is faster than 'networkidle' and usually sufficient for text
-            # Timeout set to 30s to fail fast if site is down
-            page.goto(url, wait_until="domcontentloaded", timeout=30000)
+            # Timeout set to 30s (or what's left of the request budget) to fail fast if site is down
+            page.goto(url, wait_until="domcontentloaded", timeout=deadline.timeout(30, "scrape") * 1000)
             
             print(f"      [Scraper] Page loaded. Extracting content...")
             sys.stdout.flush()
@@ -32,21 +44,12 @@ def scrape_webpage(url: str) -> str:
             content = page.content()
             browser.close()
 
-        soup = BeautifulSoup(content, "html.parser")
+        # Parsing is pure CPU; in bulk runs it goes to the process pool (process_pool.CPU_WORKERS)
+        clean_text = process_pool.run_cpu(
+            extract_visible_text_from_blob, process_pool.Blob(content), stage="html text extraction"
+        )
 
-        # Remove script, style, and navigation elements to get clean "body" text
-        for script in soup(["script", "style", "noscript", "header", "footer", "nav", "svg"]):
-            script.extract()
-
-        # Find the main body
-        body = soup.find("body")
-
-        if body:
-            # Get text, strip extra whitespace
-            text = body.get_text(" ", strip=True)
-            # Clean up multiple spaces to single spaces
-            clean_text = " ".join(text.split())
-            
+        if clean_text is not None:
             # --- UNLIMITED SCRAPE FOR FULL DEBUG VISIBILITY ---
             # (No truncation logic here)
             
@@ -55,6 +58,8 @@ def scrape_webpage(url: str) -> str:
         else:
             return "Scrape failed: Could not find <body> tag."
 
+    except deadline.DeadlineExceeded:
+        raise
     except TimeoutError:
         print(f"      [Scraper Error] Timeout exceeded for {url}.")
         return "Scrape failed: Page timed out."
@@ -62,6 +67,27 @@ def scrape_webpage(url: str) -> str:
         print(f"      [Scraper Error] {e} for {url}")
         return f"Scrape failed: {e}"
 
+def extract_visible_text(html: str):
+    """The page's visible body text with whitespace collapsed, or None when there is no <body>."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Remove script, style, and navigation elements to get clean "body" text
+    for script in soup(NON_CONTENT_TAGS):
+        script.extract()
+
+    # Find the main body
+    body = soup.find("body")
+    if not body:
+        return None
+    # Get text, strip extra whitespace, and clean up multiple spaces to single spaces
+    return " ".join(body.get_text(" ", strip=True).split())
+
+
+def extract_visible_text_from_blob(blob):
+    # Process-pool entry point: the HTML arrives as a process_pool.Blob
+    return extract_visible_text(blob.text())
+
+
 if __name__ == "__main__":
     # Quick test
     print(scrape_webpage("https://www.casesbysource.com/"))
\ No newline at end of file